@@ -1,13 +1,16 @@
 """
 缓存调试 API - 查看缓存命中情况
 """
-from fastapi import APIRouter, Query
+from fastapi import APIRouter, Depends, Query
 import os
 import json
-from typing import Optional
+import asyncio
+from operator import itemgetter
+from typing import Optional, Dict, Any, List
 
 from app.services.kg_service import kg_service
 from app.services.optimized_json_storage import optimized_storage
+from app.core.neo4j_client import neo4j_client, neo4j_session
 
 router = APIRouter(tags=["cache-debug"])
 
@@ -16,7 +19,8 @@ router = APIRouter(tags=["cache-debug"])
 async def check_cache(
     school: str = Query(..., description="学校名称"),
     college: str = Query(..., description="学院名称"),
-    major: str = Query(..., description="专业名称")
+    major: str = Query(..., description="专业名称"),
+    session=Depends(neo4j_session)
 ):
     """
     检查指定专业的图谱缓存状态
@@ -24,28 +28,26 @@ async def check_cache(
     # 生成缓存键
     cache_path = kg_service._get_cache_path(school, college, major)
     
-    # 检查各种缓存
-    standard_json_exists = os.path.exists(cache_path)
-    
-    # 检查优化存储
-    from app.services.optimized_json_storage import optimized_storage
-    opt_data = optimized_storage.load_graph(school, college, major)
-    optimized_exists = opt_data is not None
-    
-    # 检查 Neo4j
-    neo4j_exists = False
-    if kg_service.use_neo4j:
+    async def _probe_neo4j() -> bool:
         try:
-            from app.core.neo4j_client import neo4j_client
-            neo4j_data = neo4j_client.load_graph(school, college, major)
-            neo4j_exists = neo4j_data is not None
+            return await neo4j_client.has_graph_async(school, college, major, session=session)
         except:
-            pass
+            return False
+    
+    async def _skip() -> bool:
+        return False
+    
+    # 并发检查各种缓存（文件 / 优化存储 / Neo4j），耗时取最慢的一个而非总和
+    # 仅做存在性检查，不反序列化整张图谱
+    standard_json_exists, optimized_exists, neo4j_exists = await asyncio.gather(
+        asyncio.to_thread(kg_service._has_standard_cache, school, college, major),
+        asyncio.to_thread(optimized_storage.has_graph, school, college, major),
+        _probe_neo4j() if kg_service.use_neo4j else _skip(),
+    )
     
     # 检查内存缓存
-    from app.services.optimized_json_storage import optimized_storage
     cache_key = optimized_storage._get_cache_key(school, college, major)
-    memory_cached = cache_key in optimized_storage.memory_cache
+    memory_cached = (school, college, major) in optimized_storage.memory_cache
     
     return {
         "school": school,
@@ -64,6 +66,48 @@ async def check_cache(
     }
 
 
+# 图谱缓存文件后缀（标准 JSON / 压缩格式）
+GRAPH_FILE_SUFFIXES = ("_graph.json", "_graph.msgpack", ".pkl.gz", ".msgpack.zst")
+
+# 图谱列表缓存：缓存目录 mtime 未变化时直接复用上次扫描结果
+_graph_list_cache: Dict[str, Any] = {"mtime_ns": None, "graphs": []}
+
+
+def _scan_cached_graphs(cache_dir: str) -> List[Dict[str, Any]]:
+    """扫描缓存目录，解析图谱文件信息"""
+    graphs = []
+    # scandir 的 DirEntry 自带 stat 缓存，避免逐个文件拼路径 + stat
+    with os.scandir(cache_dir) as it:
+        for entry in it:
+            filename = entry.name
+            # 先按文件名过滤，再取 stat（DirEntry.is_file 通常无需额外系统调用）
+            if not filename.endswith(GRAPH_FILE_SUFFIXES) or not entry.is_file():
+                continue
+            stat = entry.stat()
+
+            # 解析文件名：学校_学院_专业（专业名中可再含下划线）
+            name = filename
+            for suffix in GRAPH_FILE_SUFFIXES:
+                if name.endswith(suffix):
+                    name = name[:-len(suffix)]
+                    break
+            school, sep1, rest = name.partition("_")
+            college, sep2, major = rest.partition("_")
+
+            if sep1 and sep2:
+                graphs.append({
+                    "filename": filename,
+                    "school": school,
+                    "college": college,
+                    "major": major,
+                    "size_kb": round(stat.st_size / 1024, 2),
+                    "modified": stat.st_mtime
+                })
+    # 扫描时即按修改时间倒序排好，请求时筛选不改变顺序
+    graphs.sort(key=itemgetter("modified"), reverse=True)
+    return graphs
+
+
 @router.get("/cache/list")
 async def list_cached_graphs(
     school: Optional[str] = Query(None, description="按学校筛选")
@@ -75,24 +119,12 @@ async def list_cached_graphs(
     cache_dir = kg_service._get_cache_path("", "", "").replace("___graph.json", "")
     
     if os.path.exists(cache_dir):
-        for filename in os.listdir(cache_dir):
-            if filename.endswith("_graph.json") or filename.endswith(".pkl.gz"):
-                filepath = os.path.join(cache_dir, filename)
-                stat = os.stat(filepath)
-                
-                # 解析文件名
-                name = filename.replace("_graph.json", "").replace(".pkl.gz", "")
-                parts = name.split("_")
-                
-                if len(parts) >= 3:
-                    graphs.append({
-                        "filename": filename,
-                        "school": parts[0],
-                        "college": parts[1],
-                        "major": "_".join(parts[2:]),
-                        "size_kb": round(stat.st_size / 1024, 2),
-                        "modified": stat.st_mtime
-                    })
+        # 目录中增删文件会更新目录 mtime，未变化则命中缓存
+        dir_mtime_ns = os.stat(cache_dir).st_mtime_ns
+        if _graph_list_cache["mtime_ns"] != dir_mtime_ns:
+            _graph_list_cache["graphs"] = _scan_cached_graphs(cache_dir)
+            _graph_list_cache["mtime_ns"] = dir_mtime_ns
+        graphs = _graph_list_cache["graphs"]
     
     # 按学校筛选
     if school:
@@ -100,7 +132,7 @@ async def list_cached_graphs(
     
     return {
         "total": len(graphs),
-        "graphs": sorted(graphs, key=lambda x: x["modified"], reverse=True)
+        "graphs": graphs
     }
 
 
@@ -113,14 +145,15 @@ async def clear_cache(
     """
     清除指定专业的缓存（强制重新构建）
     """
-    cache_path = kg_service._get_cache_path(school, college, major)
-    
     deleted = []
     
-    # 删除标准 JSON
-    if os.path.exists(cache_path):
-        os.remove(cache_path)
-        deleted.append("standard_json")
+    # 删除标准缓存（MessagePack / JSON）
+    for cache_path in kg_service._standard_cache_paths(school, college, major):
+        if os.path.exists(cache_path):
+            os.remove(cache_path)
+            if "standard_json" not in deleted:
+                deleted.append("standard_json")
+            _graph_list_cache["mtime_ns"] = None
     
     # 删除优化存储
     opt_deleted = optimized_storage.delete_graph(school, college, major) if hasattr(optimized_storage, 'delete_graph') else False
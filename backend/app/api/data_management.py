@@ -2,12 +2,16 @@
 数据管理 API - 针对大数据量的管理接口
 """
 from fastapi import APIRouter, Query
+from fastapi.responses import StreamingResponse
 from typing import Optional, Dict, Any
+import asyncio
 import os
 
-from app.services.chongqing_job_loader import chongqing_loader
+import orjson
+
+from app.services.chongqing_job_loader import get_chongqing_loader
 from app.services.optimized_json_storage import optimized_storage
-from app.services.data_loader import data_loader
+from app.services.data_loader import get_data_loader
 
 router = APIRouter(tags=["data-management"])
 
@@ -17,14 +21,14 @@ async def get_data_stats():
     """
     获取招聘数据统计信息
     """
-    # CSV 数据 stats
-    csv_stats = chongqing_loader.get_dataset_stats()
+    # CSV 数据 stats（加载器首次使用时会解析 CSV，放到线程中执行，不阻塞事件循环）
+    csv_stats = await asyncio.to_thread(lambda: get_chongqing_loader().get_dataset_stats())
     
     # 图谱缓存 stats
     graph_stats = optimized_storage.get_stats()
     
     # 旧数据源 stats
-    old_stats = data_loader.get_dataset_stats()
+    old_stats = await asyncio.to_thread(lambda: get_data_loader().get_dataset_stats())
     
     return {
         "status": "success",
@@ -50,7 +54,7 @@ async def search_jobs(
 ):
     """
     搜索职位（用于测试数据加载）n    """
-    jobs = chongqing_loader.search_jobs_by_major(keyword, limit=limit)
+    jobs = await asyncio.to_thread(lambda: get_chongqing_loader().search_jobs_by_major(keyword, limit=limit))
     
     return {
         "status": "success",
@@ -60,13 +64,30 @@ async def search_jobs(
     }
 
 
+@router.get("/search/legacy-stream")
+async def stream_legacy_jobs(
+    keyword: str = Query(..., description="专业关键词"),
+    limit: Optional[int] = Query(None, ge=1, description="最多返回条数，默认全部")
+):
+    """
+    流式返回旧数据源中匹配的职位（NDJSON，每行一条）
+    大结果集边查边发，无需先物化整个列表
+    """
+    def _lines():
+        for job in get_data_loader().iter_jobs_by_major(keyword, limit=limit):
+            yield orjson.dumps(job) + b"\n"
+    
+    return StreamingResponse(_lines(), media_type="application/x-ndjson")
+
+
 @router.post("/cache/compress-existing")
 async def compress_existing_graphs():
     """
     将现有的 JSON 图谱压缩为优化格式
     """
     try:
-        converted = optimized_storage.compress_existing_json()
+        # 转换耗时较长（多进程解析 + 压缩），在线程中等待，不阻塞事件循环
+        converted = await asyncio.to_thread(optimized_storage.compress_existing_json)
         return {
             "status": "success",
             "message": f"成功压缩 {converted} 个图谱文件",
@@ -99,7 +120,7 @@ async def get_major_sample(
     """
     获取指定专业的职位样本（用于调试）
     """
-    sample_text = chongqing_loader.get_sample_for_major(major, sample_size)
+    sample_text = await asyncio.to_thread(lambda: get_chongqing_loader().get_sample_for_major(major, sample_size))
     
     return {
         "status": "success",
@@ -1,18 +1,21 @@
-from fastapi import APIRouter, HTTPException, Query, Body, UploadFile, File
-from fastapi.responses import StreamingResponse, FileResponse
+from fastapi import APIRouter, Depends, HTTPException, Query, Body, UploadFile, File
+from fastapi.responses import StreamingResponse, FileResponse, Response
 from typing import List, Dict
+from functools import lru_cache
 import asyncio
 import random
 import os
-import io
-import docx
-import pypdf
+
+import orjson
 from sqlalchemy.orm import Session
 
 from app.services.kg_service import kg_service
-from app.services.data_loader import data_loader
 from app.services.hierarchy_cache_service import hierarchy_cache
+from app.services import document_parser
+from app.core.config import get_settings
 from app.core.database import get_db
+from app.core.neo4j_client import neo4j_client, neo4j_session
+from app.crud import school_hierarchy as crud
 
 router = APIRouter()
 
@@ -36,34 +39,64 @@ CQUPT_DATA = {
     "继续教育学院（负责专升本、继续教育，此处仅列对应专业）": ["英语", "软件工程", "电子商务等（详见当年专升本招生简章）"]
 }
 
-# 初始化层级数据（从缓存服务获取）
-HIERARCHY_DATA = hierarchy_cache.get_hierarchy()
-
-# 如果缓存为空，使用Mock数据
-if not HIERARCHY_DATA:
-    print("[Endpoints] 缓存为空，使用Mock数据")
-    HIERARCHY_DATA = {
-        "重庆大学": {
-            "计算机学院": ["计算机科学与技术", "软件工程", "人工智能"],
-            "微电子与通信工程学院": ["通信工程", "电子信息工程", "集成电路设计与集成系统"],
-            "自动化学院": ["自动化", "机器人工程", "测控技术与仪器"]
-        },
-        "西南大学": {
-            "人工智能学院": ["智能科学与技术", "数据科学与大数据技术", "自动化"],
-            "计算机与信息科学学院": ["计算机科学与技术", "软件工程", "网络工程"],
-            "工程技术学院": ["土木工程", "机械设计制造及其自动化"]
-        },
-        "重庆邮电大学": {
-            "通信与信息工程学院": ["通信工程", "电子信息工程", "广播电视工程"],
-            "计算机科学与技术学院": ["计算机科学与技术", "智能科学与技术", "空间信息与数字技术"],
-            "自动化学院": ["自动化", "测控技术与仪器", "电气工程及其自动化"]
-        }
+# 缓存为空时使用的 Mock 数据
+MOCK_HIERARCHY_DATA = {
+    "重庆大学": {
+        "计算机学院": ["计算机科学与技术", "软件工程", "人工智能"],
+        "微电子与通信工程学院": ["通信工程", "电子信息工程", "集成电路设计与集成系统"],
+        "自动化学院": ["自动化", "机器人工程", "测控技术与仪器"]
+    },
+    "西南大学": {
+        "人工智能学院": ["智能科学与技术", "数据科学与大数据技术", "自动化"],
+        "计算机与信息科学学院": ["计算机科学与技术", "软件工程", "网络工程"],
+        "工程技术学院": ["土木工程", "机械设计制造及其自动化"]
+    },
+    "重庆邮电大学": {
+        "通信与信息工程学院": ["通信工程", "电子信息工程", "广播电视工程"],
+        "计算机科学与技术学院": ["计算机科学与技术", "智能科学与技术", "空间信息与数字技术"],
+        "自动化学院": ["自动化", "测控技术与仪器", "电气工程及其自动化"]
     }
+}
+
+
+def _build_hierarchy(base: Dict[str, Dict[str, List[str]]]) -> Dict[str, Dict[str, List[str]]]:
+    """
+    构建对外提供的层级数据：缓存为空时使用 Mock 数据，并合并重庆邮电大学详细数据
+    返回新字典，不修改缓存服务持有的数据
+    """
+    if not base:
+        print("[Endpoints] 缓存为空，使用Mock数据")
+        base = MOCK_HIERARCHY_DATA
+    hierarchy = dict(base)
+    hierarchy["重庆邮电大学"] = {**base.get("重庆邮电大学", {}), **CQUPT_DATA}
+    return hierarchy
+
+
+def _build_sorted_indexes(hierarchy: Dict[str, Dict[str, List[str]]]):
+    """
+    预先排序学校/学院/专业列表，并直接序列化为 orjson 字节串
+    请求时原样返回，避免每次重复排序、校验 response_model 和 JSON 编码
+    """
+    schools = orjson.dumps(sorted(hierarchy))
+    colleges = {s: orjson.dumps(sorted(cs)) for s, cs in hierarchy.items()}
+    majors = {(s, c): orjson.dumps(sorted(ms)) for s, cs in hierarchy.items() for c, ms in cs.items()}
+    return schools, colleges, majors
 
-# 合并重庆邮电大学详细数据
-if "重庆邮电大学" not in HIERARCHY_DATA:
-    HIERARCHY_DATA["重庆邮电大学"] = {}
-HIERARCHY_DATA["重庆邮电大学"].update(CQUPT_DATA)
+
+def _json_bytes(content: bytes) -> Response:
+    return Response(content=content, media_type="application/json")
+
+
+# 层级数据：应用启动（lifespan）初始化缓存后由 load_hierarchy 填充，导入时不读缓存
+HIERARCHY_DATA: Dict[str, Dict[str, List[str]]] = {}
+SORTED_SCHOOLS, SORTED_COLLEGES, SORTED_MAJORS = _build_sorted_indexes(HIERARCHY_DATA)
+
+
+def load_hierarchy(hierarchy: Dict[str, Dict[str, List[str]]]):
+    """用缓存服务给出的层级数据重建对外数据与预排序索引"""
+    global HIERARCHY_DATA, SORTED_SCHOOLS, SORTED_COLLEGES, SORTED_MAJORS
+    HIERARCHY_DATA = _build_hierarchy(hierarchy)
+    SORTED_SCHOOLS, SORTED_COLLEGES, SORTED_MAJORS = _build_sorted_indexes(HIERARCHY_DATA)
 
 
 @router.get("/schools", response_model=List[str])
@@ -71,7 +104,7 @@ async def get_schools():
     """
     Get list of available schools (from cache).
     """
-    return sorted(list(HIERARCHY_DATA.keys()))
+    return _json_bytes(SORTED_SCHOOLS)
 
 
 @router.get("/schools/{school_name}/colleges", response_model=List[str])
@@ -79,9 +112,9 @@ async def get_colleges(school_name: str):
     """
     Get list of colleges for a specific school.
     """
-    if school_name not in HIERARCHY_DATA:
+    if school_name not in SORTED_COLLEGES:
         raise HTTPException(status_code=404, detail="School not found")
-    return sorted(list(HIERARCHY_DATA[school_name].keys()))
+    return _json_bytes(SORTED_COLLEGES[school_name])
 
 
 @router.get("/schools/{school_name}/colleges/{college_name}/majors", response_model=List[str])
@@ -89,20 +122,19 @@ async def get_majors(school_name: str, college_name: str):
     """
     Get list of majors for a specific college in a school.
     """
-    if school_name not in HIERARCHY_DATA:
+    if school_name not in SORTED_COLLEGES:
         raise HTTPException(status_code=404, detail="School not found")
-    if college_name not in HIERARCHY_DATA[school_name]:
+    majors = SORTED_MAJORS.get((school_name, college_name))
+    if majors is None:
         raise HTTPException(status_code=404, detail="College not found")
-    return sorted(HIERARCHY_DATA[school_name][college_name])
+    return _json_bytes(majors)
 
 
-@router.get("/stats")
-async def get_stats(major: str = Query(..., description="Major name to generate stats for")):
-    """
-    Get generated stats for a specific major (Deterministic mock).
-    """
-    # Deterministic hash generation logic (same as frontend for now)
-    base_hash = sum(ord(char) for char in major)
+@lru_cache(maxsize=1024)
+def _compute_stats(major: str) -> Dict[str, str]:
+    """Deterministic stats for a major (pure function of the name, safe to memoize)."""
+    # Same codepoint-sum hash as before so the numbers stay stable per major
+    base_hash = sum(map(ord, major))
     
     return {
         "jobs": f"相关就业岗位{int((base_hash * 13) % 100) + 20}万个",
@@ -112,33 +144,28 @@ async def get_stats(major: str = Query(..., description="Major name to generate
     }
 
 
+@router.get("/stats")
+async def get_stats(major: str = Query(..., description="Major name to generate stats for")):
+    """
+    Get generated stats for a specific major (Deterministic mock).
+    """
+    return _compute_stats(major)
+
+
 @router.post("/parse-file")
 async def parse_file(file: UploadFile = File(...)):
     """
     Parse uploaded file (pdf, docx, txt) and return text content.
     """
-    content = ""
-    filename = file.filename.lower()
+    filename = file.filename
     
     try:
-        contents = await file.read()
-        file_obj = io.BytesIO(contents)
-        
-        if filename.endswith(".pdf"):
-            reader = pypdf.PdfReader(file_obj)
-            for page in reader.pages:
-                content += page.extract_text() + "\n"
-                
-        elif filename.endswith(".docx"):
-            doc = docx.Document(file_obj)
-            for para in doc.paragraphs:
-                content += para.text + "\n"
-                
-        elif filename.endswith(".txt"):
-            content = contents.decode("utf-8")
-            
-        else:
+        if document_parser.get_extension(filename) not in document_parser.SUPPORTED_EXTENSIONS:
             raise HTTPException(status_code=400, detail="Unsupported file format. Please upload .pdf, .docx, or .txt")
+        
+        contents = await file.read()
+        # PDF/DOCX 解析为 CPU 密集操作，放到线程池避免阻塞事件循环
+        content = await asyncio.to_thread(document_parser.extract_text, filename, contents)
             
         return {"filename": file.filename, "content": content}
         
@@ -185,7 +212,8 @@ async def stream_build_graph(
     major: str = Query(...)
 ):
     """
-    Stream the KG construction process with real-time updates using Server-Sent Events (SSE) compatible format.
+    Stream the KG construction process with real-time updates as NDJSON.
+    The generator already yields encoded bytes, so each event is written out unchanged.
     """
     return StreamingResponse(
         kg_service.build_graph_for_major_stream(school, college, major),
@@ -241,11 +269,7 @@ async def refresh_hierarchy_cache():
         hierarchy = hierarchy_cache.refresh_from_csv()
         
         # 重新加载全局数据
-        global HIERARCHY_DATA
-        HIERARCHY_DATA = hierarchy
-        if "重庆邮电大学" not in HIERARCHY_DATA:
-            HIERARCHY_DATA["重庆邮电大学"] = {}
-        HIERARCHY_DATA["重庆邮电大学"].update(CQUPT_DATA)
+        load_hierarchy(hierarchy)
         
         return {
             "status": "success",
@@ -257,34 +281,23 @@ async def refresh_hierarchy_cache():
 
 
 @router.get("/admin/hierarchy-cache-stats")
-async def get_hierarchy_cache_stats():
+def get_hierarchy_cache_stats(db: Session = Depends(get_db)):
     """
     获取学校层级缓存统计信息
     """
-    from sqlalchemy.orm import Session
-    from app.core.database import SessionLocal
-    from app.crud import school_hierarchy as crud
-    
-    db = SessionLocal()
-    try:
-        stats = crud.get_cache_stats(db)
-        return {
-            "status": "success",
-            "cache_stats": stats,
-            "memory_cached": hierarchy_cache._memory_cache is not None
-        }
-    finally:
-        db.close()
+    stats = crud.get_cache_stats(db)
+    return {
+        "status": "success",
+        "cache_stats": stats,
+        "memory_cached": hierarchy_cache._memory_cache is not None
+    }
 
 
 @router.get("/admin/storage-status")
-async def get_storage_status():
+async def get_storage_status(session=Depends(neo4j_session)):
     """
     获取知识图谱存储后端状态
     """
-    from app.core.config import get_settings
-    from app.core.neo4j_client import neo4j_client
-    
     settings = get_settings()
     
     status = {
@@ -297,8 +310,9 @@ async def get_storage_status():
     # 如果 Neo4j 已连接，获取统计信息
     if status["neo4j_connected"]:
         try:
-            neo4j_stats = neo4j_client.get_graph_stats()
+            neo4j_stats = await neo4j_client.get_graph_stats_async(session=session)
             status["neo4j_stats"] = neo4j_stats
+            status["neo4j_query_cache"] = neo4j_client.cache_stats()
         except Exception as e:
             status["neo4j_error"] = str(e)
     
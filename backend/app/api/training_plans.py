@@ -3,13 +3,16 @@ Training Plan API Endpoints - 培养方案上传管理接口
 """
 import os
 import uuid
-import io
-from typing import Optional
+import asyncio
+import hashlib
+from functools import lru_cache
+from typing import Optional, Tuple
+import aiofiles
 from fastapi import APIRouter, Depends, UploadFile, File, Form, HTTPException, Query
 from fastapi.responses import FileResponse, StreamingResponse
-from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.core.database import get_db
+from app.core.database import get_async_db
 from app.core.config import get_settings
 from app.crud import training_plan as crud
 from app.schemas.training_plan import (
@@ -19,9 +22,7 @@ from app.schemas.training_plan import (
     TrainingPlanUpdate
 )
 
-# 文件解析
-import pypdf
-import docx
+from app.services import document_parser
 
 router = APIRouter(tags=["training-plans"])
 settings = get_settings()
@@ -31,13 +32,16 @@ UPLOAD_DIR = settings.UPLOAD_DIR
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
 
-ALLOWED_EXTENSIONS = {'.pdf', '.docx', '.doc', '.txt'}
+ALLOWED_EXTENSIONS = frozenset({'.pdf', '.docx', '.doc', '.txt'})
 MAX_FILE_SIZE = settings.MAX_FILE_SIZE  # 50MB
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # 流式写盘缓冲 1MB
 
 
+@lru_cache(maxsize=2048)
 def get_file_extension(filename: str) -> str:
-    """获取文件扩展名"""
-    return os.path.splitext(filename)[1].lower()
+    """获取文件扩展名（含点，小写）"""
+    ext = document_parser.get_extension(filename)
+    return f".{ext}" if ext else ""
 
 
 def is_allowed_file(filename: str) -> bool:
@@ -45,41 +49,44 @@ def is_allowed_file(filename: str) -> bool:
     return get_file_extension(filename) in ALLOWED_EXTENSIONS
 
 
-def extract_text_content(file: UploadFile, content: bytes) -> Optional[str]:
+def extract_text_content(filename: str, file_path: str, digest: bytes) -> Optional[str]:
     """提取文件文本内容"""
-    filename = file.filename.lower()
-    text = ""
-    
     try:
-        if filename.endswith('.pdf'):
-            pdf_file = io.BytesIO(content)
-            reader = pypdf.PdfReader(pdf_file)
-            for page in reader.pages:
-                text += page.extract_text() or ""
-                text += "\n"
-                
-        elif filename.endswith('.docx'):
-            doc_file = io.BytesIO(content)
-            doc = docx.Document(doc_file)
-            for para in doc.paragraphs:
-                text += para.text + "\n"
-                
-        elif filename.endswith('.txt'):
-            text = content.decode('utf-8')
-            
+        text = document_parser.extract_text_from_path(filename, file_path, digest)
         return text.strip() if text else None
         
+    except document_parser.UnsupportedFileFormat:
+        # doc 等格式不解析文本
+        return None
     except Exception as e:
         print(f"Error extracting text: {e}")
         return None
 
 
-def save_upload_file(content: bytes, stored_filename: str) -> str:
-    """保存上传文件到本地"""
-    file_path = os.path.join(UPLOAD_DIR, stored_filename)
-    with open(file_path, 'wb') as f:
-        f.write(content)
-    return file_path
+async def save_upload_file(file: UploadFile, file_path: str) -> Tuple[int, bytes]:
+    """
+    分块流式保存上传文件到本地，同时计算大小与 sha256 摘要
+    
+    超过 MAX_FILE_SIZE 时立即中止并删除已写入部分
+    """
+    size = 0
+    hasher = hashlib.sha256()
+    try:
+        async with aiofiles.open(file_path, 'wb') as f:
+            while chunk := await file.read(UPLOAD_CHUNK_SIZE):
+                size += len(chunk)
+                if size > MAX_FILE_SIZE:
+                    raise HTTPException(
+                        status_code=400,
+                        detail=f"文件大小超过限制。最大允许: {MAX_FILE_SIZE / 1024 / 1024:.1f}MB"
+                    )
+                hasher.update(chunk)
+                await f.write(chunk)
+    except BaseException:
+        if os.path.exists(file_path):
+            os.remove(file_path)
+        raise
+    return size, hasher.digest()
 
 
 @router.post("/upload", response_model=TrainingPlanResponse)
@@ -89,7 +96,7 @@ async def upload_training_plan(
     major: str = Form(..., description="专业名称"),
     description: Optional[str] = Form(None, description="方案描述/备注"),
     file: UploadFile = File(..., description="培养方案文件 (PDF/DOCX/TXT)"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     上传培养方案文件
@@ -105,32 +112,25 @@ async def upload_training_plan(
             detail=f"不支持的文件类型。允许: {', '.join(ALLOWED_EXTENSIONS)}"
         )
     
-    # 读取文件内容
-    content = await file.read()
-    
-    # 检查文件大小
-    if len(content) > MAX_FILE_SIZE:
-        raise HTTPException(
-            status_code=400,
-            detail=f"文件大小超过限制。最大允许: {MAX_FILE_SIZE / 1024 / 1024:.1f}MB"
-        )
-    
     # 生成存储文件名
     file_ext = get_file_extension(file.filename)
     stored_filename = f"{uuid.uuid4().hex}{file_ext}"
+    file_path = os.path.join(UPLOAD_DIR, stored_filename)
     
-    # 提取文本内容
-    extracted_text = extract_text_content(file, content)
-    
-    # 保存文件
+    # 流式保存文件（同时检查文件大小）
     try:
-        file_path = save_upload_file(content, stored_filename)
+        file_size, digest = await save_upload_file(file, file_path)
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"文件保存失败: {str(e)}")
     
+    # 提取文本内容（线程池中执行，避免阻塞事件循环）
+    extracted_text = await asyncio.to_thread(extract_text_content, file.filename, file_path, digest)
+    
     # 创建数据库记录
     try:
-        db_plan = crud.create_training_plan(
+        db_plan = await crud.create_training_plan(
             db=db,
             school=school,
             college=college,
@@ -138,7 +138,7 @@ async def upload_training_plan(
             original_filename=file.filename,
             stored_filename=stored_filename,
             file_path=file_path,
-            file_size=len(content),
+            file_size=file_size,
             file_type=file_ext.lstrip('.'),
             extracted_content=extracted_text,
             description=description
@@ -152,19 +152,19 @@ async def upload_training_plan(
 
 
 @router.get("/list", response_model=TrainingPlanListResponse)
-def list_training_plans(
+async def list_training_plans(
     school: Optional[str] = Query(None, description="按学校筛选"),
     college: Optional[str] = Query(None, description="按学院筛选"),
     major: Optional[str] = Query(None, description="按专业筛选"),
     page: int = Query(1, ge=1, description="页码"),
     page_size: int = Query(20, ge=1, le=100, description="每页数量"),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     获取培养方案列表（支持分页和筛选）
     """
     skip = (page - 1) * page_size
-    plans, total = crud.get_training_plans(
+    plans, total = await crud.get_training_plans(
         db=db,
         school=school,
         college=college,
@@ -175,19 +175,19 @@ def list_training_plans(
     
     return {
         "total": total,
-        "items": [plan.to_dict() for plan in plans]
+        "items": plans
     }
 
 
 @router.get("/{plan_id}", response_model=TrainingPlanDetailResponse)
-def get_training_plan(
+async def get_training_plan(
     plan_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     获取培养方案详情（包含提取的文本内容）
     """
-    plan = crud.get_training_plan_by_id(db, plan_id)
+    plan = await crud.get_training_plan_by_id(db, plan_id)
     if not plan:
         raise HTTPException(status_code=404, detail="培养方案不存在")
     
@@ -198,14 +198,14 @@ def get_training_plan(
 
 
 @router.get("/{plan_id}/download")
-def download_training_plan(
+async def download_training_plan(
     plan_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     下载培养方案原文件
     """
-    plan = crud.get_training_plan_by_id(db, plan_id)
+    plan = await crud.get_training_plan_by_id(db, plan_id)
     if not plan:
         raise HTTPException(status_code=404, detail="培养方案不存在")
     
@@ -220,14 +220,14 @@ def download_training_plan(
 
 
 @router.get("/{plan_id}/content")
-def get_training_plan_content(
+async def get_training_plan_content(
     plan_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     获取培养方案提取的文本内容（用于前端直接展示）
     """
-    plan = crud.get_training_plan_by_id(db, plan_id)
+    plan = await crud.get_training_plan_by_id(db, plan_id)
     if not plan:
         raise HTTPException(status_code=404, detail="培养方案不存在")
     
@@ -242,15 +242,15 @@ def get_training_plan_content(
 
 
 @router.put("/{plan_id}", response_model=TrainingPlanResponse)
-def update_training_plan(
+async def update_training_plan(
     plan_id: int,
     update_data: TrainingPlanUpdate,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     更新培养方案信息（仅支持修改描述）
     """
-    plan = crud.update_training_plan(db, plan_id, update_data)
+    plan = await crud.update_training_plan(db, plan_id, update_data)
     if not plan:
         raise HTTPException(status_code=404, detail="培养方案不存在")
     
@@ -258,14 +258,14 @@ def update_training_plan(
 
 
 @router.delete("/{plan_id}")
-def delete_training_plan(
+async def delete_training_plan(
     plan_id: int,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     删除培养方案（软删除）
     """
-    success = crud.delete_training_plan(db, plan_id)
+    success = await crud.delete_training_plan(db, plan_id)
     if not success:
         raise HTTPException(status_code=404, detail="培养方案不存在")
     
@@ -273,29 +273,29 @@ def delete_training_plan(
 
 
 @router.get("/by-school/{school}")
-def get_plans_by_school(
+async def get_plans_by_school(
     school: str,
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     获取指定学校的所有培养方案
     """
-    plans = crud.get_plans_by_school(db, school)
+    plans = await crud.get_plans_by_school(db, school)
     return {
         "school": school,
         "total": len(plans),
-        "items": [plan.to_dict() for plan in plans]
+        "items": plans
     }
 
 
 @router.get("/stats/schools")
-def get_schools_with_plans(
-    db: Session = Depends(get_db)
+async def get_schools_with_plans(
+    db: AsyncSession = Depends(get_async_db)
 ):
     """
     获取所有有培养方案的学校列表
     """
-    schools = crud.get_all_schools_with_plans(db)
+    schools = await crud.get_all_schools_with_plans(db)
     return {
         "total": len(schools),
         "schools": schools
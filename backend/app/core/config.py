@@ -1,5 +1,6 @@
 from pydantic_settings import BaseSettings
 from functools import lru_cache
+from typing import Optional
 
 class Settings(BaseSettings):
     PROJECT_NAME: str = "Chongqing Training Program Agent API"
@@ -20,6 +21,9 @@ class Settings(BaseSettings):
     DB_NAME: str = "training_agent"
     DB_USER: str = "root"
     DB_PASSWORD: str = ""
+    DB_POOL_SIZE: int = 20
+    DB_MAX_OVERFLOW: int = 30
+    DB_POOL_TIMEOUT: int = 30
     
     # File Upload Configuration
     UPLOAD_DIR: str = "uploads/training-plans"
@@ -30,6 +34,9 @@ class Settings(BaseSettings):
     NEO4J_URI: str = "bolt://localhost:7687"
     NEO4J_USER: str = "neo4j"
     NEO4J_PASSWORD: str = "password"
+    NEO4J_DATABASE: Optional[str] = None  # 为空时使用服务端默认数据库
+    NEO4J_MAX_POOL_SIZE: int = 50
+    NEO4J_CONN_ACQ_TIMEOUT: float = 60.0
     
     # Knowledge Graph Storage: "json" or "neo4j"
     KG_STORAGE: str = "json"
@@ -38,6 +45,10 @@ class Settings(BaseSettings):
     def DATABASE_URL(self) -> str:
         return f"mysql+pymysql://{self.DB_USER}:{self.DB_PASSWORD}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}?charset=utf8mb4"
 
+    @property
+    def ASYNC_DATABASE_URL(self) -> str:
+        return f"mysql+aiomysql://{self.DB_USER}:{self.DB_PASSWORD}@{self.DB_HOST}:{self.DB_PORT}/{self.DB_NAME}?charset=utf8mb4"
+
     class Config:
         env_file = ".env"
 
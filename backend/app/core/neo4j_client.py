@@ -3,41 +3,360 @@ Neo4j Graph Database Client - Neo4j 图数据库客户端
 可选的图数据库存储后端
 """
 from neo4j import GraphDatabase, AsyncGraphDatabase
-from typing import List, Dict, Any, Optional
+from neo4j.exceptions import ClientError
+from typing import List, Dict, Any, Optional, Tuple
+from collections import OrderedDict
+from contextlib import asynccontextmanager, contextmanager
+import functools
+import inspect
 import json
+import threading
+import time
 from app.core.config import get_settings
 
 settings = get_settings()
 
+# UNWIND 批量写入时每批的行数
+WRITE_BATCH_SIZE = 10000
+
+# 实体数达到该值且有 APOC 时，改用 apoc.periodic.iterate 并行写入
+APOC_ITERATE_MIN_ROWS = 5000
+
+# 只读查询结果缓存：条目上限与过期时间（秒）
+QUERY_CACHE_MAX_ITEMS = 10000
+QUERY_CACHE_TTL = 300
+
+# ---- Cypher 语句（同步 / 异步接口共用） ----
+
+DELETE_GRAPH_APOC_CYPHER = """
+    CALL apoc.periodic.iterate(
+        "MATCH (e:Entity {graph_id: $gid}) RETURN e",
+        "DETACH DELETE e",
+        {batchSize: 5000, params: {gid: $graph_id}}
+    )
+"""
+
+DELETE_GRAPH_CYPHER = """
+    MATCH (e:Entity {graph_id: $graph_id})
+    DETACH DELETE e
+"""
+
+# 单行写入语句：UNWIND 批量写入与 apoc.periodic.iterate 共用
+ENTITY_ROW_ACTION = """
+    MERGE (e:Entity {id: row.id})
+    SET e += row
+"""
+
+# 有 APOC 时额外把实体类型挂为标签（如 :Entity:课程），按类型扫描可走标签索引
+ENTITY_ROW_ACTION_WITH_LABELS = ENTITY_ROW_ACTION + """
+    WITH e, row
+    CALL apoc.create.addLabels(e, [t IN [row.type] WHERE t IS NOT NULL AND t <> '']) YIELD node
+    RETURN count(node)
+"""
+
+RELATIONSHIP_ROW_ACTION = """
+    MATCH (head:Entity {id: row.head})
+    MATCH (tail:Entity {id: row.tail})
+    MERGE (head)-[r:RELATES {type: row.relation}]->(tail)
+    SET r.relation = row.relation
+"""
+
+MERGE_ENTITIES_CYPHER = "UNWIND $batch AS row" + ENTITY_ROW_ACTION
+# 无 APOC 时按 type 分组，类型标签直接写进语句（标签不能参数化）
+MERGE_ENTITIES_WITH_LABEL_TEMPLATE = MERGE_ENTITIES_CYPHER + "    SET e:`%s`\n"
+MERGE_ENTITIES_WITH_LABELS_CYPHER = "UNWIND $batch AS row" + ENTITY_ROW_ACTION_WITH_LABELS
+MERGE_RELATIONSHIPS_CYPHER = "UNWIND $batch AS row" + RELATIONSHIP_ROW_ACTION
+
+
+def _entity_write_statements(entities_payload: List[Dict], has_apoc: bool):
+    """实体写入语句及对应数据：有 APOC 时一条语句加标签，否则按 type 分组各用一条带标签语句"""
+    if has_apoc:
+        return [(MERGE_ENTITIES_WITH_LABELS_CYPHER, entities_payload)]
+    
+    groups: Dict[str, List[Dict]] = {}
+    for row in entities_payload:
+        groups.setdefault(row.get("type") or "", []).append(row)
+    
+    statements = []
+    for etype, rows in groups.items():
+        if etype:
+            label = etype.replace("`", "``")
+            statements.append((MERGE_ENTITIES_WITH_LABEL_TEMPLATE % label, rows))
+        else:
+            statements.append((MERGE_ENTITIES_CYPHER, rows))
+    return statements
+
+
+# 大图谱由服务端分批并行写入；实体按唯一约束 id MERGE 可并行，关系写入两端加锁需串行以免死锁
+ITERATE_WRITE_CYPHER = """
+    CALL apoc.periodic.iterate(
+        "UNWIND $batch AS row RETURN row",
+        $action,
+        {batchSize: 1000, parallel: $parallel, concurrency: 4, params: {batch: $batch}}
+    )
+    YIELD failedOperations, errorMessages
+    RETURN failedOperations, errorMessages
+"""
+
+LOAD_ENTITIES_CYPHER = """
+    MATCH (e:Entity {graph_id: $graph_id})
+    RETURN e.id as id, e.name as name,
+           e.type as type, e.category as category
+"""
+
+LOAD_RELATIONSHIPS_CYPHER = """
+    MATCH (head:Entity {graph_id: $graph_id})-[r:RELATES]->(tail:Entity)
+    RETURN head.id as head, r.relation as relation, tail.id as tail
+"""
+
+HAS_GRAPH_CYPHER = """
+    MATCH (e:Entity {graph_id: $graph_id})
+    RETURN 1 LIMIT 1
+"""
+
+
+RELATED_ENTITIES_APOC_CYPHER = """
+    MATCH (e:Entity {id: $entity_id})
+    CALL apoc.path.expandConfig(e, {
+        relationshipFilter: "RELATES>",
+        minLevel: 1,
+        maxLevel: $depth,
+        uniqueness: $uniqueness
+    }) YIELD path
+    WITH path, last(nodes(path)) AS related
+    WHERE $relation_type IS NULL
+       OR ALL(rel IN relationships(path) WHERE rel.relation = $relation_type)
+    RETURN related.id as id, related.name as name,
+           related.type as type, length(path) as distance
+    LIMIT 50
+"""
+
+RELATED_ENTITIES_CYPHER_TEMPLATE = """
+    MATCH path = (e:Entity {id: $entity_id})-[r:RELATES*1..%d]->(related:Entity)
+    WHERE $relation_type IS NULL
+       OR ALL(rel IN r WHERE rel.relation = $relation_type)
+    RETURN related.id as id, related.name as name,
+           related.type as type, length(path) as distance
+    LIMIT 50
+"""
+
+
+SEARCH_ENTITIES_FULLTEXT_CYPHER = """
+    CALL db.index.fulltext.queryNodes('entity_name_ft', $query) YIELD node
+    WHERE $type IS NULL OR node.type = $type
+    RETURN node.id as id, node.name as name,
+           node.type as type, node.category as category,
+           node.school as school, node.major as major
+    LIMIT 20
+"""
+
+SEARCH_ENTITIES_SCAN_CYPHER = """
+    MATCH (e:Entity)
+    WHERE e.name CONTAINS $keyword AND ($type IS NULL OR e.type = $type)
+    RETURN e.id as id, e.name as name,
+           e.type as type, e.category as category,
+           e.school as school, e.major as major
+    LIMIT 20
+"""
+
+# 统计查询：school 作为参数传入（为空表示全部），不同筛选条件共用同一个查询计划
+ENTITY_STATS_CYPHER = """
+    MATCH (e:Entity)
+    WHERE $school IS NULL OR e.school = $school
+    RETURN count(e) as total,
+           count(DISTINCT e.type) as types,
+           count(DISTINCT e.graph_id) as graphs
+"""
+
+RELATIONSHIP_STATS_CYPHER = """
+    MATCH (e:Entity)-[r:RELATES]->(t:Entity)
+    WHERE $school IS NULL OR e.school = $school
+    RETURN count(r) as relationships
+"""
+
+
+def _fulltext_phrase(keyword: str) -> str:
+    """把关键词转为 Lucene 短语查询（中文按字切分，短语匹配即连续子串）"""
+    escaped = keyword.replace('\\', '\\\\').replace('"', '\\"')
+    return f'"{escaped}"'
+
+
+def _graph_id(school: str, college: str, major: str) -> str:
+    return f"{school}_{college}_{major}"
+
+
+def _build_payloads(graph_id: str, school: str, college: str, major: str,
+                    entities: List[Dict], relationships: List[Dict]) -> Tuple[List[Dict], List[Dict]]:
+    """构造 UNWIND 批量写入所需的实体 / 关系参数列表"""
+    entities_payload = [
+        {
+            "id": entity.get('id'),
+            "name": entity.get('name'),
+            "type": entity.get('type'),
+            "category": entity.get('category', ''),
+            "graph_id": graph_id,
+            "school": school,
+            "college": college,
+            "major": major,
+        }
+        for entity in entities
+    ]
+    relationships_payload = [
+        {
+            "head": rel.get('head'),
+            "tail": rel.get('tail'),
+            "relation": rel.get('relation'),
+        }
+        for rel in relationships
+    ]
+    return entities_payload, relationships_payload
+
+
+def _read_records(tx, query: str, params: Dict[str, Any]) -> List[Dict]:
+    """读事务函数：在事务范围内一次性物化全部记录为字典"""
+    return tx.run(query, **params).data()
+
+
+async def _read_records_async(tx, query: str, params: Dict[str, Any]) -> List[Dict]:
+    """_read_records 的异步版本"""
+    result = await tx.run(query, **params)
+    return await result.data()
+
+
+def _report_iterate_failures(record):
+    """打印 apoc.periodic.iterate 的失败批次（不中断写入）"""
+    if record and record["failedOperations"]:
+        print(f"[Neo4j] 批量写入失败 {record['failedOperations']} 条: {record['errorMessages']}")
+
+
+class _QueryCache:
+    """带 TTL 的 LRU 查询结果缓存（线程安全），写入图谱后整体失效"""
+    
+    def __init__(self, max_items: int, ttl: float):
+        self.max_items = max_items
+        self.ttl = ttl
+        self._data: "OrderedDict[tuple, Tuple[float, Any]]" = OrderedDict()
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, key: tuple) -> Tuple[bool, Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._data.move_to_end(key)
+                self.hits += 1
+                return True, entry[1]
+            if entry is not None:
+                del self._data[key]
+            self.misses += 1
+            return False, None
+    
+    def put(self, key: tuple, value: Any):
+        with self._lock:
+            self._data[key] = (time.monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_items:
+                self._data.popitem(last=False)
+    
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+    
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "max_items": self.max_items,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+            }
+
+
+_query_cache = _QueryCache(QUERY_CACHE_MAX_ITEMS, QUERY_CACHE_TTL)
+
+
+def _cache_key(func, args: tuple, kwargs: Dict[str, Any]) -> tuple:
+    """缓存键：方法名 + 查询参数（复用的 session 不参与计算）"""
+    return (func.__name__, args, tuple(sorted((k, v) for k, v in kwargs.items() if k != 'session')))
+
+
+def _cached_read(func):
+    """以 (方法名, 参数) 为键缓存只读查询结果；未连接时不缓存"""
+    if inspect.iscoroutinefunction(func):
+        @functools.wraps(func)
+        async def async_wrapper(self, *args, **kwargs):
+            if not self._async_driver:
+                return await func(self, *args, **kwargs)
+            key = _cache_key(func, args, kwargs)
+            found, value = _query_cache.get(key)
+            if found:
+                return value
+            value = await func(self, *args, **kwargs)
+            _query_cache.put(key, value)
+            return value
+        return async_wrapper
+    
+    @functools.wraps(func)
+    def wrapper(self, *args, **kwargs):
+        if not self._driver:
+            return func(self, *args, **kwargs)
+        key = _cache_key(func, args, kwargs)
+        found, value = _query_cache.get(key)
+        if found:
+            return value
+        value = func(self, *args, **kwargs)
+        _query_cache.put(key, value)
+        return value
+    return wrapper
+
 
 class Neo4jClient:
     """Neo4j 图数据库客户端"""
     
     _instance = None
+    _lock = threading.Lock()
     
     def __new__(cls):
+        # 双重检查加锁：并发初始化时只创建一次实例，避免后来者把已建立的驱动重置为 None
         if cls._instance is None:
-            cls._instance = super().__new__(cls)
-            cls._instance._driver = None
+            with cls._lock:
+                if cls._instance is None:
+                    instance = super().__new__(cls)
+                    instance._driver = None
+                    instance._async_driver = None  # 供 FastAPI 异步路径使用，不阻塞事件循环
+                    instance._has_apoc = None  # 是否安装 APOC 插件，首次使用时探测
+                    instance._has_fulltext = None  # 名称全文索引是否可用，首次搜索时探测
+                    cls._instance = instance
         return cls._instance
     
     def connect(self) -> bool:
-        """连接到 Neo4j 数据库"""
+        """连接到 Neo4j 数据库（已连接时直接返回）"""
+        if self._driver is not None:
+            return True
         try:
             if not settings.NEO4J_ENABLED:
                 return False
             
-            self._driver = GraphDatabase.driver(
-                settings.NEO4J_URI,
-                auth=(settings.NEO4J_USER, settings.NEO4J_PASSWORD)
+            driver_kwargs = dict(
+                auth=(settings.NEO4J_USER, settings.NEO4J_PASSWORD),
+                max_connection_pool_size=settings.NEO4J_MAX_POOL_SIZE,
+                connection_acquisition_timeout=settings.NEO4J_CONN_ACQ_TIMEOUT
             )
+            self._driver = GraphDatabase.driver(settings.NEO4J_URI, **driver_kwargs)
             # 测试连接
             self._driver.verify_connectivity()
+            # 异步驱动：长期持有，连接池在请求间复用
+            self._async_driver = AsyncGraphDatabase.driver(settings.NEO4J_URI, **driver_kwargs)
             print(f"[Neo4j] 成功连接到 {settings.NEO4J_URI}")
             return True
         except Exception as e:
             print(f"[Neo4j] 连接失败: {e}")
             self._driver = None
+            self._async_driver = None
             return False
     
     def close(self):
@@ -46,6 +365,42 @@ class Neo4jClient:
             self._driver.close()
             self._driver = None
     
+    async def close_async(self):
+        """关闭异步驱动连接"""
+        if self._async_driver:
+            await self._async_driver.close()
+            self._async_driver = None
+    
+    def session_scope(self):
+        """打开一个同步会话（调用方负责 with 管理生命周期）"""
+        return self._driver.session(database=settings.NEO4J_DATABASE)
+    
+    def async_session_scope(self):
+        """打开一个异步会话（调用方负责 async with 管理生命周期）"""
+        return self._async_driver.session(database=settings.NEO4J_DATABASE)
+    
+    @contextmanager
+    def _use_session(self, session=None):
+        """复用调用方传入的会话；未传入时临时打开一个"""
+        if session is not None:
+            yield session
+            return
+        with self.session_scope() as new_session:
+            yield new_session
+    
+    @asynccontextmanager
+    async def _use_async_session(self, session=None):
+        """_use_session 的异步版本"""
+        if session is not None:
+            yield session
+            return
+        async with self.async_session_scope() as new_session:
+            yield new_session
+    
+    def cache_stats(self) -> Dict[str, Any]:
+        """只读查询缓存的命中统计"""
+        return _query_cache.stats()
+    
     def is_connected(self) -> bool:
         """检查是否已连接"""
         return self._driver is not None
@@ -55,7 +410,7 @@ class Neo4jClient:
         if not self._driver:
             return
         
-        with self._driver.session() as session:
+        with self.session_scope() as session:
             # 创建实体 ID 唯一约束
             try:
                 session.run("""
@@ -76,190 +431,313 @@ class Neo4jClient:
                     CREATE INDEX entity_category IF NOT EXISTS
                     FOR (e:Entity) ON (e.category)
                 """)
+                # 按图谱查询/清理的热点路径都以 graph_id 过滤
+                session.run("""
+                    CREATE INDEX entity_graph_id IF NOT EXISTS
+                    FOR (e:Entity) ON (e.graph_id)
+                """)
+                session.run("""
+                    CREATE INDEX entity_graph_type IF NOT EXISTS
+                    FOR (e:Entity) ON (e.graph_id, e.type)
+                """)
                 print("[Neo4j] 索引创建成功")
             except Exception as e:
                 print(f"[Neo4j] 索引创建失败: {e}")
+            
+            # 实体名称全文索引（search_entities 使用）
+            try:
+                session.run("""
+                    CREATE FULLTEXT INDEX entity_name_ft IF NOT EXISTS
+                    FOR (e:Entity) ON EACH [e.name]
+                """)
+                print("[Neo4j] 全文索引创建成功")
+            except Exception as e:
+                print(f"[Neo4j] 全文索引创建失败: {e}")
+    
+    def _delete_graph(self, session, graph_id: str):
+        """
+        删除指定图谱的全部节点（DETACH DELETE 连带删除关系）
+        有 APOC 时分批提交，避免大图谱单事务占用过多内存；否则退回普通 DETACH DELETE
+        """
+        if self._has_apoc is not False:
+            try:
+                session.run(DELETE_GRAPH_APOC_CYPHER, graph_id=graph_id).consume()
+                self._has_apoc = True
+                return
+            except ClientError as e:
+                print(f"[Neo4j] APOC 不可用，使用普通 DETACH DELETE: {e}")
+                self._has_apoc = False
+        
+        session.execute_write(
+            lambda tx: tx.run(DELETE_GRAPH_CYPHER, graph_id=graph_id).consume()
+        )
+    
+    async def _delete_graph_async(self, session, graph_id: str):
+        """_delete_graph 的异步版本"""
+        if self._has_apoc is not False:
+            try:
+                result = await session.run(DELETE_GRAPH_APOC_CYPHER, graph_id=graph_id)
+                await result.consume()
+                self._has_apoc = True
+                return
+            except ClientError as e:
+                print(f"[Neo4j] APOC 不可用，使用普通 DETACH DELETE: {e}")
+                self._has_apoc = False
+        
+        async def _delete(tx):
+            result = await tx.run(DELETE_GRAPH_CYPHER, graph_id=graph_id)
+            await result.consume()
+        
+        await session.execute_write(_delete)
+    
+    @staticmethod
+    def _iterate_writes(entities_payload: List[Dict], relationships_payload: List[Dict]):
+        """apoc.periodic.iterate 写入步骤：(单行语句, 数据, 是否并行)"""
+        return (
+            (ENTITY_ROW_ACTION_WITH_LABELS, entities_payload, True),
+            (RELATIONSHIP_ROW_ACTION, relationships_payload, False),
+        )
     
-    def save_graph(self, school: str, college: str, major: str, 
-                   entities: List[Dict], relationships: List[Dict]):
+    def save_graph(self, school: str, college: str, major: str,
+                   entities: List[Dict], relationships: List[Dict], session=None):
         """保存知识图谱到 Neo4j"""
         if not self._driver:
             return False
         
-        graph_id = f"{school}_{college}_{major}"
+        graph_id = _graph_id(school, college, major)
+        entities_payload, relationships_payload = _build_payloads(
+            graph_id, school, college, major, entities, relationships
+        )
         
-        with self._driver.session() as session:
-            # 清除旧的图谱数据
-            session.run("""
-                MATCH (e:Entity)-[r]->(t:Entity)
-                WHERE e.graph_id = $graph_id
-                DELETE r, e, t
-            """, graph_id=graph_id)
-            
-            # 创建实体节点
-            for entity in entities:
-                session.run("""
-                    MERGE (e:Entity {id: $id})
-                    SET e.name = $name,
-                        e.type = $type,
-                        e.category = $category,
-                        e.graph_id = $graph_id,
-                        e.school = $school,
-                        e.college = $college,
-                        e.major = $major
-                """, 
-                    id=entity.get('id'),
-                    name=entity.get('name'),
-                    type=entity.get('type'),
-                    category=entity.get('category', ''),
-                    graph_id=graph_id,
-                    school=school,
-                    college=college,
-                    major=major
-                )
+        def _write(tx):
+            # 创建实体节点（UNWIND 批量写入，每批一次往返）
+            for statement, rows in entity_statements:
+                for i in range(0, len(rows), WRITE_BATCH_SIZE):
+                    tx.run(statement, batch=rows[i:i + WRITE_BATCH_SIZE])
             
             # 创建关系
-            for rel in relationships:
-                session.run("""
-                    MATCH (head:Entity {id: $head_id})
-                    MATCH (tail:Entity {id: $tail_id})
-                    MERGE (head)-[r:RELATES {type: $relation}]->(tail)
-                    SET r.relation = $relation
-                """,
-                    head_id=rel.get('head'),
-                    tail_id=rel.get('tail'),
-                    relation=rel.get('relation')
-                )
+            for i in range(0, len(relationships_payload), WRITE_BATCH_SIZE):
+                tx.run(MERGE_RELATIONSHIPS_CYPHER, batch=relationships_payload[i:i + WRITE_BATCH_SIZE])
         
+        with self._use_session(session) as session:
+            # 清除旧的图谱数据
+            self._delete_graph(session, graph_id)
+            # 删除步骤已探测 APOC 是否可用
+            if self._has_apoc and len(entities_payload) >= APOC_ITERATE_MIN_ROWS:
+                for action, batch, parallel in self._iterate_writes(entities_payload, relationships_payload):
+                    record = session.run(ITERATE_WRITE_CYPHER, action=action, batch=batch, parallel=parallel).single()
+                    _report_iterate_failures(record)
+            else:
+                entity_statements = _entity_write_statements(entities_payload, bool(self._has_apoc))
+                # 整张图谱在单个写事务内完成，只提交一次
+                session.execute_write(_write)
+        
+        # 图谱已变更，清空只读查询缓存
+        _query_cache.clear()
         return True
     
-    def load_graph(self, school: str, college: str, major: str) -> Optional[Dict]:
+    async def save_graph_async(self, school: str, college: str, major: str,
+                               entities: List[Dict], relationships: List[Dict], session=None):
+        """保存知识图谱到 Neo4j（异步）"""
+        if not self._async_driver:
+            return False
+        
+        graph_id = _graph_id(school, college, major)
+        entities_payload, relationships_payload = _build_payloads(
+            graph_id, school, college, major, entities, relationships
+        )
+        
+        async def _write(tx):
+            for statement, rows in entity_statements:
+                for i in range(0, len(rows), WRITE_BATCH_SIZE):
+                    result = await tx.run(statement, batch=rows[i:i + WRITE_BATCH_SIZE])
+                    await result.consume()
+            
+            for i in range(0, len(relationships_payload), WRITE_BATCH_SIZE):
+                result = await tx.run(MERGE_RELATIONSHIPS_CYPHER, batch=relationships_payload[i:i + WRITE_BATCH_SIZE])
+                await result.consume()
+        
+        async with self._use_async_session(session) as session:
+            await self._delete_graph_async(session, graph_id)
+            if self._has_apoc and len(entities_payload) >= APOC_ITERATE_MIN_ROWS:
+                for action, batch, parallel in self._iterate_writes(entities_payload, relationships_payload):
+                    result = await session.run(ITERATE_WRITE_CYPHER, action=action, batch=batch, parallel=parallel)
+                    _report_iterate_failures(await result.single())
+            else:
+                entity_statements = _entity_write_statements(entities_payload, bool(self._has_apoc))
+                await session.execute_write(_write)
+        
+        _query_cache.clear()
+        return True
+    
+    def load_graph(self, school: str, college: str, major: str, session=None) -> Optional[Dict]:
         """从 Neo4j 加载知识图谱"""
         if not self._driver:
             return None
         
-        graph_id = f"{school}_{college}_{major}"
+        graph_id = _graph_id(school, college, major)
+        
+        params = {"graph_id": graph_id}
         
-        with self._driver.session() as session:
+        with self._use_session(session) as session:
             # 查询实体
-            entities_result = session.run("""
-                MATCH (e:Entity)
-                WHERE e.graph_id = $graph_id
-                RETURN e.id as id, e.name as name, 
-                       e.type as type, e.category as category
-            """, graph_id=graph_id)
-            
-            entities = [dict(record) for record in entities_result]
+            entities = session.execute_read(_read_records, LOAD_ENTITIES_CYPHER, params)
             
             if not entities:
                 return None
             
             # 查询关系
-            relationships_result = session.run("""
-                MATCH (head:Entity)-[r:RELATES]->(tail:Entity)
-                WHERE head.graph_id = $graph_id
-                RETURN head.id as head, r.relation as relation, tail.id as tail
-            """, graph_id=graph_id)
+            relationships = session.execute_read(_read_records, LOAD_RELATIONSHIPS_CYPHER, params)
             
-            relationships = [dict(record) for record in relationships_result]
+            return {
+                "entities": entities,
+                "relationships": relationships
+            }
+    
+    async def load_graph_async(self, school: str, college: str, major: str, session=None) -> Optional[Dict]:
+        """从 Neo4j 加载知识图谱（异步）"""
+        if not self._async_driver:
+            return None
+        
+        graph_id = _graph_id(school, college, major)
+        
+        params = {"graph_id": graph_id}
+        
+        async with self._use_async_session(session) as session:
+            entities = await session.execute_read(_read_records_async, LOAD_ENTITIES_CYPHER, params)
+            
+            if not entities:
+                return None
+            
+            relationships = await session.execute_read(_read_records_async, LOAD_RELATIONSHIPS_CYPHER, params)
             
             return {
                 "entities": entities,
                 "relationships": relationships
             }
     
-    def get_graph_stats(self, school: str = None, college: str = None, major: str = None) -> Dict:
+    def has_graph(self, school: str, college: str, major: str, session=None) -> bool:
+        """检查图谱是否存在（只查询一个节点，不加载整图）"""
+        if not self._driver:
+            return False
+        
+        graph_id = _graph_id(school, college, major)
+        
+        with self._use_session(session) as session:
+            return bool(session.execute_read(_read_records, HAS_GRAPH_CYPHER, {"graph_id": graph_id}))
+    
+    async def has_graph_async(self, school: str, college: str, major: str, session=None) -> bool:
+        """检查图谱是否存在（异步）"""
+        if not self._async_driver:
+            return False
+        
+        graph_id = _graph_id(school, college, major)
+        
+        async with self._use_async_session(session) as session:
+            return bool(await session.execute_read(_read_records_async, HAS_GRAPH_CYPHER, {"graph_id": graph_id}))
+    
+    @_cached_read
+    def get_graph_stats(self, school: str = None, college: str = None, major: str = None,
+                        session=None) -> Dict:
         """获取图谱统计信息"""
         if not self._driver:
             return {"error": "Not connected"}
         
-        with self._driver.session() as session:
-            # 构建查询条件
-            where_clause = ""
-            params = {}
-            if school:
-                where_clause = "WHERE e.school = $school"
-                params['school'] = school
-            
+        params = {"school": school or None}
+        
+        with self._use_session(session) as session:
             # 统计实体
-            entity_result = session.run(f"""
-                MATCH (e:Entity)
-                {where_clause}
-                RETURN count(e) as total,
-                       count(DISTINCT e.type) as types,
-                       count(DISTINCT e.graph_id) as graphs
-            """, **params)
-            
-            stats = dict(entity_result.single())
+            stats = session.execute_read(_read_records, ENTITY_STATS_CYPHER, params)[0]
             
             # 统计关系
-            rel_result = session.run(f"""
-                MATCH (e:Entity)-[r:RELATES]->(t:Entity)
-                {where_clause.replace('e.', 'e.').replace('WHERE', 'WHERE e.') if where_clause else ''}
-                RETURN count(r) as relationships
-            """, **params)
+            stats['relationships'] = session.execute_read(_read_records, RELATIONSHIP_STATS_CYPHER, params)[0]['relationships']
+            
+            return stats
+    
+    @_cached_read
+    async def get_graph_stats_async(self, school: str = None, college: str = None, major: str = None,
+                                    session=None) -> Dict:
+        """获取图谱统计信息（异步）"""
+        if not self._async_driver:
+            return {"error": "Not connected"}
+        
+        params = {"school": school or None}
+        
+        async with self._use_async_session(session) as session:
+            stats = (await session.execute_read(_read_records_async, ENTITY_STATS_CYPHER, params))[0]
             
-            stats['relationships'] = rel_result.single()['relationships']
+            rel_rows = await session.execute_read(_read_records_async, RELATIONSHIP_STATS_CYPHER, params)
+            stats['relationships'] = rel_rows[0]['relationships']
             
             return stats
     
-    def search_entities(self, keyword: str, entity_type: str = None) -> List[Dict]:
+    @_cached_read
+    def search_entities(self, keyword: str, entity_type: str = None, session=None) -> List[Dict]:
         """搜索实体"""
         if not self._driver:
             return []
         
-        with self._driver.session() as session:
-            if entity_type:
-                result = session.run("""
-                    MATCH (e:Entity)
-                    WHERE e.name CONTAINS $keyword AND e.type = $type
-                    RETURN e.id as id, e.name as name, 
-                           e.type as type, e.category as category,
-                           e.school as school, e.major as major
-                    LIMIT 20
-                """, keyword=keyword, type=entity_type)
-            else:
-                result = session.run("""
-                    MATCH (e:Entity)
-                    WHERE e.name CONTAINS $keyword
-                    RETURN e.id as id, e.name as name, 
-                           e.type as type, e.category as category,
-                           e.school as school, e.major as major
-                    LIMIT 20
-                """, keyword=keyword)
+        with self._use_session(session) as session:
+            if self._has_fulltext is not False:
+                try:
+                    rows = session.execute_read(_read_records, SEARCH_ENTITIES_FULLTEXT_CYPHER, {
+                        "query": _fulltext_phrase(keyword), "type": entity_type,
+                    })
+                    self._has_fulltext = True
+                    return rows
+                except ClientError as e:
+                    print(f"[Neo4j] 全文索引不可用，使用 CONTAINS 扫描: {e}")
+                    self._has_fulltext = False
             
-            return [dict(record) for record in result]
+            return session.execute_read(_read_records, SEARCH_ENTITIES_SCAN_CYPHER, {
+                "keyword": keyword, "type": entity_type,
+            })
     
-    def get_related_entities(self, entity_id: str, relation_type: str = None, 
-                             depth: int = 1) -> List[Dict]:
+    @_cached_read
+    def get_related_entities(self, entity_id: str, relation_type: str = None,
+                             depth: int = 1, session=None) -> List[Dict]:
         """获取相关实体（图遍历）"""
         if not self._driver:
             return []
         
-        with self._driver.session() as session:
-            if relation_type:
-                result = session.run("""
-                    MATCH path = (e:Entity {id: $entity_id})-[r:RELATES*1..$depth]->(related:Entity)
-                    WHERE ALL(rel IN r WHERE rel.relation = $relation_type)
-                    RETURN related.id as id, related.name as name, 
-                           related.type as type, length(path) as distance
-                    LIMIT 50
-                """, entity_id=entity_id, relation_type=relation_type, depth=depth)
-            else:
-                result = session.run("""
-                    MATCH path = (e:Entity {id: $entity_id})-[r:RELATES*1..$depth]->(related:Entity)
-                    RETURN related.id as id, related.name as name, 
-                           related.type as type, length(path) as distance
-                    LIMIT 50
-                """, entity_id=entity_id, depth=depth)
+        depth = max(1, int(depth))
+        params = {"entity_id": entity_id, "relation_type": relation_type, "depth": depth}
+        
+        with self._use_session(session) as session:
+            if self._has_apoc is not False:
+                try:
+                    # maxLevel 作为运行时参数传入，不同深度共用同一个查询计划
+                    rows = session.execute_read(_read_records, RELATED_ENTITIES_APOC_CYPHER, {
+                        **params,
+                        # 无关系过滤时每个节点只取最短路径；有过滤时需保留所有路径以免漏掉符合条件的路径
+                        "uniqueness": "RELATIONSHIP_PATH" if relation_type else "NODE_GLOBAL",
+                    })
+                    self._has_apoc = True
+                    return rows
+                except ClientError as e:
+                    print(f"[Neo4j] APOC 不可用，使用变长路径匹配: {e}")
+                    self._has_apoc = False
             
-            return [dict(record) for record in result]
+            # 变长模式的上下界不能参数化，depth 已校验为整数后直接拼入
+            return session.execute_read(_read_records, RELATED_ENTITIES_CYPHER_TEMPLATE % depth, params)
 
 
 # 全局实例
 neo4j_client = Neo4jClient()
 
 
+async def neo4j_session():
+    """
+    FastAPI 依赖：为单个请求提供一个 Neo4j 异步会话，请求内多次调用共用
+    未连接时返回 None，各方法会按未连接处理
+    """
+    if not neo4j_client._async_driver:
+        yield None
+        return
+    async with neo4j_client.async_session_scope() as session:
+        yield session
+
+
 def init_neo4j():
     """初始化 Neo4j 连接"""
     if neo4j_client.connect():
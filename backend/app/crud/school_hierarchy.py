@@ -3,8 +3,9 @@ School Hierarchy CRUD Operations
 """
 from typing import List, Dict, Set, Optional
 from sqlalchemy.orm import Session
-from sqlalchemy import distinct
-from collections import defaultdict
+from sqlalchemy import delete, distinct, func, insert, select
+from itertools import groupby
+from operator import itemgetter
 
 from app.models.school_hierarchy import SchoolHierarchy
 
@@ -20,23 +21,20 @@ def refresh_hierarchy_cache(db: Session, hierarchy_data: Dict[str, Dict[str, Lis
     Returns:
         插入的记录数
     """
-    # 清空旧数据
-    db.query(SchoolHierarchy).delete()
+    payload = [
+        {"school": school, "college": college, "major": major}
+        for school, colleges in hierarchy_data.items()
+        for college, majors in colleges.items()
+        for major in majors
+    ]
     
-    count = 0
-    for school, colleges in hierarchy_data.items():
-        for college, majors in colleges.items():
-            for major in majors:
-                db_record = SchoolHierarchy(
-                    school=school,
-                    college=college,
-                    major=major
-                )
-                db.add(db_record)
-                count += 1
+    # 清空旧数据并批量插入（executemany），同一事务内完成
+    db.execute(delete(SchoolHierarchy))
+    if payload:
+        db.execute(insert(SchoolHierarchy), payload)
     
     db.commit()
-    return count
+    return len(payload)
 
 
 def get_all_schools(db: Session) -> List[str]:
@@ -64,19 +62,22 @@ def get_majors_by_college(db: Session, school: str, college: str) -> List[str]:
 
 def get_full_hierarchy(db: Session) -> Dict[str, Dict[str, List[str]]]:
     """获取完整层级结构"""
-    records = db.query(SchoolHierarchy).all()
+    # 由数据库排序（utf8mb4_bin 按码点比较，与 Python 字符串排序一致），单次查询取回三列
+    stmt = select(
+        SchoolHierarchy.school, SchoolHierarchy.college, SchoolHierarchy.major
+    ).order_by(
+        SchoolHierarchy.school.collate("utf8mb4_bin"),
+        SchoolHierarchy.college.collate("utf8mb4_bin"),
+        SchoolHierarchy.major.collate("utf8mb4_bin"),
+    )
+    rows = db.execute(stmt).all()
     
-    hierarchy = defaultdict(lambda: defaultdict(list))
-    for record in records:
-        hierarchy[record.school][record.college].append(record.major)
-    
-    # 转换为普通 dict 并排序
     return {
         school: {
-            college: sorted(majors)
-            for college, majors in colleges.items()
+            college: [row[2] for row in college_rows]
+            for college, college_rows in groupby(school_rows, key=itemgetter(1))
         }
-        for school, colleges in sorted(hierarchy.items())
+        for school, school_rows in groupby(rows, key=itemgetter(0))
     }
 
 
@@ -87,9 +88,12 @@ def is_cache_empty(db: Session) -> bool:
 
 def get_cache_stats(db: Session) -> Dict[str, int]:
     """获取缓存统计信息"""
-    total = db.query(SchoolHierarchy).count()
-    schools = db.query(distinct(SchoolHierarchy.school)).count()
-    colleges = db.query(distinct(SchoolHierarchy.college)).count()
+    # 一次查询同时取回三个计数
+    total, schools, colleges = db.execute(select(
+        func.count(),
+        func.count(distinct(SchoolHierarchy.school)),
+        func.count(distinct(SchoolHierarchy.college)),
+    ).select_from(SchoolHierarchy)).one()
     
     return {
         "total_records": total,
@@ -2,14 +2,31 @@
 Training Plan CRUD Operations
 """
 from typing import List, Optional
-from sqlalchemy.orm import Session
-from sqlalchemy import desc
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import desc, func, select
 from app.models.training_plan import TrainingPlan
 from app.schemas.training_plan import TrainingPlanCreate, TrainingPlanUpdate
 
 
-def create_training_plan(
-    db: Session,
+# 列表接口的列投影：与 TrainingPlan.to_dict() 字段一致，不加载 extracted_content 等大字段
+LIST_COLUMNS = (
+    TrainingPlan.id,
+    TrainingPlan.school,
+    TrainingPlan.college,
+    TrainingPlan.major,
+    TrainingPlan.original_filename,
+    TrainingPlan.file_size,
+    TrainingPlan.file_type,
+    TrainingPlan.content_length,
+    TrainingPlan.description,
+    TrainingPlan.is_active,
+    TrainingPlan.created_at,
+    TrainingPlan.updated_at,
+)
+
+
+async def create_training_plan(
+    db: AsyncSession,
     school: str,
     college: str,
     major: str,
@@ -34,104 +51,130 @@ def create_training_plan(
         extracted_content=extracted_content,
         content_length=len(extracted_content) if extracted_content else 0,
         description=description,
-        is_active=1
+        is_active=1,
+        updated_at=None
     )
     db.add(db_plan)
-    db.commit()
-    db.refresh(db_plan)
+    await db.commit()
+    # created_at 由服务端 now() 生成（与已有数据同一时区）；MySQL 不支持 INSERT ... RETURNING，
+    # 只回读这一列，而不是整行 refresh；自增 id 由 lastrowid 回填
+    await db.refresh(db_plan, attribute_names=["created_at"])
     return db_plan
 
 
-def get_training_plan_by_id(db: Session, plan_id: int) -> Optional[TrainingPlan]:
+async def get_training_plan_by_id(db: AsyncSession, plan_id: int) -> Optional[TrainingPlan]:
     """根据ID获取培养方案"""
-    return db.query(TrainingPlan).filter(
+    stmt = select(TrainingPlan).where(
         TrainingPlan.id == plan_id,
         TrainingPlan.is_active == 1
-    ).first()
+    ).limit(1)
+    return (await db.execute(stmt)).scalars().first()
 
 
-def get_training_plans(
-    db: Session,
+async def get_training_plans(
+    db: AsyncSession,
     school: Optional[str] = None,
     college: Optional[str] = None,
     major: Optional[str] = None,
     skip: int = 0,
     limit: int = 100
-) -> tuple[List[TrainingPlan], int]:
-    """获取培养方案列表，返回数据和总数"""
-    query = db.query(TrainingPlan).filter(TrainingPlan.is_active == 1)
+) -> tuple[List[dict], int]:
+    """获取培养方案列表（列投影，返回字典），返回数据和总数"""
+    conditions = [TrainingPlan.is_active == 1]
     
     if school:
-        query = query.filter(TrainingPlan.school == school)
+        conditions.append(TrainingPlan.school == school)
     if college:
-        query = query.filter(TrainingPlan.college == college)
+        conditions.append(TrainingPlan.college == college)
     if major:
-        query = query.filter(TrainingPlan.major == major)
+        conditions.append(TrainingPlan.major == major)
     
-    # 获取总数
-    total = query.count()
+    # 单次查询：COUNT(*) OVER() 随分页结果一并返回总数
+    stmt = (
+        select(*LIST_COLUMNS, func.count().over().label("total"))
+        .where(*conditions)
+        .order_by(desc(TrainingPlan.created_at))
+        .offset(skip)
+        .limit(limit)
+    )
+    rows = (await db.execute(stmt)).mappings().all()
+    
+    if rows:
+        total = rows[0]["total"]
+    elif skip:
+        # 页码越界时窗口函数无行可返回，退回单独计数
+        total = (await db.execute(
+            select(func.count()).select_from(TrainingPlan).where(*conditions)
+        )).scalar_one()
+    else:
+        total = 0
     
-    # 分页查询，按创建时间倒序
-    plans = query.order_by(desc(TrainingPlan.created_at)).offset(skip).limit(limit).all()
+    plans = [
+        {column.key: row[column.key] for column in LIST_COLUMNS}
+        for row in rows
+    ]
     
     return plans, total
 
 
-def get_latest_training_plan(
-    db: Session,
+async def get_latest_training_plan(
+    db: AsyncSession,
     school: str,
     college: str,
     major: str
 ) -> Optional[TrainingPlan]:
     """获取指定学校-专业最新的培养方案"""
-    return db.query(TrainingPlan).filter(
+    stmt = select(TrainingPlan).where(
         TrainingPlan.school == school,
         TrainingPlan.college == college,
         TrainingPlan.major == major,
         TrainingPlan.is_active == 1
-    ).order_by(desc(TrainingPlan.created_at)).first()
+    ).order_by(desc(TrainingPlan.created_at)).limit(1)
+    return (await db.execute(stmt)).scalars().first()
 
 
-def update_training_plan(
-    db: Session,
+async def update_training_plan(
+    db: AsyncSession,
     plan_id: int,
     update_data: TrainingPlanUpdate
 ) -> Optional[TrainingPlan]:
     """更新培养方案信息"""
-    db_plan = get_training_plan_by_id(db, plan_id)
+    db_plan = await get_training_plan_by_id(db, plan_id)
     if not db_plan:
         return None
     
     if update_data.description is not None:
         db_plan.description = update_data.description
     
-    db.commit()
-    db.refresh(db_plan)
+    await db.commit()
+    await db.refresh(db_plan)
     return db_plan
 
 
-def delete_training_plan(db: Session, plan_id: int) -> bool:
+async def delete_training_plan(db: AsyncSession, plan_id: int) -> bool:
     """软删除培养方案"""
-    db_plan = get_training_plan_by_id(db, plan_id)
+    db_plan = await get_training_plan_by_id(db, plan_id)
     if not db_plan:
         return False
     
     db_plan.is_active = 0
-    db.commit()
+    await db.commit()
     return True
 
 
-def get_plans_by_school(db: Session, school: str) -> List[TrainingPlan]:
-    """获取指定学校的所有培养方案"""
-    return db.query(TrainingPlan).filter(
-        TrainingPlan.school == school,
-        TrainingPlan.is_active == 1
-    ).order_by(desc(TrainingPlan.created_at)).all()
+async def get_plans_by_school(db: AsyncSession, school: str) -> List[dict]:
+    """获取指定学校的所有培养方案（列投影，返回字典）"""
+    stmt = (
+        select(*LIST_COLUMNS)
+        .where(TrainingPlan.school == school, TrainingPlan.is_active == 1)
+        .order_by(desc(TrainingPlan.created_at))
+    )
+    return [dict(row) for row in (await db.execute(stmt)).mappings()]
 
 
-def get_all_schools_with_plans(db: Session) -> List[str]:
+async def get_all_schools_with_plans(db: AsyncSession) -> List[str]:
     """获取所有有培养方案的学校列表"""
-    results = db.query(TrainingPlan.school).filter(
+    stmt = select(TrainingPlan.school).where(
         TrainingPlan.is_active == 1
-    ).distinct().all()
-    return [r[0] for r in results]
+    ).distinct()
+    return list((await db.execute(stmt)).scalars())
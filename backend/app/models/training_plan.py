@@ -1,7 +1,7 @@
 """
 Training Plan Model - 培养方案模型
 """
-from sqlalchemy import Column, Integer, String, Text, DateTime, BigInteger
+from sqlalchemy import Column, Integer, String, Text, DateTime, BigInteger, Index
 from sqlalchemy.sql import func
 from app.core.database import Base
 
@@ -36,6 +36,14 @@ class TrainingPlan(Base):
     created_at = Column(DateTime(timezone=True), server_default=func.now(), comment="上传时间")
     updated_at = Column(DateTime(timezone=True), onupdate=func.now(), comment="更新时间")
     
+    # 复合索引：覆盖列表查询的筛选条件与按创建时间倒序排序
+    __table_args__ = (
+        Index(
+            'ix_training_plans_active_scope_created',
+            'is_active', 'school', 'college', 'major', created_at.desc()
+        ),
+    )
+    
     def __repr__(self):
         return f"<TrainingPlan(id={self.id}, school={self.school}, major={self.major})>"
     
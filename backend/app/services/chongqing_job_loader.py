@@ -1,10 +1,31 @@
 """
 重庆市招聘职位数据加载器
 """
+import numpy as np
 import pandas as pd
 import os
 import re
-from typing import List, Dict, Any
+import threading
+from collections import defaultdict
+from functools import lru_cache
+from typing import List, Dict, Any, Iterable
+
+# 需求专业倒排索引的 n-gram 长度范围
+NGRAM_MIN = 2
+NGRAM_MAX = 4
+_EMPTY_POSITIONS = np.empty(0, dtype=np.int64)
+
+# 清洗后数据的 parquet 缓存文件后缀（与 CSV 同目录）
+PARQUET_CACHE_SUFFIX = '.parquet'
+
+# 低基数字段：转为 category，unique/nunique 只需处理类别
+CATEGORY_COLUMNS = ['职位类别', '学历要求', '单位所在地', '单位规模']
+
+# search_jobs_by_major 返回的职位字段
+JOB_RESULT_COLUMNS = [
+    '编号', '职位名称', '需求人数', '薪资', '职位类别', '学历要求',
+    '需求专业', '职位描述', '单位名称', '单位所在地', '单位规模',
+]
 
 
 class ChongqingJobLoader:
@@ -13,7 +34,13 @@ class ChongqingJobLoader:
     def __init__(self, data_dir: str):
         self.data_dir = data_dir
         self.jobs_df = None
+        self._major_values: List[str] = []  # 小写后的需求专业列（按行位置）
+        self._ngram_index: Dict[str, np.ndarray] = {}  # n-gram -> 行位置（升序）
+        self._result_df = None  # 已清洗为字符串的结果字段表，与 jobs_df 行位置对齐
         self._load_data()
+        self._optimize_dtypes()
+        self._build_major_index()
+        self._build_result_frame()
     
     def _load_data(self):
         """加载招聘数据"""
@@ -46,6 +73,11 @@ class ChongqingJobLoader:
                         print(f"[ChongqingJobLoader] 使用文件: {csv_files[0]}")
             
             if file_path and os.path.exists(file_path):
+                # 已清洗数据的 parquet 缓存比 CSV 新时直接读取，跳过编码探测与逐列清洗
+                cache_path = file_path + PARQUET_CACHE_SUFFIX
+                if self._load_parquet_cache(cache_path, file_path):
+                    return
+                
                 # 尝试不同编码
                 encodings = ['utf-8', 'gbk', 'gb2312', 'utf-8-sig']
                 for encoding in encodings:
@@ -61,12 +93,120 @@ class ChongqingJobLoader:
                         break
                     except Exception as e:
                         continue
+                
+                if self.jobs_df is not None:
+                    self._save_parquet_cache(cache_path)
             else:
                 print(f"[ChongqingJobLoader] 警告: 未找到数据文件")
                 
         except Exception as e:
             print(f"[ChongqingJobLoader] 加载数据错误: {e}")
     
+    def _load_parquet_cache(self, cache_path: str, csv_path: str) -> bool:
+        """读取 parquet 缓存（仅当缓存不旧于 CSV），成功返回 True"""
+        try:
+            if not os.path.exists(cache_path) or os.path.getmtime(cache_path) < os.path.getmtime(csv_path):
+                return False
+            self.jobs_df = pd.read_parquet(cache_path)
+            print(f"[ChongqingJobLoader] 从 parquet 缓存加载 {len(self.jobs_df)} 条招聘数据")
+            return True
+        except Exception as e:
+            print(f"[ChongqingJobLoader] 读取 parquet 缓存失败，重新解析 CSV: {e}")
+            self.jobs_df = None
+            return False
+    
+    def _save_parquet_cache(self, cache_path: str):
+        """把清洗后的数据写入 parquet 缓存（失败不影响正常使用）"""
+        try:
+            self.jobs_df.to_parquet(cache_path, compression='zstd')
+            print(f"[ChongqingJobLoader] 已写入 parquet 缓存: {cache_path}")
+        except Exception as e:
+            print(f"[ChongqingJobLoader] 写入 parquet 缓存失败: {e}")
+    
+    def _optimize_dtypes(self):
+        """
+        文本列转为 pyarrow 字符串（str 操作在 C++ 中执行），低基数字段转为 category
+        pyarrow 不可用时保留 object 列
+        """
+        if self.jobs_df is None:
+            return
+        
+        try:
+            self.jobs_df = self.jobs_df.convert_dtypes(dtype_backend='pyarrow')
+        except (ImportError, TypeError, ValueError) as e:
+            print(f"[ChongqingJobLoader] pyarrow 类型转换不可用，保留原始类型: {e}")
+        
+        for col in CATEGORY_COLUMNS:
+            if col in self.jobs_df.columns:
+                self.jobs_df[col] = self.jobs_df[col].astype('category')
+    
+    def _build_major_index(self):
+        """
+        为“需求专业”列构建 n-gram 倒排索引（加载时一次性构建）
+        子串查询转为倒排表查找，不再逐次扫描整列
+        """
+        if self.jobs_df is None or '需求专业' not in self.jobs_df.columns:
+            return
+        
+        self._major_values = self.jobs_df['需求专业'].fillna('').astype(str).str.lower().tolist()
+        postings = defaultdict(list)
+        for pos, value in enumerate(self._major_values):
+            grams = set()
+            for n in range(NGRAM_MIN, NGRAM_MAX + 1):
+                for i in range(len(value) - n + 1):
+                    grams.add(value[i:i + n])
+            for gram in grams:
+                postings[gram].append(pos)
+        
+        self._ngram_index = {gram: np.asarray(rows, dtype=np.int64) for gram, rows in postings.items()}
+        print(f"[ChongqingJobLoader] 需求专业倒排索引构建完成: {len(self._ngram_index)} 个 n-gram")
+    
+    def _build_result_frame(self):
+        """
+        加载时一次性把结果字段清洗为字符串（nan -> 空字符串，去首尾空白）
+        搜索时直接按行位置切片并 to_dict，无需逐行处理
+        """
+        if self.jobs_df is None:
+            return
+        
+        cleaned = {}
+        for col in JOB_RESULT_COLUMNS:
+            if col not in self.jobs_df.columns:
+                cleaned[col] = pd.Series('', index=self.jobs_df.index)
+                continue
+            raw = self.jobs_df[col]
+            text = raw.astype(str)
+            cleaned[col] = text.mask(raw.isna() | text.str.lower().eq('nan'), '').str.strip()
+        self._result_df = pd.DataFrame(cleaned, index=self.jobs_df.index)
+    
+    def _lookup_positions(self, keyword: str) -> np.ndarray:
+        """返回“需求专业”包含 keyword 的行位置（升序，忽略大小写）"""
+        kw = keyword.lower()
+        if len(kw) < NGRAM_MIN:
+            mask = self.jobs_df['需求专业'].str.contains(kw, na=False, case=False, regex=False)
+            return np.flatnonzero(mask.to_numpy())
+        if len(kw) <= NGRAM_MAX:
+            return self._ngram_index.get(kw, _EMPTY_POSITIONS)
+        
+        # 长关键词：各 NGRAM_MAX 片段的倒排表求交得到候选，再逐行校验子串
+        lists = [self._ngram_index.get(kw[i:i + NGRAM_MAX], _EMPTY_POSITIONS)
+                 for i in range(len(kw) - NGRAM_MAX + 1)]
+        lists.sort(key=len)
+        candidates = lists[0]
+        for rows in lists[1:]:
+            if not len(candidates):
+                break
+            candidates = np.intersect1d(candidates, rows, assume_unique=True)
+        values = self._major_values
+        return np.asarray([pos for pos in candidates if kw in values[pos]], dtype=np.int64)
+    
+    def _union_positions(self, keywords: Iterable[str]) -> np.ndarray:
+        """多个关键词命中行位置的并集（升序去重）"""
+        arrays = [self._lookup_positions(kw) for kw in keywords]
+        if not arrays:
+            return _EMPTY_POSITIONS
+        return np.unique(np.concatenate(arrays))
+    
     def _extract_keywords(self, major: str) -> List[str]:
         """
         从专业名称中提取关键词
@@ -125,60 +265,41 @@ class ChongqingJobLoader:
         print(f"[ChongqingJobLoader] 搜索专业 '{major}'，提取关键词: {keywords}")
         
         # 策略1: 精确匹配完整专业名
-        mask = self.jobs_df['需求专业'].str.contains(major, na=False, case=False, regex=False)
-        matched = self.jobs_df[mask]
-        print(f"[ChongqingJobLoader] 精确匹配 '{major}': {len(matched)} 条")
-        
-        # 策略2: 如果精确匹配不足，用关键词匹配
-        if len(matched) < 10 and keywords:
-            for kw in keywords:
-                if len(kw) >= 2:  # 至少2个字符
-                    kw_mask = self.jobs_df['需求专业'].str.contains(kw, na=False, case=False, regex=False)
-                    matched = pd.concat([matched, self.jobs_df[kw_mask]]).drop_duplicates()
-            print(f"[ChongqingJobLoader] 关键词匹配后: {len(matched)} 条")
+        exact_positions = self._lookup_positions(major)
+        matched_positions = exact_positions
+        # 各策略新增命中的行位置，按策略顺序拼接结果（精确匹配优先）
+        stage_positions = [exact_positions]
+        print(f"[ChongqingJobLoader] 精确匹配 '{major}': {len(exact_positions)} 条")
+        
+        # 策略2: 如果精确匹配不足，用关键词匹配（倒排表求并集）
+        if len(matched_positions) < 10 and keywords:
+            kw_positions = np.setdiff1d(
+                self._union_positions(kw for kw in keywords if len(kw) >= 2),  # 至少2个字符
+                matched_positions, assume_unique=True
+            )
+            stage_positions.append(kw_positions)
+            matched_positions = np.union1d(matched_positions, kw_positions)
+            print(f"[ChongqingJobLoader] 关键词匹配后: {len(matched_positions)} 条")
         
         # 策略3: 如果还不足，尝试匹配专业大类（如"电气类"）
-        if len(matched) < 5:
+        if len(matched_positions) < 5:
             # 提取专业大类名称（如"电气工程及其自动化" -> "电气"）
-            broad_keywords = [kw for kw in keywords if len(kw) >= 4]
-            for bkw in broad_keywords:
-                broad_mask = self.jobs_df['需求专业'].str.contains(bkw[:4], na=False, case=False, regex=False)
-                matched = pd.concat([matched, self.jobs_df[broad_mask]]).drop_duplicates()
-            print(f"[ChongqingJobLoader] 大类匹配后: {len(matched)} 条")
+            broad_keywords = {kw[:4] for kw in keywords if len(kw) >= 4}
+            broad_positions = np.setdiff1d(
+                self._union_positions(broad_keywords), matched_positions, assume_unique=True
+            )
+            stage_positions.append(broad_positions)
+            matched_positions = np.union1d(matched_positions, broad_positions)
+            print(f"[ChongqingJobLoader] 大类匹配后: {len(matched_positions)} 条")
+        
+        matched = self._result_df.iloc[np.concatenate(stage_positions)]
         
         if limit:
             matched = matched.head(limit)
         
-        # 转换为字典列表，过滤 nan 值
-        results = []
-        for _, row in matched.iterrows():
-            # 辅助函数：清理值，将 nan 转为空字符串
-            def clean_value(val):
-                if pd.isna(val) or str(val).lower() == 'nan':
-                    return ''
-                return str(val).strip()
-            
-            job_dict = {
-                '编号': clean_value(row.get('编号', '')),
-                '职位名称': clean_value(row.get('职位名称', '')),
-                '需求人数': clean_value(row.get('需求人数', '')),
-                '薪资': clean_value(row.get('薪资', '')),
-                '职位类别': clean_value(row.get('职位类别', '')),
-                '学历要求': clean_value(row.get('学历要求', '')),
-                '需求专业': clean_value(row.get('需求专业', '')),
-                '职位描述': clean_value(row.get('职位描述', '')),
-                '单位名称': clean_value(row.get('单位名称', '')),
-                '单位所在地': clean_value(row.get('单位所在地', '')),
-                '单位规模': clean_value(row.get('单位规模', '')),
-            }
-            
-            # 跳过职位名称为空的记录
-            if not job_dict['职位名称']:
-                continue
-                
-            results.append(job_dict)
-        
-        return results
+        # 跳过职位名称为空的记录
+        matched = matched[matched['职位名称'] != '']
+        return matched.to_dict(orient='records')
     
     def get_jobs_by_category(self, category: str, limit: int = 50) -> List[Dict[str, Any]]:
         """按职位类别获取职位"""
@@ -247,9 +368,9 @@ class ChongqingJobLoader:
         return "\n---\n".join(texts)
 
 
-# 全局实例
-def get_chongqing_loader():
-    """获取重庆市数据加载器实例"""
+@lru_cache(maxsize=1)
+def _create_chongqing_loader() -> ChongqingJobLoader:
+    """创建重庆市数据加载器（每个进程只执行一次）"""
     # 尝试多个可能的数据目录
     possible_paths = [
         "/app/data",
@@ -266,4 +387,13 @@ def get_chongqing_loader():
     return ChongqingJobLoader(possible_paths[0])
 
 
-chongqing_loader = get_chongqing_loader()
+_loader_lock = threading.Lock()
+
+
+def get_chongqing_loader() -> ChongqingJobLoader:
+    """
+    获取重庆市数据加载器实例（首次使用时才加载 CSV，而不是在 import 时）
+    加锁保证并发首次访问时只构建一次
+    """
+    with _loader_lock:
+        return _create_chongqing_loader()
@@ -1,54 +1,273 @@
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+import numpy as np
 import os
-from typing import List, Dict, Any
+import csv
+import hashlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import List, Dict, Any, Callable, Iterator, Optional
+
+# Cleaned frames are cached next to the CSVs as Feather (Arrow IPC) files.
+# A cache file is only trusted while it is not older than its source CSV.
+FEATHER_CACHE_SUFFIX = ".feather"
+# Versioned so caches written before empty cells were read as missing are re-parsed
+FRAME_CACHE_SUFFIX = ".v2" + FEATHER_CACHE_SUFFIX
+HIERARCHY_CACHE_PREFIX = ".hierarchy_"
+HIERARCHY_COLUMNS = ['school', 'college', 'major']
+
+# pyarrow CSV block size: memory is bounded per block while streaming a file
+CSV_BLOCK_SIZE = 16 * 1024 * 1024
+# Rows materialized per batch by the streaming search methods
+STREAM_BATCH_SIZE = 1000
+
+# Text columns filtered by substring search; kept as Arrow string arrays so
+# matching runs in Arrow's C++ kernels instead of per-row Python regex calls.
+SEARCH_COLUMNS = {
+    'jobs': ('需求专业',),
+    'talks': ('来源高校', '跟进部门'),
+    'fairs': ('主办单位',),
+}
+
+
+def _to_arrow_text(series: pd.Series) -> pa.Array:
+    """Convert a column to a lowercased Arrow string array (missing values become null)."""
+    return pc.utf8_lower(pa.array(series.astype('string'), type=pa.string()))
+
+
+def _match_mask(arr: pa.Array, pattern: str) -> np.ndarray:
+    """Literal substring match against a pre-lowercased array; nulls never match."""
+    mask = pc.match_substring(arr, pattern.lower())
+    return pc.fill_null(mask, False).to_numpy(zero_copy_only=False)
+
+
+def _read_gbk_csv(path: str, text_columns: tuple = (), category_columns: tuple = ()) -> pd.DataFrame:
+    """
+    Stream a GBK CSV through pyarrow's incremental reader, one block at a time.
+    Every column is read as a string (no per-block type inference, so dates stay
+    as written) and empty cells become missing values, as in pandas; headers
+    and `text_columns` are whitespace-trimmed per batch in Arrow, and pandas
+    conversion happens once at the end. `category_columns`
+    (heavily repeated names) are dictionary-encoded and arrive as pandas
+    categoricals, so each distinct string is stored once.
+    Falls back to the pandas C engine if pyarrow rejects the file.
+    """
+    try:
+        with open(path, encoding='gbk', newline='') as f:
+            header = next(csv.reader(f))
+        reader = pa_csv.open_csv(
+            path,
+            read_options=pa_csv.ReadOptions(encoding='gbk', block_size=CSV_BLOCK_SIZE),
+            convert_options=pa_csv.ConvertOptions(
+                column_types={name: pa.string() for name in header},
+                null_values=[""],
+                strings_can_be_null=True,
+            ),
+        )
+        names = [name.strip() for name in reader.schema.names]
+        trim = {names.index(col) for col in text_columns if col in names}
+        batches = []
+        for batch in reader:
+            columns = [
+                pc.utf8_trim_whitespace(column) if i in trim else column
+                for i, column in enumerate(batch.columns)
+            ]
+            batches.append(pa.RecordBatch.from_arrays(columns, names=names))
+    except (pa.ArrowInvalid, UnicodeDecodeError, StopIteration) as e:
+        print(f"[WARN] pyarrow failed to parse {path}, falling back to pandas: {e}")
+        # Same frame shape as the Arrow path: all-string columns, only empty cells missing
+        df = pd.read_csv(path, encoding='gbk', dtype=str, keep_default_na=False, na_values=[""])
+        df.columns = df.columns.str.strip()
+        for col in text_columns:
+            if col in df.columns:
+                df[col] = df[col].str.strip()
+        for col in category_columns:
+            if col in df.columns:
+                df[col] = df[col].astype('category')
+        return df
+
+    schema = pa.schema([(name, pa.string()) for name in names])
+    table = pa.Table.from_batches(batches, schema=schema)
+    del batches
+    for col in category_columns:
+        if col in names:
+            i = names.index(col)
+            table = table.set_column(i, col, pc.dictionary_encode(table.column(i)))
+    table = table.unify_dictionaries()
+    # self_destruct frees each Arrow column as soon as it is converted
+    return table.to_pandas(self_destruct=True, split_blocks=True)
+
+
+def _hierarchy_fingerprint(data_dir: str) -> Optional[str]:
+    """Short digest of the mtimes of the two CSVs the hierarchy is derived from."""
+    try:
+        key = ":".join(
+            str(os.stat(os.path.join(data_dir, name)).st_mtime_ns)
+            for name in ("职位.csv", "宣讲会.csv")
+        )
+    except OSError:
+        return None
+    return hashlib.md5(key.encode('utf-8')).hexdigest()[:16]
+
+
+class _ValueIndex:
+    """
+    Inverted index for one lowercased text column: distinct value -> row positions.
+    Columns such as school or major repeat heavily, so a substring query only has
+    to scan the distinct values and then gathers the postings of the hits.
+    """
+
+    def __init__(self, arr: pa.Array):
+        encoded = pc.dictionary_encode(arr)
+        self.values = encoded.dictionary
+        codes = pc.fill_null(encoded.indices, -1).to_numpy(zero_copy_only=False)
+        self._codes = codes
+        # Stable sort keeps each posting list in ascending row order
+        self._order = np.argsort(codes, kind='stable')
+        self._bounds = np.searchsorted(codes[self._order], np.arange(len(self.values) + 1))
+
+    def _postings(self, code: int) -> np.ndarray:
+        return self._order[self._bounds[code]:self._bounds[code + 1]]
+
+    def _gather(self, codes) -> np.ndarray:
+        if len(codes) == 1:
+            return self._postings(codes[0])
+        if len(codes) == 0:
+            return np.empty(0, dtype=np.int64)
+        return np.sort(np.concatenate([self._postings(c) for c in codes]))
+
+    def rows(self, pattern: str) -> np.ndarray:
+        """Ascending row positions whose value contains `pattern` (case-insensitive)."""
+        return self._gather(np.flatnonzero(_match_mask(self.values, pattern)))
+
+    def filter_rows(self, rows: np.ndarray, pattern: str) -> np.ndarray:
+        """Subset of `rows` whose value contains `pattern`; only those rows are checked."""
+        if len(rows) == 0 or len(self.values) == 0:
+            return rows[:0]
+        value_mask = _match_mask(self.values, pattern)
+        codes = self._codes[rows]
+        return rows[(codes >= 0) & value_mask[codes]]
+
 
 class DataLoader:
     def __init__(self, data_dir: str):
         self.data_dir = data_dir
+        self.jobs_path = os.path.join(data_dir, "职位.csv")
+        self.talks_path = os.path.join(data_dir, "宣讲会.csv")
+        self.fairs_path = os.path.join(data_dir, "招聘会.csv")
         self.jobs_df = None
         self.talks_df = None
         self.fairs_df = None
+        self._indexes: Dict[str, _ValueIndex] = {}
+        self._total_positions = 0
+        self._dataset_stats: Optional[Dict[str, int]] = None
         self._load_data()
+        self._build_indexes()
+        self._total_positions = self._count_positions()
 
     def _load_data(self):
         try:
-            # Paths
-            jobs_path = os.path.join(self.data_dir, "职位.csv")
-            talks_path = os.path.join(self.data_dir, "宣讲会.csv")
-            fairs_path = os.path.join(self.data_dir, "招聘会.csv")
-
-            # Load Jobs
-            if os.path.exists(jobs_path):
-                self.jobs_df = pd.read_csv(jobs_path, encoding='gbk', low_memory=False)
-                # Clean column names (strip whitespace)
-                self.jobs_df.columns = self.jobs_df.columns.str.strip()
-                # Ensure string type for matching columns
-                if '需求专业' in self.jobs_df.columns:
-                    self.jobs_df['需求专业'] = self.jobs_df['需求专业'].astype(str)
-                if '单位名称' in self.jobs_df.columns:
-                    self.jobs_df['单位名称'] = self.jobs_df['单位名称'].astype(str).str.strip()
-
-            # Load Talks
-            if os.path.exists(talks_path):
-                self.talks_df = pd.read_csv(talks_path, encoding='gbk')
-                self.talks_df.columns = self.talks_df.columns.str.strip()
-                if '单位全称' in self.talks_df.columns:
-                    self.talks_df['单位全称'] = self.talks_df['单位全称'].astype(str).str.strip()
-                if '来源高校' in self.talks_df.columns:
-                    self.talks_df['来源高校'] = self.talks_df['来源高校'].astype(str).str.strip()
-                if '跟进部门' in self.talks_df.columns:
-                    self.talks_df['跟进部门'] = self.talks_df['跟进部门'].astype(str).str.strip()
-
-            # Load Fairs
-            if os.path.exists(fairs_path):
-                self.fairs_df = pd.read_csv(fairs_path, encoding='gbk')
-                self.fairs_df.columns = self.fairs_df.columns.str.strip()
+            # Jobs / Talks / Fairs load concurrently: Arrow CSV parsing and Feather
+            # reads release the GIL, so boot takes about as long as the largest file
+            sources = [
+                (path, reader)
+                for path, reader in (
+                    (self.jobs_path, self._read_jobs),
+                    (self.talks_path, self._read_talks),
+                    (self.fairs_path, self._read_fairs),
+                )
+                if os.path.exists(path)
+            ]
+            with ThreadPoolExecutor(max_workers=max(len(sources), 1)) as executor:
+                futures = {
+                    path: executor.submit(self._load_with_cache, path, reader)
+                    for path, reader in sources
+                }
+            
+            if self.jobs_path in futures:
+                self.jobs_df = futures[self.jobs_path].result()
+            if self.talks_path in futures:
+                self.talks_df = futures[self.talks_path].result()
+            if self.fairs_path in futures:
+                self.fairs_df = futures[self.fairs_path].result()
                 
             print("[OK] Data loaded successfully.")
             
         except Exception as e:
             print(f"[ERROR] Error loading data: {e}")
 
+    def _count_positions(self) -> int:
+        """Sum of '需求人数' (non-numeric cells ignored); the frames are static, so computed once."""
+        if self.jobs_df is None or '需求人数' not in self.jobs_df.columns:
+            return 0
+        # Convert to numeric, coerce errors to NaN
+        recruits = pd.to_numeric(self.jobs_df['需求人数'], errors='coerce')
+        return int(recruits.sum())
+
+    def _build_indexes(self):
+        """
+        Build inverted indexes over lowercased shadow copies of the searchable text
+        columns once after loading, so queries only lowercase the pattern. They are
+        kept out of the DataFrames so they never leak into returned records.
+        """
+        frames = {'jobs': self.jobs_df, 'talks': self.talks_df, 'fairs': self.fairs_df}
+        for name, columns in SEARCH_COLUMNS.items():
+            df = frames[name]
+            if df is None:
+                continue
+            for col in columns:
+                if col in df.columns:
+                    self._indexes[f"{name}.{col}"] = _ValueIndex(_to_arrow_text(df[col]))
+
+    def _matching_rows(self, frame: str, df: pd.DataFrame, column: str, pattern: str) -> np.ndarray:
+        """Ascending row positions where `column` contains `pattern` (case-insensitive, literal)."""
+        index = self._indexes.get(f"{frame}.{column}")
+        if index is None:
+            mask = df[column].str.contains(pattern, na=False, case=False, regex=False).to_numpy()
+            return np.flatnonzero(mask)
+        return index.rows(pattern)
+
+    @staticmethod
+    def _read_jobs(path: str) -> pd.DataFrame:
+        return _read_gbk_csv(path, ('需求专业', '单位名称'), category_columns=('单位名称',))
+
+    @staticmethod
+    def _read_talks(path: str) -> pd.DataFrame:
+        return _read_gbk_csv(
+            path,
+            ('单位全称', '来源高校', '跟进部门'),
+            category_columns=('单位全称', '来源高校', '跟进部门'),
+        )
+
+    @staticmethod
+    def _read_fairs(path: str) -> pd.DataFrame:
+        return _read_gbk_csv(path, category_columns=('主办单位',))
+
+    @staticmethod
+    def _load_with_cache(csv_path: str, reader: Callable[[str], pd.DataFrame]) -> pd.DataFrame:
+        """
+        Load a cleaned frame from its Feather cache when fresh, otherwise parse
+        the CSV and refresh the cache. Cache failures never break loading.
+        """
+        cache_path = csv_path + FRAME_CACHE_SUFFIX
+        try:
+            if os.path.exists(cache_path) and os.path.getmtime(cache_path) >= os.path.getmtime(csv_path):
+                df = pd.read_feather(cache_path)
+                print(f"[OK] Loaded {len(df)} rows from cache: {cache_path}")
+                return df
+        except Exception as e:
+            print(f"[WARN] Failed to read cache {cache_path}, re-parsing CSV: {e}")
+
+        df = reader(csv_path)
+        try:
+            df.reset_index(drop=True).to_feather(cache_path, compression='zstd')
+        except Exception as e:
+            print(f"[WARN] Failed to write cache {cache_path}: {e}")
+        return df
+
     def search_jobs_by_major(self, major: str, limit: int = None) -> List[Dict[str, Any]]:
         """
         Search for jobs where '需求专业' contains the major keyword.
@@ -58,14 +277,42 @@ class DataLoader:
             return []
         
         # Filter logic: Check if major is in '需求专业'
-        mask = self.jobs_df['需求专业'].str.contains(major, na=False, case=False)
+        rows = self._matching_rows('jobs', self.jobs_df, '需求专业', major)
         
         if limit:
-            matched_jobs = self.jobs_df[mask].head(limit)
-        else:
-            matched_jobs = self.jobs_df[mask]
+            rows = rows[:limit]
         
-        return matched_jobs.to_dict('records')
+        return self.jobs_df.iloc[rows].to_dict('records')
+
+    def search_jobs_df(self, major: str, limit: int = None) -> pd.DataFrame:
+        """
+        DataFrame variant of search_jobs_by_major: returns the matching rows as a
+        frame (no per-row dict conversion) so callers can work column-wise.
+        """
+        if self.jobs_df is None:
+            return pd.DataFrame()
+
+        rows = self._matching_rows('jobs', self.jobs_df, '需求专业', major)
+        if limit:
+            rows = rows[:limit]
+
+        return self.jobs_df.iloc[rows]
+
+    def iter_jobs_by_major(self, major: str, limit: int = None,
+                           batch_size: int = STREAM_BATCH_SIZE) -> Iterator[Dict[str, Any]]:
+        """
+        Streaming variant of search_jobs_by_major: yields matching jobs one by one,
+        converting only `batch_size` rows to dicts at a time.
+        """
+        if self.jobs_df is None:
+            return
+
+        rows = self._matching_rows('jobs', self.jobs_df, '需求专业', major)
+        if limit:
+            rows = rows[:limit]
+
+        for start in range(0, len(rows), batch_size):
+            yield from self.jobs_df.iloc[rows[start:start + batch_size]].to_dict('records')
 
     def get_related_talks(self, school: str, college: str = None, limit: int = 10) -> List[Dict[str, Any]]:
         """
@@ -74,14 +321,18 @@ class DataLoader:
         if self.talks_df is None:
             return []
         
-        mask = self.talks_df['来源高校'].str.contains(school, na=False, case=False)
+        rows = self._matching_rows('talks', self.talks_df, '来源高校', school)
         
-        if college:
-            # Filter by college (跟进部门) if provided
-            college_mask = self.talks_df['跟进部门'].str.contains(college, na=False, case=False)
-            mask = mask & college_mask
+        if college and len(rows):
+            # Filter by college (跟进部门) if provided, evaluated only on the school's rows
+            index = self._indexes.get('talks.跟进部门')
+            if index is not None:
+                rows = index.filter_rows(rows, college)
+            else:
+                sub = self.talks_df['跟进部门'].iloc[rows]
+                rows = rows[sub.str.contains(college, na=False, case=False, regex=False).to_numpy()]
             
-        return self.talks_df[mask].head(limit).to_dict('records')
+        return self.talks_df.iloc[rows[:limit]].to_dict('records')
 
     def get_related_fairs(self, school: str, limit: int = 10) -> List[Dict[str, Any]]:
         """
@@ -91,102 +342,183 @@ class DataLoader:
             return []
             
         # Check both Organizer and Source if possible, mostly '主办单位'
-        mask = self.fairs_df['主办单位'].str.contains(school, na=False, case=False)
-        return self.fairs_df[mask].head(limit).to_dict('records')
+        rows = self._matching_rows('fairs', self.fairs_df, '主办单位', school)
+        return self.fairs_df.iloc[rows[:limit]].to_dict('records')
 
     def get_dataset_stats(self) -> Dict[str, int]:
         """
         Get global statistics of the loaded dataset.
+        The frames never change after loading, so the stats are computed once.
         """
+        if self._dataset_stats is None:
+            self._dataset_stats = self._compute_dataset_stats()
+        return dict(self._dataset_stats)
+
+    def _compute_dataset_stats(self) -> Dict[str, int]:
         stats = {
             "total_companies": 0,
             "total_positions": 0
         }
         
         if self.jobs_df is not None:
-            stats["total_companies"] = self.jobs_df['单位名称'].nunique()
-            if '需求人数' in self.jobs_df.columns:
-                # Convert to numeric, coerce errors to NaN
-                recruits = pd.to_numeric(self.jobs_df['需求人数'], errors='coerce')
-                stats["total_positions"] = int(recruits.sum())
+            companies = self.jobs_df['单位名称']
+            if isinstance(companies.dtype, pd.CategoricalDtype):
+                # Dictionary-encoded at load time: the categories are the distinct names
+                stats["total_companies"] = len(companies.cat.categories)
+            else:
+                stats["total_companies"] = len(pd.unique(companies.to_numpy()))
+            stats["total_positions"] = self._total_positions
                 
         return stats
 
+    def _hierarchy_cache_path(self) -> Optional[str]:
+        """Hierarchy cache file keyed by the mtimes of both source CSVs."""
+        digest = _hierarchy_fingerprint(self.data_dir)
+        if digest is None:
+            return None
+        return os.path.join(self.data_dir, f"{HIERARCHY_CACHE_PREFIX}{digest}{FEATHER_CACHE_SUFFIX}")
+
+    @staticmethod
+    def _hierarchy_from_frame(df: pd.DataFrame) -> Dict[str, Dict[str, List[str]]]:
+        """Rebuild the nested hierarchy from flat (school, college, major) rows, keeping stored order."""
+        hierarchy: Dict[str, Dict[str, List[str]]] = {}
+        for school, college, major in df[HIERARCHY_COLUMNS].itertuples(index=False, name=None):
+            hierarchy.setdefault(school, {}).setdefault(college, []).append(major)
+        return hierarchy
+
+    @staticmethod
+    def _hierarchy_to_frame(hierarchy: Dict[str, Dict[str, List[str]]]) -> pd.DataFrame:
+        rows = [
+            (s, c, m)
+            for s, cols in hierarchy.items()
+            for c, ms in cols.items()
+            for m in ms
+        ]
+        return pd.DataFrame(rows, columns=HIERARCHY_COLUMNS)
+
     def get_hierarchy(self) -> Dict[str, Dict[str, List[str]]]:
         """
         Extract School -> College -> Majors hierarchy from data.
         Returns: { School: { College: [Major1, Major2, ...] } }
+        The result is cached as a flat Feather file until either CSV changes.
         """
         if self.jobs_df is None or self.talks_df is None:
             return {}
-            
+
+        cache_path = self._hierarchy_cache_path()
+        if cache_path and os.path.exists(cache_path):
+            try:
+                return self._hierarchy_from_frame(pd.read_feather(cache_path))
+            except Exception as e:
+                print(f"[WARN] Failed to read hierarchy cache {cache_path}: {e}")
+
+        hierarchy = self._build_hierarchy()
+
+        if cache_path:
+            try:
+                self._hierarchy_to_frame(hierarchy).to_feather(cache_path, compression='zstd')
+                self._remove_stale_hierarchy_caches(cache_path)
+            except Exception as e:
+                print(f"[WARN] Failed to write hierarchy cache {cache_path}: {e}")
+        return hierarchy
+
+    def _remove_stale_hierarchy_caches(self, current_path: str):
+        current_name = os.path.basename(current_path)
+        for name in os.listdir(self.data_dir):
+            if name.startswith(HIERARCHY_CACHE_PREFIX) and name.endswith(FEATHER_CACHE_SUFFIX) and name != current_name:
+                try:
+                    os.remove(os.path.join(self.data_dir, name))
+                except OSError:
+                    pass
+
+    def _build_hierarchy(self) -> Dict[str, Dict[str, List[str]]]:
+        """Build the hierarchy from the loaded frames (no caching)."""
         # 1. Prepare DataFrames with minimal columns
         # Ensure we are using the cleaned columns from _load_data
-        talks = self.talks_df[['来源高校', '跟进部门', '单位全称']].copy()
-        talks.columns = ['school', 'college', 'company']
+        # rename() on the column selection avoids an extra full copy of the string columns
+        talks = self.talks_df[['来源高校', '跟进部门', '单位全称']].rename(
+            columns={'来源高校': 'school', '跟进部门': 'college', '单位全称': 'company'}
+        )
         
-        jobs = self.jobs_df[['单位名称', '需求专业']].copy()
-        jobs.columns = ['company', 'majors']
+        jobs = self.jobs_df[['单位名称', '需求专业']].rename(
+            columns={'单位名称': 'company', '需求专业': 'majors'}
+        )
         
         # 2. Merge on Company Name
         # This links a School/College (via Talk) to potential Majors (via Job posted by Company)
         merged = pd.merge(talks, jobs, on='company', how='inner')
         
-        # 3. Process into Hierarchy
-        hierarchy = {}
+        # 3. Normalize columns vectorized (no per-row Python loop)
+        # Missing cells are nulls (see _read_gbk_csv): turn them into '' once, before any string op
+        school, college, majors = (
+            merged[col].astype(object).fillna('').str.strip() for col in ('school', 'college', 'majors')
+        )
+        # Handle missing college
+        college = college.mask(college == '', "未指定学院/部门")
+        # Split and clean majors
+        # Handle common separators: Chinese comma, English comma
+        majors = majors.str.replace('，', ',', regex=False).str.split(',')
         
-        # Use simple iteration for flexibility
-        for _, row in merged.iterrows():
-            school = str(row['school']).strip()
-            college = str(row['college']).strip()
-            majors_str = str(row['majors']).strip()
-            
-            # Skip invalid entries
-            if school == 'nan' or not school: continue
-            
-            # Handle missing college
-            if college == 'nan' or not college: 
-                college = "未指定学院/部门"
-            
-            if majors_str == 'nan' or not majors_str: continue
-            
-            # Initialize dicts
-            if school not in hierarchy:
-                hierarchy[school] = {}
-            if college not in hierarchy[school]:
-                hierarchy[school][college] = set()
-                
-            # Split and clean majors
-            # Handle common separators: Chinese comma, English comma, spaces, etc.
-            # Here we assume mostly comma separated
-            current_majors = [m.strip() for m in majors_str.replace('，', ',').split(',')]
-            for m in current_majors:
-                if m and m.lower() != 'nan':
-                    hierarchy[school][college].add(m)
-                    
-        # 4. Convert sets to sorted lists for JSON serialization
-        return {
-            s: {
-                c: sorted(list(ms)) 
-                for c, ms in cols.items()
-            }
-            for s, cols in hierarchy.items()
-        }
+        flat = pd.DataFrame({'school': school, 'college': college, 'major': majors}).explode('major')
+        flat['major'] = flat['major'].str.strip()
+        
+        # Skip invalid entries
+        valid = (flat['school'] != '') & (flat['major'] != '')
+        flat = flat[valid]
+        
+        # 4. Group into sorted, de-duplicated major lists via np.unique (keep first-seen school/college order)
+        grouped = flat.groupby(['school', 'college'], sort=False)['major'].agg(
+            lambda s: np.unique(s.to_numpy()).tolist()
+        )
+        hierarchy: Dict[str, Dict[str, List[str]]] = {}
+        for (s, c), ms in grouped.items():
+            hierarchy.setdefault(s, {})[c] = ms
+        return hierarchy
+
+# Pre-resolved data directory (one line, written at deploy time or after the first successful probe)
+DATA_PATH_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "data_path.txt")
+
+
+def _read_data_path_file() -> Optional[str]:
+    try:
+        with open(DATA_PATH_FILE, encoding='utf-8') as f:
+            path = f.read().strip()
+    except OSError:
+        return None
+    if path and os.path.isdir(path):
+        return path
+    print(f"WARNING: {DATA_PATH_FILE} points to a missing directory ({path!r}), probing instead.")
+    return None
 
-# Singleton instance or factory can be used. 
-# For now, we instantiate it when needed or as a global.
 
-# Priority 1: Environment Variable
-DATA_DIR = os.getenv("DATA_DIR")
+def _write_data_path_file(path: str):
+    try:
+        with open(DATA_PATH_FILE, 'w', encoding='utf-8') as f:
+            f.write(path + "\n")
+    except OSError as e:
+        print(f"WARNING: Could not write {DATA_PATH_FILE}: {e}")
+
+
+@lru_cache(maxsize=1)
+def _resolve_data_dir() -> str:
+    # Priority 1: Environment Variable
+    data_dir = os.getenv("DATA_DIR")
+    if data_dir:
+        print(f"[OK] Data directory (DATA_DIR): {data_dir}")
+        return data_dir
+
+    # Priority 2: data_path.txt (skips probing the candidate paths below)
+    data_dir = _read_data_path_file()
+    if data_dir:
+        print(f"[OK] Data directory (data_path.txt): {data_dir}")
+        return data_dir
 
-if not DATA_DIR:
     # Try to find the data directory relative to the project root first
     current_dir = os.path.dirname(os.path.abspath(__file__))
     
     # Calculate paths relative to this file
     # services -> app -> backend
     backend_service_dir = os.path.dirname(os.path.dirname(os.path.dirname(current_dir))) # This is ROOT
-    backend_dir_real = os.path.dirname(os.path.dirname(current_dir)) # This is BACKEND
     
     # Construct potential paths
     possible_paths = [
@@ -212,12 +544,37 @@ if not DATA_DIR:
 
     for path in possible_paths:
         if os.path.exists(path):
-            DATA_DIR = path
-            break
+            print(f"[OK] Data directory (probed): {path}")
+            _write_data_path_file(path)
+            return path
 
-# Fallback if nothing found (warn user)
-if not DATA_DIR:
+    # Fallback if nothing found (warn user)
     print("WARNING: Data directory not found. Using default empty path.")
-    DATA_DIR = "./data"
+    return "./data"
+
+
+@lru_cache(maxsize=1)
+def _create_data_loader() -> DataLoader:
+    """Build the DataLoader (runs once per process)."""
+    return DataLoader(_resolve_data_dir())
+
+
+_loader_lock = threading.Lock()
+
+
+def get_data_loader() -> DataLoader:
+    """
+    Shared DataLoader instance, built on first use instead of at import time
+    so importing this module does no CSV I/O. The lock makes concurrent first
+    calls build it only once.
+    """
+    with _loader_lock:
+        return _create_data_loader()
+
 
-data_loader = DataLoader(DATA_DIR)
+def hierarchy_source_fingerprint() -> Optional[str]:
+    """
+    Fingerprint of the hierarchy's source CSVs, without loading any data.
+    Changes whenever 职位.csv or 宣讲会.csv is modified; None if they are missing.
+    """
+    return _hierarchy_fingerprint(_resolve_data_dir())
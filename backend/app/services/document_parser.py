@@ -0,0 +1,121 @@
+"""
+Document Parser - 上传文件文本解析
+按文件内容哈希缓存解析结果，重复上传/预览同一文件时直接命中内存
+"""
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+from typing import BinaryIO, Callable, Dict, Tuple
+
+import docx
+import pypdf
+
+try:
+    # PDFium (C++) 文本抽取，比纯 Python 的 pypdf 快得多
+    import pypdfium2 as pdfium
+except ImportError:
+    pdfium = None
+
+# 解析结果缓存上限（条目数）
+PARSE_CACHE_MAX_ITEMS = 128
+
+_parse_cache: "OrderedDict[Tuple[str, bytes], str]" = OrderedDict()
+_parse_cache_lock = threading.Lock()
+
+
+class UnsupportedFileFormat(ValueError):
+    """不支持解析的文件格式"""
+
+
+def get_extension(filename: str) -> str:
+    """获取小写扩展名（不含点），无扩展名时返回空字符串"""
+    _, dot, ext = filename.rpartition(".")
+    return ext.lower() if dot else ""
+
+
+def _parse_pdf(stream: BinaryIO) -> str:
+    if pdfium is not None:
+        start = stream.tell()
+        try:
+            pdf = pdfium.PdfDocument(stream.read())
+            try:
+                return "".join(f"{page.get_textpage().get_text_range()}\n" for page in pdf)
+            finally:
+                pdf.close()
+        except Exception as e:
+            print(f"[DocumentParser] pypdfium2 解析失败，回退到 pypdf: {e}")
+            stream.seek(start)
+
+    reader = pypdf.PdfReader(stream)
+    return "".join(f"{page.extract_text() or ''}\n" for page in reader.pages)
+
+
+def _parse_docx(stream: BinaryIO) -> str:
+    doc = docx.Document(stream)
+    return "".join(f"{para.text}\n" for para in doc.paragraphs)
+
+
+def _parse_txt(stream: BinaryIO) -> str:
+    return stream.read().decode("utf-8")
+
+
+# 扩展名 -> 解析函数
+_PARSERS: Dict[str, Callable[[BinaryIO], str]] = {
+    "pdf": _parse_pdf,
+    "docx": _parse_docx,
+    "txt": _parse_txt,
+}
+SUPPORTED_EXTENSIONS = frozenset(_PARSERS)
+
+
+def _cached_parse(filename: str, digest: bytes, open_stream: Callable[[], BinaryIO]) -> str:
+    """以 (扩展名, 内容摘要) 为键查询/填充解析缓存"""
+    ext = get_extension(filename)
+    parser = _PARSERS.get(ext)
+    if parser is None:
+        raise UnsupportedFileFormat(f"Unsupported file format: {filename}")
+    key = (ext, digest)
+
+    with _parse_cache_lock:
+        if key in _parse_cache:
+            _parse_cache.move_to_end(key)
+            return _parse_cache[key]
+
+    with open_stream() as stream:
+        text = parser(stream)
+
+    with _parse_cache_lock:
+        _parse_cache[key] = text
+        _parse_cache.move_to_end(key)
+        while len(_parse_cache) > PARSE_CACHE_MAX_ITEMS:
+            _parse_cache.popitem(last=False)
+
+    return text
+
+
+def extract_text(filename: str, content: bytes) -> str:
+    """
+    提取文件文本内容（带 LRU 缓存）
+
+    Args:
+        filename: 原始文件名（用于判断格式）
+        content: 文件二进制内容
+
+    Returns:
+        提取的文本；不支持的格式抛出 UnsupportedFileFormat
+    """
+    digest = hashlib.sha256(content).digest()
+    return _cached_parse(filename, digest, lambda: io.BytesIO(content))
+
+
+def extract_text_from_path(filename: str, file_path: str, digest: bytes) -> str:
+    """
+    从已落盘的文件提取文本内容（带 LRU 缓存）
+
+    Args:
+        filename: 原始文件名（用于判断格式）
+        file_path: 文件存储路径
+        digest: 文件内容的 sha256 摘要（上传时增量计算）
+    """
+    return _cached_parse(filename, digest, lambda: open(file_path, "rb"))
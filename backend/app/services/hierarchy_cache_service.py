@@ -1,12 +1,100 @@
 """
 Hierarchy Cache Service - 学校层级缓存服务
 """
+import os
+import tempfile
 from typing import Dict, List, Optional
+
+import pyarrow as pa
 from sqlalchemy.orm import Session
 
 from app.core.database import SessionLocal
 from app.crud import school_hierarchy as crud
-from app.services.data_loader import data_loader
+from app.services.data_loader import get_data_loader, hierarchy_source_fingerprint
+
+
+# 多 worker 共享的层级数据：以 Arrow IPC 文件形式放在 tmpfs（/dev/shm）上，
+# 第一个构建出层级的 worker 负责发布，其余 worker 直接 mmap 读取，无需各自查库/解析 CSV
+# 文件名带源 CSV 的 mtime 指纹：进程重启后仍可直接复用，CSV 更新后自动失效
+SHARED_HIERARCHY_DIR = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+SHARED_HIERARCHY_PREFIX = "csh_hierarchy_"
+SHARED_HIERARCHY_SUFFIX = ".arrow"
+
+
+def _shared_hierarchy_path() -> str:
+    fingerprint = hierarchy_source_fingerprint() or "nodata"
+    return os.path.join(SHARED_HIERARCHY_DIR, f"{SHARED_HIERARCHY_PREFIX}{fingerprint}{SHARED_HIERARCHY_SUFFIX}")
+
+
+def _remove_stale_shared_hierarchies(current_path: str):
+    """删除旧指纹的共享文件"""
+    current_name = os.path.basename(current_path)
+    for name in os.listdir(SHARED_HIERARCHY_DIR):
+        if name.startswith(SHARED_HIERARCHY_PREFIX) and name.endswith(SHARED_HIERARCHY_SUFFIX) and name != current_name:
+            try:
+                os.remove(os.path.join(SHARED_HIERARCHY_DIR, name))
+            except OSError:
+                pass
+
+
+def _hierarchy_to_table(hierarchy: Dict[str, Dict[str, List[str]]]) -> pa.Table:
+    """嵌套字典 -> (school, college, major) 三列表，学校/学院列做字典编码"""
+    schools, colleges, majors = [], [], []
+    for s, cols in hierarchy.items():
+        for c, ms in cols.items():
+            for m in ms:
+                schools.append(s)
+                colleges.append(c)
+                majors.append(m)
+    return pa.table({
+        "school": pa.array(schools, type=pa.string()).dictionary_encode(),
+        "college": pa.array(colleges, type=pa.string()).dictionary_encode(),
+        "major": pa.array(majors, type=pa.string()),
+    })
+
+
+def _table_to_hierarchy(table: pa.Table) -> Dict[str, Dict[str, List[str]]]:
+    """(school, college, major) 三列表 -> 嵌套字典（保持存储顺序）"""
+    hierarchy: Dict[str, Dict[str, List[str]]] = {}
+    rows = zip(
+        table.column("school").to_pylist(),
+        table.column("college").to_pylist(),
+        table.column("major").to_pylist(),
+    )
+    for s, c, m in rows:
+        hierarchy.setdefault(s, {}).setdefault(c, []).append(m)
+    return hierarchy
+
+
+def _publish_shared_hierarchy(hierarchy: Dict[str, Dict[str, List[str]]]):
+    """写入共享 Arrow 文件（先写临时文件再原子替换，读者不会看到半截文件）"""
+    path = _shared_hierarchy_path()
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        table = _hierarchy_to_table(hierarchy)
+        with pa.OSFile(tmp_path, "wb") as sink:
+            with pa.ipc.new_file(sink, table.schema) as writer:
+                writer.write_table(table)
+        os.replace(tmp_path, path)
+        _remove_stale_shared_hierarchies(path)
+    except Exception as e:
+        print(f"[Cache] 发布共享层级数据失败: {e}")
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _read_shared_hierarchy() -> Optional[Dict[str, Dict[str, List[str]]]]:
+    """mmap 读取其他 worker 发布的共享 Arrow 文件，不存在或损坏时返回 None"""
+    path = _shared_hierarchy_path()
+    if not os.path.exists(path):
+        return None
+    try:
+        with pa.memory_map(path, "r") as source:
+            table = pa.ipc.open_file(source).read_all()
+            return _table_to_hierarchy(table)
+    except Exception as e:
+        print(f"[Cache] 读取共享层级数据失败: {e}")
+        return None
 
 
 class HierarchyCacheService:
@@ -23,17 +111,25 @@ class HierarchyCacheService:
     def initialize_cache(self) -> Dict[str, Dict[str, List[str]]]:
         """
         初始化缓存：
+        0. 优先读取已发布的共享 Arrow 数据（其他 worker 或重启前的进程写入，CSV 未变化时有效）
         1. 尝试从数据库读取
         2. 如果数据库为空，从 CSV 加载并写入数据库
-        3. 同时建立内存缓存
+        3. 同时建立内存缓存，并发布给其他 worker
         """
+        shared = _read_shared_hierarchy()
+        if shared:
+            print(f"[Cache] 从共享内存加载学校层级数据: {len(shared)} 所学校")
+            self._set_memory_cache(shared)
+            return shared
+        
         db = SessionLocal()
         try:
             # 检查数据库缓存
             if not crud.is_cache_empty(db):
                 print("[Cache] 从数据库加载学校层级数据")
                 hierarchy = crud.get_full_hierarchy(db)
-                self._memory_cache = hierarchy
+                self._set_memory_cache(hierarchy)
+                _publish_shared_hierarchy(hierarchy)
                 stats = crud.get_cache_stats(db)
                 print(f"[Cache] 加载完成: {stats['schools_count']} 所学校, "
                       f"{stats['colleges_count']} 个学院, "
@@ -42,13 +138,14 @@ class HierarchyCacheService:
             
             # 数据库为空，从 CSV 加载
             print("[Cache] 数据库缓存为空，从 CSV 加载...")
-            csv_hierarchy = data_loader.get_hierarchy()
+            csv_hierarchy = get_data_loader().get_hierarchy()
             
             if csv_hierarchy:
                 # 写入数据库缓存
                 count = crud.refresh_hierarchy_cache(db, csv_hierarchy)
                 print(f"[Cache] 已写入数据库: {count} 条记录")
-                self._memory_cache = csv_hierarchy
+                self._set_memory_cache(csv_hierarchy)
+                _publish_shared_hierarchy(csv_hierarchy)
                 return csv_hierarchy
             else:
                 print("[Cache] CSV 数据为空，使用默认数据")
@@ -65,12 +162,13 @@ class HierarchyCacheService:
         db = SessionLocal()
         try:
             print("[Cache] 从 CSV 强制刷新...")
-            csv_hierarchy = data_loader.get_hierarchy()
+            csv_hierarchy = get_data_loader().get_hierarchy()
             
             if csv_hierarchy:
                 count = crud.refresh_hierarchy_cache(db, csv_hierarchy)
                 print(f"[Cache] 刷新完成: {count} 条记录")
-                self._memory_cache = csv_hierarchy
+                self._set_memory_cache(csv_hierarchy)
+                _publish_shared_hierarchy(csv_hierarchy)
                 return csv_hierarchy
             else:
                 return self._memory_cache or {}
@@ -80,6 +178,10 @@ class HierarchyCacheService:
         finally:
             db.close()
     
+    def _set_memory_cache(self, hierarchy: Dict[str, Dict[str, List[str]]]):
+        """设置内存缓存"""
+        self._memory_cache = hierarchy
+    
     def get_hierarchy(self) -> Dict[str, Dict[str, List[str]]]:
         """获取层级数据（优先内存缓存）"""
         if self._memory_cache is None:
@@ -1,13 +1,21 @@
 import os
 import yaml
 import json
+import orjson
+import pandas as pd
 import asyncio
+import hashlib
 import re
+import threading
+import unicodedata
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from typing import Dict, Any, List, Optional
 from openai import AsyncOpenAI
 from app.core.config import get_settings
-from app.services.data_loader import data_loader
-from app.services.chongqing_job_loader import chongqing_loader
+from app.services.data_loader import get_data_loader
+from app.services.chongqing_job_loader import get_chongqing_loader
 from app.core.neo4j_client import neo4j_client
 from app.services.optimized_json_storage import optimized_storage
 from docx import Document
@@ -15,8 +23,476 @@ from docx.shared import Pt, Inches
 from docx.enum.text import WD_ALIGN_PARAGRAPH
 import tempfile
 
+try:
+    # MessagePack 二进制缓存：比缩进 JSON 体积更小、编解码更快
+    import msgspec
+    _MSGPACK_ENCODER = msgspec.msgpack.Encoder()
+    _MSGPACK_DECODER = msgspec.msgpack.Decoder()
+except ImportError:
+    msgspec = None
+
+try:
+    # 多模式匹配（Aho-Corasick）：一次扫描即可找出所有规则关键词
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+# 预编译的正则：薪资中的数字 / "第X级" 类无意义标签
+_NUM_RE = re.compile(r"\d+(?:\.\d+)?")
+_LEVEL_RE = re.compile(r"第[0-9一二三四五六七八九十]+级")
+
+
+class _SafeFilenameTable(dict):
+    """
+    str.translate 用的字符表：保留字母数字（含中文）与空格/-/_，其余字符删除
+    按需填充（__missing__），首次遇到某字符时判定一次，之后都是 C 层查表
+    """
+
+    def __missing__(self, codepoint: int):
+        ch = chr(codepoint)
+        value = codepoint if (ch.isalnum() or ch in " -_") else None
+        self[codepoint] = value
+        return value
+
+
+_SAFE_FILENAME_TABLE = _SafeFilenameTable()
+
+
+# 去重键中忽略的标点类别：连接符、破折号、括号、引号；其余标点（如 C# 的 #）保留
+_NAME_KEY_DROP_CATEGORIES = frozenset({"Pc", "Pd", "Ps", "Pe", "Pi", "Pf", "Cc"})
+_NAME_KEY_DROP_CHARS = frozenset("·・.,，、。;；:：!！?？/／\\")
+
+
+class _NameKeyTable(dict):
+    """
+    str.translate 用的字符表：删除空白与分隔类标点（含全角），其余字符保留
+    与 _SafeFilenameTable 一样按需填充
+    """
+
+    def __missing__(self, codepoint: int):
+        ch = chr(codepoint)
+        category = unicodedata.category(ch)
+        drop = category[0] == "Z" or category in _NAME_KEY_DROP_CATEGORIES or ch in _NAME_KEY_DROP_CHARS
+        value = None if drop else codepoint
+        self[codepoint] = value
+        return value
+
+
+_NAME_KEY_TABLE = _NameKeyTable()
+
+
+def _entity_name_key(name: str) -> str:
+    """
+    实体名去重键：casefold 后去掉空白与分隔标点，"Python 编程" / "python编程" 视为同一实体
+    全由标点组成的名称退回 casefold 结果
+    """
+    folded = name.casefold()
+    return folded.translate(_NAME_KEY_TABLE) or folded
+
+# 行业/政策参考文件：可读取的扩展名与最多返回的文件数
+_REFERENCE_FILE_EXTS = frozenset({".pdf", ".docx", ".txt", ".md", ".csv", ".xlsx", ".xls"})
+_REFERENCE_FILE_LIMIT = 20
+
+# 岗位质量打分用的关键词（_is_high_quality_job）
+_QUALITY_SIZE_KEYWORDS = ("上市", "500强", "龙头", "央企", "国企", "大型", "集团")
+_QUALITY_EDU_KEYWORDS = ("本科", "硕士", "博士")
+
+
+def _walk_files(base: str):
+    """
+    os.scandir 迭代遍历目录树，逐个产出 (文件名, 路径)
+    DirEntry 的类型信息来自目录读取本身，无需逐个文件 stat
+    """
+    stack = [base]
+    while stack:
+        directory = stack.pop()
+        try:
+            with os.scandir(directory) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        stack.append(entry.path)
+                    elif entry.is_file():
+                        yield entry.name, entry.path
+        except OSError:
+            continue
+
+# 标准缓存文件后缀：JSON（旧格式，仍可读取） / MessagePack
+GRAPH_JSON_SUFFIX = "_graph.json"
+GRAPH_MSGPACK_SUFFIX = "_graph.msgpack"
+
+def _ndjson_line(event: Dict[str, Any]) -> bytes:
+    """流式进度事件序列化为一行 NDJSON（orjson 直接输出 UTF-8 字节）"""
+    return orjson.dumps(event) + b"\n"
+
+
+def _step_event(step_id: int, message: str, status: str,
+                progress: Optional[Dict[str, Any]] = None, data: Any = None) -> bytes:
+    """步骤进度事件"""
+    event: Dict[str, Any] = {"step_id": step_id, "message": message, "status": status}
+    if progress is not None:
+        event["progress"] = progress
+    if data is not None:
+        event["data"] = data
+    return _ndjson_line(event)
+
+
+def _agent_event(step_id: int, agent_id: str, agent_status: str, status: str, message: str) -> bytes:
+    """智能体状态事件"""
+    return _ndjson_line({
+        "event_type": "agent_status",
+        "step_id": step_id,
+        "agent_id": agent_id,
+        "agent_status": agent_status,
+        "status": status,
+        "message": message,
+    })
+
+
+# LLM 响应的磁盘缓存目录（抽取结果 / 改进分析报告）
+_EXTRACTION_CACHE_DIR = os.path.join(os.path.dirname(__file__), "../../data/llm_cache")
+
+# 后台保存任务的强引用：asyncio 只弱引用任务，客户端断开、生成器关闭后任务仍需跑完
+_BACKGROUND_TASKS: set = set()
+
+
+def _on_background_task_done(task: asyncio.Task):
+    _BACKGROUND_TASKS.discard(task)
+    if not task.cancelled() and task.exception() is not None:
+        print(f"[KGService] 后台保存图谱失败: {task.exception()}")
+
+
+# build_graph_for_major 分块抽取时每块包含的岗位数
+_LLM_JOBS_PER_CHUNK = 20
+
 settings = get_settings()
 
+# 规则增强用的关键词映射（_build_rule_enhancement）
+_SKILL_TERMS = {
+    "python": "Python",
+    "java": "Java",
+    "c++": "C++",
+    "c语言": "C语言",
+    "matlab": "MATLAB",
+    "autocad": "AutoCAD",
+    "plc": "PLC编程",
+    "单片机": "单片机开发",
+    "嵌入式": "嵌入式开发",
+    "数据库": "数据库设计",
+    "sql": "SQL",
+    "电路": "电路分析",
+    "仿真": "系统仿真",
+    "测试": "测试与调试",
+    "linux": "Linux",
+    "算法": "算法设计",
+    "自动化": "自动化控制",
+}
+_QUALITY_TERMS = {
+    "沟通": "沟通能力",
+    "团队": "团队协作",
+    "责任": "责任心",
+    "学习": "学习能力",
+    "抗压": "抗压能力",
+    "执行": "执行力",
+    "细心": "细心严谨",
+    "创新": "创新意识",
+    "协调": "组织协调能力",
+}
+_CAPABILITY_TERMS = {
+    "电力": "电力系统设计能力",
+    "自动化": "自动化控制能力",
+    "嵌入式": "嵌入式系统开发能力",
+    "plc": "工业控制与PLC调试能力",
+    "算法": "算法建模与优化能力",
+    "测试": "系统测试与故障诊断能力",
+    "项目": "工程项目实施能力",
+    "电路": "电路分析与设计能力",
+}
+_COURSE_MAP = {
+    "Python": "Python程序设计",
+    "Java": "Java程序设计",
+    "C++": "高级语言程序设计",
+    "C语言": "C语言程序设计",
+    "MATLAB": "工程计算与MATLAB",
+    "AutoCAD": "工程制图与CAD",
+    "PLC编程": "PLC原理与应用",
+    "单片机开发": "单片机原理",
+    "嵌入式开发": "嵌入式系统设计",
+    "数据库设计": "数据库原理",
+    "SQL": "数据库应用技术",
+    "电路分析": "电路分析基础",
+    "系统仿真": "控制系统仿真",
+    "测试与调试": "自动化测试技术",
+    "Linux": "Linux系统应用",
+    "算法设计": "数据结构与算法",
+    "自动化控制": "自动控制原理",
+}
+
+
+
+def _build_rule_automaton():
+    """把上面三类关键词合并成一个自动机，值为关键词本身；未安装 pyahocorasick 时返回 None"""
+    if ahocorasick is None:
+        return None
+    automaton = ahocorasick.Automaton()
+    for terms in (_SKILL_TERMS, _QUALITY_TERMS, _CAPABILITY_TERMS):
+        for keyword in terms:
+            automaton.add_word(keyword, keyword)
+    automaton.make_automaton()
+    return automaton
+
+
+_RULE_AUTOMATON = _build_rule_automaton()
+
+# 各关键节点类型的最少数量及兜底节点池（_merge_and_enrich_kg_data）
+_TARGET_MINIMUMS = {
+    "Major": 1,
+    "Capability": 18,
+    "Skill": 30,
+    "Quality": 12,
+    "Course": 16,
+}
+
+_FALLBACK_POOLS = {
+    "Capability": (
+        "工程问题分析能力",
+        "技术方案设计能力",
+        "系统集成与联调能力",
+        "数据驱动决策能力",
+        "需求分析与建模能力",
+        "项目实施与交付能力",
+        "质量控制与持续改进能力",
+        "跨学科协同创新能力",
+        "现场故障诊断能力",
+        "系统优化与运维能力",
+        "安全规范执行能力",
+        "标准化设计能力",
+        "实验设计与验证能力",
+        "工程文档编制能力",
+        "业务理解与技术转化能力",
+        "新技术学习与迁移能力",
+        "成本与效益评估能力",
+        "风险识别与应对能力",
+        "专业工具应用能力",
+        "职业场景综合应用能力",
+    ),
+    "Skill": (
+        "Python",
+        "Java",
+        "C语言",
+        "C++",
+        "SQL",
+        "MySQL",
+        "Linux",
+        "Git",
+        "MATLAB",
+        "AutoCAD",
+        "PLC编程",
+        "单片机开发",
+        "电路分析",
+        "控制系统仿真",
+        "数据可视化",
+        "需求分析",
+        "系统测试与调试",
+        "接口联调",
+        "文档写作",
+        "项目管理工具",
+        "Office办公软件",
+        "数据清洗",
+        "统计分析",
+        "实验仪器操作",
+        "安全操作规范",
+        "故障排查",
+        "流程优化",
+        "质量管理基础",
+        "技术方案汇报",
+        "跨团队沟通",
+        "代码规范",
+        "版本管理",
+        "自动化脚本开发",
+        "基础算法设计",
+        "工程制图",
+    ),
+    "Quality": (
+        "团队协作",
+        "沟通表达",
+        "责任心",
+        "执行力",
+        "学习能力",
+        "抗压能力",
+        "时间管理",
+        "问题解决意识",
+        "职业道德",
+        "质量意识",
+        "服务意识",
+        "创新意识",
+        "组织协调能力",
+        "细心严谨",
+        "持续改进意识",
+    ),
+    "Course": (
+        "程序设计基础",
+        "数据结构",
+        "数据库原理",
+        "操作系统基础",
+        "计算机网络基础",
+        "自动控制原理",
+        "电路分析基础",
+        "工程制图与CAD",
+        "PLC原理与应用",
+        "单片机原理",
+        "嵌入式系统设计",
+        "工程项目管理",
+        "系统测试技术",
+        "专业综合实训",
+        "工程实践训练",
+        "毕业设计（论文）",
+        "职业素养与沟通",
+        "创新创业基础",
+        "数据分析与可视化",
+        "生产实习",
+    ),
+}
+
+# 兜底池预先算好去重键：(展示名, _entity_name_key)，补齐循环内不再逐个计算
+_FALLBACK_POOLS_NORM = {
+    etype: tuple((name, _entity_name_key(name)) for name in names)
+    for etype, names in _FALLBACK_POOLS.items()
+}
+
+_SEED_CATEGORY_BY_TYPE = {
+    "Major": "Core",
+    "Capability": "Capability",
+    "Skill": "Skill",
+    "Quality": "Quality",
+    "Course": "Support",
+}
+
+
+# 旧版兜底策略生成的占位节点名
+_PLACEHOLDER_KEYWORDS = (
+    "补充节点",
+    "专业能力补充",
+    "关键技能补充",
+    "职业素质补充",
+    "支撑课程补充",
+    "专业核心节点",
+)
+
+
+def _reference_dirs_stamp(bases) -> tuple:
+    """
+    参考文件目录的变更标记：与 _walk_files 遍历同样的目录树，记录每个目录的 mtime
+    任意层级增删文件都会更新所在目录的 mtime，标记变化即令 _scan_reference_files 的缓存失效
+    （只 stat 目录，不逐个 stat 文件）
+    """
+    stamp = []
+    for base in bases:
+        stack = [base]
+        while stack:
+            directory = stack.pop()
+            try:
+                stamp.append((directory, os.stat(directory).st_mtime_ns))
+                with os.scandir(directory) as it:
+                    for entry in it:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+            except OSError:
+                stamp.append((directory, None))
+    return tuple(stamp)
+
+
+@lru_cache(maxsize=32)
+def _scan_reference_files(bases: tuple, lower_keywords: tuple, stamp: tuple) -> tuple:
+    """按关键词扫描参考文件（stamp 只参与缓存键），结果按 bases 顺序拼接，最多 _REFERENCE_FILE_LIMIT 个"""
+    # 某个目录单独凑满上限后，排在它后面的目录无需再扫
+    first_full = [len(bases)]
+    lock = threading.Lock()
+
+    def _scan(index: int) -> List[str]:
+        found: List[str] = []
+        for name, path in _walk_files(bases[index]):
+            if first_full[0] < index:
+                break
+            name_lower = name.lower()
+            if os.path.splitext(name_lower)[1] not in _REFERENCE_FILE_EXTS:
+                continue
+            if any(k in name_lower for k in lower_keywords):
+                found.append(path)
+                if len(found) >= _REFERENCE_FILE_LIMIT:
+                    with lock:
+                        first_full[0] = min(first_full[0], index)
+                    break
+        return found
+
+    # 各目录的 I/O 延迟（NFS 等）并行重叠
+    with ThreadPoolExecutor(max_workers=len(bases)) as pool:
+        results = list(pool.map(_scan, range(len(bases))))
+
+    hits: List[str] = []
+    for found in results:
+        hits.extend(found)
+    return tuple(hits[:_REFERENCE_FILE_LIMIT])
+
+
+@lru_cache(maxsize=4096)
+def _is_noise_entity_name(text: str) -> bool:
+    """
+    Filter placeholder or malformed labels that should not become KG nodes.
+    text 须已经过 _safe_text 规范化；结果只取决于字符串本身，可直接缓存
+    """
+    if not text:
+        return True
+
+    # Explicit placeholders created by older fallback strategies.
+    if any(k in text for k in _PLACEHOLDER_KEYWORDS):
+        return True
+
+    # Typical malformed level labels like "第X级/几级" that are not semantic nodes.
+    if _LEVEL_RE.search(text):
+        return True
+    if "几级" in text:
+        return True
+
+    return False
+
+
+def _text_column(df, column: str, default: str):
+    """取 DataFrame 文本列并去首尾空白；列缺失或值为空时使用 default"""
+    if column not in df.columns:
+        return pd.Series(default, index=df.index, dtype='string')
+    return df[column].astype('string').fillna(default).str.strip()
+
+
+# 导出文件名只保留字母数字（含中文）、空格、'-' 与 '_'
+_UNSAFE_FILENAME_RE = re.compile(r'[^\w \-]')
+
+# 改进报告 Markdown 行分类：标题 / 无序列表 / 有序列表，一次匹配完成
+_MD_LINE_RE = re.compile(r'(#{1,3}) |[-*] |(\d{1,3})\. ')
+# **粗体** 分段：粗体片段或不含 ** 的普通文本（保留单个 *）
+_MD_BOLD_RE = re.compile(r'\*\*(.+?)\*\*|((?:[^*]|\*(?!\*))+)')
+
+
+def _iter_bold_runs(text: str):
+    """按 **粗体** 切分文本，依次产出 (片段, 是否粗体)"""
+    for m in _MD_BOLD_RE.finditer(text):
+        bold = m.group(1)
+        if bold is not None:
+            yield bold, True
+        else:
+            yield m.group(2), False
+
+
+@lru_cache(maxsize=None)
+def _load_prompt(path: str) -> str:
+    """读取提示词文件；路径固定，进程内只读一次，之后新建的 KGService 直接复用"""
+    try:
+        with open(path, 'rb') as f:
+            return f.read().decode('utf-8')
+    except Exception as e:
+        print(f"Error loading prompt from {path}: {e}")
+        return "You are a helpful assistant for extracting knowledge graph entities."
+
+
 class KGService:
     def __init__(self):
         # Initialize OpenAI client (using env vars or settings)
@@ -40,35 +516,43 @@ class KGService:
         self.model = settings.DEEPSEEK_MODEL
         self.prompt_path = os.path.join(os.path.dirname(__file__), "../core/prompts/training_plan_kg_prompt.yaml")
         self.job_prompt_path = os.path.join(os.path.dirname(__file__), "../core/prompts/job_recruitment_kg_prompt.yaml")
-        self._system_prompt = self._load_prompt(self.prompt_path)
-        self._job_system_prompt = self._load_prompt(self.job_prompt_path)
-
-    def _load_prompt(self, path: str) -> str:
-        try:
-            with open(path, 'r', encoding='utf-8') as f:
-                return f.read()
-        except Exception as e:
-            print(f"Error loading prompt from {path}: {e}")
-            return "You are a helpful assistant for extracting knowledge graph entities."
+        self._system_prompt = _load_prompt(self.prompt_path)
+        self._job_system_prompt = _load_prompt(self.job_prompt_path)
 
+    @lru_cache(maxsize=1024)
     def _get_cache_path(self, school: str, college: str, major: str) -> str:
-        """Generate a safe filename for caching the graph."""
-        safe_school = "".join([c for c in school if c.isalnum() or c in (' ', '-', '_')]).strip()
-        safe_college = "".join([c for c in college if c.isalnum() or c in (' ', '-', '_')]).strip()
-        safe_major = "".join([c for c in major if c.isalnum() or c in (' ', '-', '_')]).strip()
-        filename = f"{safe_school}_{safe_college}_{safe_major}_graph.json"
+        """Generate a safe filename for caching the graph (memoized; also skips repeated makedirs)."""
+        safe_school = school.translate(_SAFE_FILENAME_TABLE).strip()
+        safe_college = college.translate(_SAFE_FILENAME_TABLE).strip()
+        safe_major = major.translate(_SAFE_FILENAME_TABLE).strip()
+        filename = f"{safe_school}_{safe_college}_{safe_major}{GRAPH_JSON_SUFFIX}"
         cache_dir = os.path.join(os.path.dirname(__file__), "../../data/graphs")
         os.makedirs(cache_dir, exist_ok=True)
         return os.path.join(cache_dir, filename)
     
+    def _get_msgpack_cache_path(self, school: str, college: str, major: str) -> str:
+        """MessagePack 格式的标准缓存路径（与 JSON 缓存同目录同前缀）"""
+        json_path = self._get_cache_path(school, college, major)
+        return json_path[:-len(GRAPH_JSON_SUFFIX)] + GRAPH_MSGPACK_SUFFIX
+    
+    def _standard_cache_paths(self, school: str, college: str, major: str) -> List[str]:
+        """标准缓存的所有可能路径（MessagePack 优先，其次旧的 JSON）"""
+        return [
+            self._get_msgpack_cache_path(school, college, major),
+            self._get_cache_path(school, college, major),
+        ]
+    
+    def _has_standard_cache(self, school: str, college: str, major: str) -> bool:
+        return any(os.path.exists(p) for p in self._standard_cache_paths(school, college, major))
+    
     def _delete_graph_cache(self, school: str, college: str, major: str):
         """删除指定专业-学院的缓存"""
         try:
-            # 删除标准 JSON 缓存
-            path = self._get_cache_path(school, college, major)
-            if os.path.exists(path):
-                os.remove(path)
-                print(f"[Cache] 已删除旧缓存: {path}")
+            # 删除标准缓存（MessagePack / JSON）
+            for path in self._standard_cache_paths(school, college, major):
+                if os.path.exists(path):
+                    os.remove(path)
+                    print(f"[Cache] 已删除旧缓存: {path}")
             
             # 删除优化存储缓存
             try:
@@ -80,26 +564,15 @@ class KGService:
         except Exception as e:
             print(f"[Cache] 删除缓存时出错: {e}")
 
-    def _save_graph_to_cache(self, school: str, college: str, major: str, data: Dict[str, Any]):
+    async def _save_graph_to_cache(self, school: str, college: str, major: str, data: Dict[str, Any]):
         """Save graph data to storage (Optimized JSON or Neo4j)."""
-        # 使用优化的 JSON 存储（压缩格式）
-        try:
-            optimized_storage.save_graph(school, college, major, data, use_compression=True)
-            print(f"DEBUG: Graph cached to optimized storage")
-        except Exception as e:
-            print(f"Error saving to optimized storage: {e}, fallback to standard JSON")
-            # 回退到标准 JSON
-            try:
-                path = self._get_cache_path(school, college, major)
-                with open(path, 'w', encoding='utf-8') as f:
-                    json.dump(data, f, ensure_ascii=False, indent=2)
-            except Exception as e2:
-                print(f"Error saving graph cache: {e2}")
+        # 编码 + 写盘放到线程里，不阻塞事件循环
+        await asyncio.to_thread(self._write_graph_files, school, college, major, data)
         
         # 如果启用 Neo4j，同时保存到 Neo4j
         if self.use_neo4j:
             try:
-                neo4j_client.save_graph(
+                await neo4j_client.save_graph_async(
                     school, college, major,
                     data.get('entities', []),
                     data.get('relationships', [])
@@ -108,12 +581,34 @@ class KGService:
             except Exception as e:
                 print(f"Error saving graph to Neo4j: {e}")
 
-    def _load_graph_from_cache(self, school: str, college: str, major: str) -> Optional[Dict[str, Any]]:
+    def _write_graph_files(self, school: str, college: str, major: str, data: Dict[str, Any]):
+        """Write graph data to the file caches (optimized storage, falling back to the standard cache)."""
+        # 使用优化的 JSON 存储（压缩格式）
+        try:
+            optimized_storage.save_graph(school, college, major, data, use_compression=True)
+            print(f"DEBUG: Graph cached to optimized storage")
+        except Exception as e:
+            print(f"Error saving to optimized storage: {e}, fallback to standard JSON")
+            # 回退到标准缓存：优先 MessagePack，未安装 msgspec 时写 JSON
+            try:
+                if msgspec is not None:
+                    path = self._get_msgpack_cache_path(school, college, major)
+                    with open(path, 'wb') as f:
+                        f.write(_MSGPACK_ENCODER.encode(data))
+                else:
+                    path = self._get_cache_path(school, college, major)
+                    # orjson 直接输出 UTF-8 字节（中文不转义），比标准库 json 快得多
+                    with open(path, 'wb') as f:
+                        f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+            except Exception as e2:
+                print(f"Error saving graph cache: {e2}")
+
+    async def _load_graph_from_cache(self, school: str, college: str, major: str) -> Optional[Dict[str, Any]]:
         """Load graph data from storage (Neo4j优先，或Optimized JSON)."""
         # 优先从 Neo4j 加载
         if self.use_neo4j:
             try:
-                data = neo4j_client.load_graph(school, college, major)
+                data = await neo4j_client.load_graph_async(school, college, major)
                 if data:
                     print(f"DEBUG: Graph loaded from Neo4j")
                     return data
@@ -129,30 +624,25 @@ class KGService:
         except Exception as e:
             print(f"Error loading from optimized storage: {e}")
         
-        # 回退到标准 JSON
+        # 回退到标准缓存（MessagePack 优先，兼容读取旧的 JSON 文件）
         try:
+            path = self._get_msgpack_cache_path(school, college, major)
+            if msgspec is not None and os.path.exists(path):
+                with open(path, 'rb') as f:
+                    print(f"DEBUG: Loading graph from standard cache: {path}")
+                    return _MSGPACK_DECODER.decode(f.read())
             path = self._get_cache_path(school, college, major)
             if os.path.exists(path):
-                with open(path, 'r', encoding='utf-8') as f:
+                with open(path, 'rb') as f:
                     print(f"DEBUG: Loading graph from standard cache: {path}")
-                    return json.load(f)
+                    return orjson.loads(f.read())
         except Exception as e:
             print(f"Error loading graph cache: {e}")
         return None
 
-    async def extract_knowledge(self, text: str, use_job_prompt: bool = False, major: str = None) -> Dict[str, Any]:
-        """
-        Extract entities and relationships from text using LLM.
-        
-        Args:
-            text: 输入文本
-            use_job_prompt: 是否使用招聘职位专用的 prompt
-            major: 专业名称，用于强调数据驱动
-        """
+    def _build_extraction_messages(self, text: str, use_job_prompt: bool = False, major: str = None):
+        """构建抽取请求的 (system prompt, user message)"""
         prompt = self._job_system_prompt if use_job_prompt else self._system_prompt
-        prompt_type = "招聘数据" if use_job_prompt else "通用"
-        
-        print(f"DEBUG: Starting LLM extraction with model {self.model}, prompt_type={prompt_type}...")
         
         # 构建强调数据驱动的用户消息
         if use_job_prompt and major:
@@ -180,46 +670,177 @@ class KGService:
 请输出 JSON 格式的知识图谱数据，重点关注 Capability、Skill、Quality、Course 四类实体的抽取。"""
         else:
             user_content = f"请分析以下文本，抽取知识图谱数据：\n\n{text}"
+        return prompt, user_content
+
+    async def _request_extraction(self, prompt: str, user_content: str) -> Dict[str, Any]:
+        """调用 LLM 抽取并解析结果；出错时直接抛出，由调用方决定如何兜底"""
+        stream = await self.client.chat.completions.create(
+            model=self.model,
+            messages=[
+                {"role": "system", "content": prompt},
+                {"role": "user", "content": user_content}
+            ],
+            response_format={"type": "json_object"},
+            temperature=0.1,
+            stream=True
+        )
+        
+        # 流式接收：生成过程中持续读取增量片段（长输出不会因整包等待而触发读超时），
+        # 片段收集到列表里最后一次性拼接，再整体交给 orjson 解析
+        chunks: List[str] = []
+        async for chunk in stream:
+            if chunk.choices:
+                delta = chunk.choices[0].delta.content
+                if delta:
+                    chunks.append(delta)
+        content = "".join(chunks)
+        result = orjson.loads(content)
+        
+        # 验证结果是否有效
+        entities = result.get('entities', [])
+        relationships = result.get('relationships', [])
+        
+        # 统计各类实体数量
+        type_counts = Counter(e.get('type', 'Unknown') for e in entities)
+        
+        print(f"DEBUG: LLM returned {len(entities)} entities, {len(relationships)} relationships")
+        print(f"DEBUG: Entity breakdown: {dict(type_counts)}")
+        
+        if len(entities) < 3:
+            print(f"WARNING: LLM returned only {len(entities)} entities, may be using template")
+        else:
+            # 打印前5个实体用于调试
+            for e in entities[:5]:
+                print(f"  - {e.get('name')} ({e.get('type')})")
+        return result
+
+    async def extract_knowledge(self, text: str, use_job_prompt: bool = False, major: str = None) -> Dict[str, Any]:
+        """
+        Extract entities and relationships from text using LLM.
+        
+        Args:
+            text: 输入文本
+            use_job_prompt: 是否使用招聘职位专用的 prompt
+            major: 专业名称，用于强调数据驱动
+        """
+        prompt_type = "招聘数据" if use_job_prompt else "通用"
+        print(f"DEBUG: Starting LLM extraction with model {self.model}, prompt_type={prompt_type}...")
         
+        prompt, user_content = self._build_extraction_messages(text, use_job_prompt, major)
+        path = self._extraction_cache_path(prompt, user_content)
+        cached = self._read_extraction_cache(path)
+        if cached is not None:
+            return cached
         try:
-            response = await self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": prompt},
-                    {"role": "user", "content": user_content}
-                ],
-                response_format={"type": "json_object"},
-                temperature=0.1
-            )
-            
-            content = response.choices[0].message.content
-            result = json.loads(content)
-            
-            # 验证结果是否有效
-            entities = result.get('entities', [])
-            relationships = result.get('relationships', [])
-            
-            # 统计各类实体数量
-            type_counts = {}
-            for e in entities:
-                etype = e.get('type', 'Unknown')
-                type_counts[etype] = type_counts.get(etype, 0) + 1
-            
-            print(f"DEBUG: LLM returned {len(entities)} entities, {len(relationships)} relationships")
-            print(f"DEBUG: Entity breakdown: {type_counts}")
-            
-            if len(entities) < 3:
-                print(f"WARNING: LLM returned only {len(entities)} entities, may be using template")
-            else:
-                # 打印前5个实体用于调试
-                for e in entities[:5]:
-                    print(f"  - {e.get('name')} ({e.get('type')})")
-            
-            return result
+            result = await self._request_extraction(prompt, user_content)
         except Exception as e:
             print(f"LLM Extraction Error: {e}")
             # Return mock data on error for demonstration
             return self._get_mock_kg_data()
+        self._write_extraction_cache(path, result)
+        return result
+
+    @staticmethod
+    def _llm_cache_path(ext: str, *parts: str) -> str:
+        """LLM 响应磁盘缓存路径：按请求内容（模型、消息、温度等）逐段哈希"""
+        digest = hashlib.blake2b(digest_size=16)
+        for part in parts:
+            digest.update(part.encode('utf-8'))
+            digest.update(b"\0")
+        return os.path.join(_EXTRACTION_CACHE_DIR, digest.hexdigest() + ext)
+
+    def _extraction_cache_path(self, prompt: str, user_content: str) -> str:
+        """抽取结果磁盘缓存路径：按 (模型, system prompt, user message) 哈希"""
+        ext = ".msgpack" if msgspec is not None else ".json"
+        return self._llm_cache_path(ext, self.model, prompt, user_content)
+
+    @staticmethod
+    def _read_extraction_cache(path: str) -> Optional[Dict[str, Any]]:
+        """读取抽取结果缓存；未命中或读取失败返回 None"""
+        try:
+            with open(path, 'rb') as f:
+                raw = f.read()
+            return _MSGPACK_DECODER.decode(raw) if msgspec is not None else orjson.loads(raw)
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"Error reading extraction cache {path}: {e}")
+        return None
+
+    @staticmethod
+    def _write_extraction_cache(path: str, result: Dict[str, Any]):
+        try:
+            os.makedirs(_EXTRACTION_CACHE_DIR, exist_ok=True)
+            with open(path, 'wb') as f:
+                f.write(_MSGPACK_ENCODER.encode(result) if msgspec is not None else orjson.dumps(result))
+        except Exception as e:
+            print(f"Error saving extraction cache {path}: {e}")
+
+    async def extract_knowledge_batch(self, texts: List[str], use_job_prompt: bool = False,
+                                      major: str = None, concurrency: int = 8) -> List[Dict[str, Any]]:
+        """
+        批量抽取：并发调用 LLM（Semaphore 限制同时在途的请求数），结果按输入顺序返回
+        相同输入命中磁盘缓存时不再请求 LLM；调用失败返回模拟数据且不写缓存
+        """
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+
+        async def _extract_one(text: str) -> Dict[str, Any]:
+            prompt, user_content = self._build_extraction_messages(text, use_job_prompt, major)
+            path = self._extraction_cache_path(prompt, user_content)
+            cached = self._read_extraction_cache(path)
+            if cached is not None:
+                return cached
+
+            try:
+                async with semaphore:
+                    result = await self._request_extraction(prompt, user_content)
+            except Exception as e:
+                print(f"LLM Extraction Error: {e}")
+                return self._get_mock_kg_data()
+
+            self._write_extraction_cache(path, result)
+            return result
+
+        return await asyncio.gather(*(_extract_one(text) for text in texts))
+
+    @staticmethod
+    def _merge_extraction_chunks(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        合并分块抽取的结果：同类型同名实体只保留首个，各块内的 id（如 e1）可能重复，
+        按块重映射后再改写关系，重复关系只保留一条
+        """
+        entities: List[Dict[str, Any]] = []
+        relationships: List[Dict[str, Any]] = []
+        kept_ids: Dict[tuple, Any] = {}
+        used_ids = set()
+        seen_rels = set()
+
+        for index, result in enumerate(results):
+            local_ids = {}
+            for entity in result.get('entities', []):
+                old_id = entity.get('id')
+                key = (entity.get('type'), _entity_name_key(entity.get('name') or ''))
+                new_id = kept_ids.get(key)
+                if new_id is None:
+                    new_id = old_id
+                    if new_id in used_ids:
+                        new_id = f"{old_id}_{index}"
+                        entity = {**entity, "id": new_id}
+                    kept_ids[key] = new_id
+                    used_ids.add(new_id)
+                    entities.append(entity)
+                local_ids[old_id] = new_id
+
+            for rel in result.get('relationships', []):
+                head = local_ids.get(rel.get('head'), rel.get('head'))
+                tail = local_ids.get(rel.get('tail'), rel.get('tail'))
+                rel_key = (head, rel.get('relation'), tail)
+                if rel_key in seen_rels:
+                    continue
+                seen_rels.add(rel_key)
+                relationships.append({**rel, "head": head, "tail": tail})
+
+        return {"entities": entities, "relationships": relationships}
 
     def _get_mock_kg_data(self):
         """返回更丰富的模拟数据，用于 LLM 调用失败时"""
@@ -287,12 +908,15 @@ class KGService:
             ]
         }
 
-    def _safe_text(self, value: Any) -> str:
+    @staticmethod
+    def _safe_text(value: Any) -> str:
         """Normalize text and filter empty/nan values."""
         if value is None:
             return ""
-        text = str(value).strip()
-        if not text or text.lower() == "nan":
+        # Fast path: values are almost always str already, skip the str() round-trip
+        text = (value if type(value) is str else str(value)).strip()
+        # Only 3-char strings can be "nan", so lower() runs rarely
+        if not text or (len(text) == 3 and text.lower() == "nan"):
             return ""
         return text
 
@@ -302,10 +926,10 @@ class KGService:
         if not text:
             return 0.0
 
-        nums = re.findall(r"\d+(?:\.\d+)?", text)
+        nums = _NUM_RE.findall(text)
         if not nums:
             return 0.0
-        value = max(float(n) for n in nums)
+        value = max(map(float, nums))
 
         if "万" in text and "/年" in text:
             return (value * 10000) / 12
@@ -317,26 +941,28 @@ class KGService:
 
     def _is_high_quality_job(self, job: Dict[str, Any]) -> bool:
         """Heuristic quality scoring for job postings."""
+        # 先算廉价的判断，分数已定时直接返回，薪资正则解析放在最后
         score = 0
-        salary_max = self._parse_salary_max(self._safe_text(job.get("薪资")))
-        if salary_max >= 10000:
-            score += 1
-
-        company = self._safe_text(job.get("单位名称"))
-        company_scale = self._safe_text(job.get("单位规模"))
-        size_keywords = ("上市", "500强", "龙头", "央企", "国企", "大型", "集团")
-        if any(k in company for k in size_keywords) or any(k in company_scale for k in size_keywords):
+        if len(self._safe_text(job.get("职位描述"))) >= 80:
             score += 1
 
         edu = self._safe_text(job.get("学历要求"))
-        if any(k in edu for k in ("本科", "硕士", "博士")):
+        if any(k in edu for k in _QUALITY_EDU_KEYWORDS):
             score += 1
+            if score >= 2:
+                return True
 
-        desc = self._safe_text(job.get("职位描述"))
-        if len(desc) >= 80:
+        company = self._safe_text(job.get("单位名称"))
+        company_scale = self._safe_text(job.get("单位规模"))
+        if any(k in company for k in _QUALITY_SIZE_KEYWORDS) or any(k in company_scale for k in _QUALITY_SIZE_KEYWORDS):
             score += 1
+            if score >= 2:
+                return True
 
-        return score >= 2
+        # 薪资最多加 1 分，前三项均未命中时无需解析
+        if score == 0:
+            return False
+        return self._parse_salary_max(job.get("薪资")) >= 10000
 
     def _discover_reference_files(self, keywords: List[str]) -> List[str]:
         """Search project-side files by keyword for industry/policy agents."""
@@ -347,60 +973,20 @@ class KGService:
             os.path.join(backend_dir, "data"),
             os.path.join(backend_dir, "uploads"),
         ]
-        valid_ext = {".pdf", ".docx", ".txt", ".md", ".csv", ".xlsx", ".xls"}
-        hits: List[str] = []
-        lower_keywords = [k.lower() for k in keywords if self._safe_text(k)]
-
-        for base in candidates:
-            if not os.path.exists(base):
-                continue
-            for root, _, files in os.walk(base):
-                for filename in files:
-                    ext = os.path.splitext(filename)[1].lower()
-                    if ext not in valid_ext:
-                        continue
-                    name_lower = filename.lower()
-                    if any(k in name_lower for k in lower_keywords):
-                        hits.append(os.path.join(root, filename))
-                        if len(hits) >= 20:
-                            return hits
-        return hits
-
-    def _is_noise_entity_name(self, name: str) -> bool:
-        """
-        Filter placeholder or malformed labels that should not become KG nodes.
-        """
-        text = self._safe_text(name)
-        if not text:
-            return True
-
-        # Explicit placeholders created by older fallback strategies.
-        placeholder_keywords = (
-            "补充节点",
-            "专业能力补充",
-            "关键技能补充",
-            "职业素质补充",
-            "支撑课程补充",
-            "专业核心节点",
-        )
-        if any(k in text for k in placeholder_keywords):
-            return True
-
-        # Typical malformed level labels like "第X级/几级" that are not semantic nodes.
-        if re.search(r"第[0-9一二三四五六七八九十]+级", text):
-            return True
-        if "几级" in text:
-            return True
-
-        return False
+        lower_keywords = tuple(k.lower() for k in keywords if self._safe_text(k))
+        bases = tuple(base for base in candidates if os.path.exists(base))
+        if not bases or not lower_keywords:
+            return []
+        # 参考文件很少变化：目录未变动时直接复用上次扫描结果
+        return list(_scan_reference_files(bases, lower_keywords, _reference_dirs_stamp(bases)))
 
     def _normalize_entity(self, entity: Dict[str, Any], idx: int) -> Optional[Dict[str, Any]]:
-        """Clean single entity from LLM/rule output."""
+        """Clean single entity from LLM output."""
         entity_type = self._safe_text(entity.get("type"))
         name = self._safe_text(entity.get("name"))
         if not entity_type or not name:
             return None
-        if self._is_noise_entity_name(name):
+        if _is_noise_entity_name(name):
             return None
 
         category_mapping = {
@@ -428,67 +1014,9 @@ class KGService:
         """
         Build additional entities/relationships from job text rules
         to boost Capability/Skill/Quality/Course coverage.
+        Entities come out already normalized (id/name/type/category set);
+        relationships are columnar: parallel "head"/"relation"/"tail" lists.
         """
-        skill_terms = {
-            "python": "Python",
-            "java": "Java",
-            "c++": "C++",
-            "c语言": "C语言",
-            "matlab": "MATLAB",
-            "autocad": "AutoCAD",
-            "plc": "PLC编程",
-            "单片机": "单片机开发",
-            "嵌入式": "嵌入式开发",
-            "数据库": "数据库设计",
-            "sql": "SQL",
-            "电路": "电路分析",
-            "仿真": "系统仿真",
-            "测试": "测试与调试",
-            "linux": "Linux",
-            "算法": "算法设计",
-            "自动化": "自动化控制",
-        }
-        quality_terms = {
-            "沟通": "沟通能力",
-            "团队": "团队协作",
-            "责任": "责任心",
-            "学习": "学习能力",
-            "抗压": "抗压能力",
-            "执行": "执行力",
-            "细心": "细心严谨",
-            "创新": "创新意识",
-            "协调": "组织协调能力",
-        }
-        capability_terms = {
-            "电力": "电力系统设计能力",
-            "自动化": "自动化控制能力",
-            "嵌入式": "嵌入式系统开发能力",
-            "plc": "工业控制与PLC调试能力",
-            "算法": "算法建模与优化能力",
-            "测试": "系统测试与故障诊断能力",
-            "项目": "工程项目实施能力",
-            "电路": "电路分析与设计能力",
-        }
-        course_map = {
-            "Python": "Python程序设计",
-            "Java": "Java程序设计",
-            "C++": "高级语言程序设计",
-            "C语言": "C语言程序设计",
-            "MATLAB": "工程计算与MATLAB",
-            "AutoCAD": "工程制图与CAD",
-            "PLC编程": "PLC原理与应用",
-            "单片机开发": "单片机原理",
-            "嵌入式开发": "嵌入式系统设计",
-            "数据库设计": "数据库原理",
-            "SQL": "数据库应用技术",
-            "电路分析": "电路分析基础",
-            "系统仿真": "控制系统仿真",
-            "测试与调试": "自动化测试技术",
-            "Linux": "Linux系统应用",
-            "算法设计": "数据结构与算法",
-            "自动化控制": "自动控制原理",
-        }
-
         text_blob_parts = []
         for job in related_jobs:
             text_blob_parts.append(self._safe_text(job.get("职位名称")))
@@ -496,48 +1024,64 @@ class KGService:
             text_blob_parts.append(self._safe_text(job.get("职位描述")))
         text_blob = " ".join([p for p in text_blob_parts if p]).lower()
 
-        skills, qualities, capabilities, courses = set(), set(), set(), set()
+        # dict 当有序集合用：去重，顺序由关键词表（_SKILL_TERMS 等）的定义顺序决定，
+        # 与关键词在文本中的出现顺序无关，后面编号无需再排序
+        skills, qualities, capabilities, courses = {}, {}, {}, {}
 
-        for k, v in skill_terms.items():
-            if k in text_blob:
-                skills.add(v)
-                if v in course_map:
-                    courses.add(course_map[v])
-        for k, v in quality_terms.items():
-            if k in text_blob:
-                qualities.add(v)
-        for k, v in capability_terms.items():
-            if k in text_blob:
-                capabilities.add(v)
+        if _RULE_AUTOMATON is not None:
+            # 单次线性扫描 text_blob 得到命中的关键词集合；编号顺序仍按关键词表，与无自动机时一致
+            hits = {keyword for _, keyword in _RULE_AUTOMATON.iter(text_blob)}
+            matched = hits.__contains__
+        else:
+            matched = text_blob.__contains__
+
+        for k, v in _SKILL_TERMS.items():
+            if matched(k):
+                skills[v] = None
+                if v in _COURSE_MAP:
+                    courses[_COURSE_MAP[v]] = None
+        for k, v in _QUALITY_TERMS.items():
+            if matched(k):
+                qualities[v] = None
+        for k, v in _CAPABILITY_TERMS.items():
+            if matched(k):
+                capabilities[v] = None
 
         # Fallback seeds: guarantee richer nodes even on sparse descriptions.
-        skills.update(["数据分析", "工程实践", "系统调试"])
-        qualities.update(["职业道德", "团队协作", "学习能力"])
-        capabilities.update(["工程问题分析能力", "技术方案设计能力"])
-        courses.update(["工程实践训练", "专业综合实训"])
+        skills.update(dict.fromkeys(("数据分析", "工程实践", "系统调试")))
+        qualities.update(dict.fromkeys(("职业道德", "团队协作", "学习能力")))
+        capabilities.update(dict.fromkeys(("工程问题分析能力", "技术方案设计能力")))
+        courses.update(dict.fromkeys(("工程实践训练", "专业综合实训")))
 
         entities: List[Dict[str, Any]] = []
-        relationships: List[Dict[str, Any]] = []
+        heads: List[str] = []
+        relations: List[str] = []
+        tails: List[str] = []
+
+        def link(head: str, relation: str, tail: str):
+            heads.append(head)
+            relations.append(relation)
+            tails.append(tail)
 
         cap_ids, skill_ids, quality_ids, course_ids = [], [], [], []
 
-        for i, name in enumerate(sorted(capabilities), 1):
+        for i, name in enumerate(capabilities, 1):
             cid = f"rule_cap_{i}"
             cap_ids.append(cid)
             entities.append({"id": cid, "name": name, "type": "Capability", "category": "Capability"})
-            relationships.append({"head": major_entity_id, "relation": "CULTIVATES_CAPABILITY", "tail": cid})
+            link(major_entity_id, "CULTIVATES_CAPABILITY", cid)
 
-        for i, name in enumerate(sorted(skills), 1):
+        for i, name in enumerate(skills, 1):
             sid = f"rule_skill_{i}"
             skill_ids.append(sid)
             entities.append({"id": sid, "name": name, "type": "Skill", "category": "Skill"})
 
-        for i, name in enumerate(sorted(qualities), 1):
+        for i, name in enumerate(qualities, 1):
             qid = f"rule_quality_{i}"
             quality_ids.append(qid)
             entities.append({"id": qid, "name": name, "type": "Quality", "category": "Quality"})
 
-        for i, name in enumerate(sorted(courses), 1):
+        for i, name in enumerate(courses, 1):
             coid = f"rule_course_{i}"
             course_ids.append(coid)
             entities.append({"id": coid, "name": name, "type": "Course", "category": "Support"})
@@ -545,15 +1089,15 @@ class KGService:
         # Build dense but bounded relationships.
         for i, cap_id in enumerate(cap_ids):
             if skill_ids:
-                relationships.append({"head": cap_id, "relation": "INCLUDES_SKILL", "tail": skill_ids[i % len(skill_ids)]})
-                relationships.append({"head": cap_id, "relation": "INCLUDES_SKILL", "tail": skill_ids[(i + 1) % len(skill_ids)]})
+                link(cap_id, "INCLUDES_SKILL", skill_ids[i % len(skill_ids)])
+                link(cap_id, "INCLUDES_SKILL", skill_ids[(i + 1) % len(skill_ids)])
             if quality_ids:
-                relationships.append({"head": cap_id, "relation": "REQUIRES_QUALITY", "tail": quality_ids[i % len(quality_ids)]})
+                link(cap_id, "REQUIRES_QUALITY", quality_ids[i % len(quality_ids)])
         for i, course_id in enumerate(course_ids):
             if cap_ids:
-                relationships.append({"head": course_id, "relation": "SUPPORTS_CAPABILITY", "tail": cap_ids[i % len(cap_ids)]})
+                link(course_id, "SUPPORTS_CAPABILITY", cap_ids[i % len(cap_ids)])
 
-        return {"entities": entities, "relationships": relationships}
+        return {"entities": entities, "relationships": {"head": heads, "relation": relations, "tail": tails}}
 
     def _merge_and_enrich_kg_data(
         self,
@@ -564,218 +1108,130 @@ class KGService:
         major_entity_id: str,
     ) -> Dict[str, Any]:
         """Merge entities robustly and enforce minimum counts for key node types."""
-        target_minimums = {
-            "Major": 1,
-            "Capability": 18,
-            "Skill": 30,
-            "Quality": 12,
-            "Course": 16,
-        }
-
-        fallback_pools = {
-            "Capability": [
-                "工程问题分析能力",
-                "技术方案设计能力",
-                "系统集成与联调能力",
-                "数据驱动决策能力",
-                "需求分析与建模能力",
-                "项目实施与交付能力",
-                "质量控制与持续改进能力",
-                "跨学科协同创新能力",
-                "现场故障诊断能力",
-                "系统优化与运维能力",
-                "安全规范执行能力",
-                "标准化设计能力",
-                "实验设计与验证能力",
-                "工程文档编制能力",
-                "业务理解与技术转化能力",
-                "新技术学习与迁移能力",
-                "成本与效益评估能力",
-                "风险识别与应对能力",
-                "专业工具应用能力",
-                "职业场景综合应用能力",
-            ],
-            "Skill": [
-                "Python",
-                "Java",
-                "C语言",
-                "C++",
-                "SQL",
-                "MySQL",
-                "Linux",
-                "Git",
-                "MATLAB",
-                "AutoCAD",
-                "PLC编程",
-                "单片机开发",
-                "电路分析",
-                "控制系统仿真",
-                "数据可视化",
-                "需求分析",
-                "系统测试与调试",
-                "接口联调",
-                "文档写作",
-                "项目管理工具",
-                "Office办公软件",
-                "数据清洗",
-                "统计分析",
-                "实验仪器操作",
-                "安全操作规范",
-                "故障排查",
-                "流程优化",
-                "质量管理基础",
-                "技术方案汇报",
-                "跨团队沟通",
-                "代码规范",
-                "版本管理",
-                "自动化脚本开发",
-                "基础算法设计",
-                "工程制图",
-            ],
-            "Quality": [
-                "团队协作",
-                "沟通表达",
-                "责任心",
-                "执行力",
-                "学习能力",
-                "抗压能力",
-                "时间管理",
-                "问题解决意识",
-                "职业道德",
-                "质量意识",
-                "服务意识",
-                "创新意识",
-                "组织协调能力",
-                "细心严谨",
-                "持续改进意识",
-            ],
-            "Course": [
-                "程序设计基础",
-                "数据结构",
-                "数据库原理",
-                "操作系统基础",
-                "计算机网络基础",
-                "自动控制原理",
-                "电路分析基础",
-                "工程制图与CAD",
-                "PLC原理与应用",
-                "单片机原理",
-                "嵌入式系统设计",
-                "工程项目管理",
-                "系统测试技术",
-                "专业综合实训",
-                "工程实践训练",
-                "毕业设计（论文）",
-                "职业素养与沟通",
-                "创新创业基础",
-                "数据分析与可视化",
-                "生产实习",
-            ],
-        }
-
+        safe_text = self._safe_text
         merged_entities = list(base_entities)
         merged_relationships = list(base_relationships)
 
-        # Deduplicate by (type, normalized name), not only by id.
-        entity_keys = set()
+        # Deduplicate by (type, name key), not only by id: name keys ignore case, spaces and punctuation.
+        # Maps each key to the entity kept for it, so later spellings become aliases of that entity.
+        entity_keys: Dict[tuple, Dict[str, Any]] = {}
         for e in merged_entities:
-            e_type = self._safe_text(e.get("type"))
-            e_name = self._safe_text(e.get("name")).lower()
+            e_type = safe_text(e.get("type"))
+            e_name = safe_text(e.get("name"))
             if e_type and e_name:
-                entity_keys.add((e_type, e_name))
+                entity_keys.setdefault((e_type, _entity_name_key(e_name)), e)
+
+        # Ids of dropped duplicates -> id of the kept entity, so their relationships still connect.
+        id_remap: Dict[str, str] = {}
+
+        def merge_entity(entity: Dict[str, Any]):
+            key = (entity["type"], _entity_name_key(entity["name"]))
+            kept = entity_keys.get(key)
+            if kept is None:
+                merged_entities.append(entity)
+                entity_keys[key] = entity
+                return
+            kept_id = kept.get("id")
+            if kept_id and entity["id"] != kept_id:
+                id_remap[entity["id"]] = kept_id
+            if entity["name"] != kept.get("name"):
+                aliases = kept.setdefault("aliases", [])
+                if entity["name"] not in aliases:
+                    aliases.append(entity["name"])
+
+        # (head, relation, tail) of every valid relationship; each one is normalized exactly once.
+        def rel_key(rel: Dict[str, Any]):
+            head = safe_text(rel.get("head"))
+            relation = safe_text(rel.get("relation"))
+            tail = safe_text(rel.get("tail"))
+            return (head, relation, tail) if head and relation and tail else None
+
+        relation_keys = {key for key in map(rel_key, merged_relationships) if key}
+
+        def remap(key: tuple) -> tuple:
+            head, relation, tail = key
+            return (id_remap.get(head, head), relation, id_remap.get(tail, tail))
 
         # LLM first
         llm_entities = llm_data.get("entities", []) if llm_data else []
         for idx, raw_entity in enumerate(llm_entities, 1):
             entity = self._normalize_entity(raw_entity, idx)
-            if not entity:
-                continue
-            key = (entity["type"], entity["name"].lower())
-            if key in entity_keys:
-                continue
-            merged_entities.append(entity)
-            entity_keys.add(key)
+            if entity:
+                merge_entity(entity)
 
         for rel in (llm_data.get("relationships", []) if llm_data else []):
-            if self._safe_text(rel.get("head")) and self._safe_text(rel.get("relation")) and self._safe_text(rel.get("tail")):
+            key = rel_key(rel)
+            if key:
+                if id_remap and (key[0] in id_remap or key[2] in id_remap):
+                    key = remap(key)
+                    rel = {**rel, "head": key[0], "tail": key[2]}
                 merged_relationships.append(rel)
+                relation_keys.add(key)
 
         # Rule enhancement to guarantee richer graph.
+        # Rule entities are built from curated tables with canonical fields; no normalization needed.
         rule_data = self._build_rule_enhancement(related_jobs, major_entity_id)
-        for idx, raw_entity in enumerate(rule_data["entities"], 1):
-            entity = self._normalize_entity(raw_entity, idx + 50000)
-            if not entity:
-                continue
-            key = (entity["type"], entity["name"].lower())
-            if key in entity_keys:
-                continue
-            merged_entities.append(entity)
-            entity_keys.add(key)
-
-        for rel in rule_data["relationships"]:
-            if self._safe_text(rel.get("head")) and self._safe_text(rel.get("relation")) and self._safe_text(rel.get("tail")):
-                merged_relationships.append(rel)
+        for entity in rule_data["entities"]:
+            merge_entity(entity)
+
+        # Rule relationships are columnar and already clean; dicts are only built for the merged output.
+        rule_rels = rule_data["relationships"]
+        for key in zip(rule_rels["head"], rule_rels["relation"], rule_rels["tail"]):
+            if all(key):
+                if id_remap:
+                    key = remap(key)
+                merged_relationships.append({"head": key[0], "relation": key[1], "tail": key[2]})
+                relation_keys.add(key)
 
         # Final count check with curated fallback pools.
-        type_counts: Dict[str, int] = {}
-        for e in merged_entities:
-            et = self._safe_text(e.get("type")) or "Unknown"
-            type_counts[et] = type_counts.get(et, 0) + 1
-
-        relation_keys = set()
-        for rel in merged_relationships:
-            head = self._safe_text(rel.get("head"))
-            relation = self._safe_text(rel.get("relation"))
-            tail = self._safe_text(rel.get("tail"))
-            if head and relation and tail:
-                relation_keys.add((head, relation, tail))
-
-        for etype, minimum in target_minimums.items():
+        type_counts = Counter(safe_text(e.get("type")) or "Unknown" for e in merged_entities)
+
+        # First Capability with an id; entities are only appended, so once set it never changes.
+        anchor_cap = next(
+            (e["id"] for e in merged_entities if e.get("type") == "Capability" and e.get("id")),
+            None,
+        )
+        for etype, minimum in _TARGET_MINIMUMS.items():
             missing = minimum - type_counts.get(etype, 0)
             if missing <= 0:
                 continue
-            candidates = fallback_pools.get(etype, [])
+            candidates = _FALLBACK_POOLS_NORM.get(etype, ())
             added = 0
-            for name in candidates:
+            for name, name_key in candidates:
                 if added >= missing:
                     break
-                if self._is_noise_entity_name(name):
-                    continue
-                key = (etype, name.lower())
+                key = (etype, name_key)
                 if key in entity_keys:
                     continue
+                if _is_noise_entity_name(name):
+                    continue
 
-                category = {
-                    "Major": "Core",
-                    "Capability": "Capability",
-                    "Skill": "Skill",
-                    "Quality": "Quality",
-                    "Course": "Support",
-                }.get(etype, "Other")
+                category = _SEED_CATEGORY_BY_TYPE.get(etype, "Other")
 
                 entity_id = f"seed_{etype.lower()}_{len(merged_entities) + 1}"
-                merged_entities.append({
+                seeded = {
                     "id": entity_id,
                     "name": name,
                     "type": etype,
                     "category": category,
-                })
-                entity_keys.add(key)
+                }
+                merged_entities.append(seeded)
+                entity_keys[key] = seeded
                 added += 1
-                type_counts[etype] = type_counts.get(etype, 0) + 1
+                type_counts[etype] += 1
 
                 # Link seeded nodes into the graph so they are not isolated.
                 if etype == "Capability":
+                    if anchor_cap is None:
+                        anchor_cap = entity_id
                     rel = (major_entity_id, "CULTIVATES_CAPABILITY", entity_id)
                     if rel not in relation_keys:
                         merged_relationships.append({"head": rel[0], "relation": rel[1], "tail": rel[2]})
                         relation_keys.add(rel)
                     continue
 
-                cap_ids = [e["id"] for e in merged_entities if e.get("type") == "Capability" and self._safe_text(e.get("id"))]
-                if not cap_ids:
+                if anchor_cap is None:
                     continue
-                anchor_cap = cap_ids[0]
                 if etype == "Skill":
                     rel = (anchor_cap, "INCLUDES_SKILL", entity_id)
                 elif etype == "Quality":
@@ -793,7 +1249,7 @@ class KGService:
     async def build_graph_for_major_stream(self, school: str, college: str, major: str):
         """
         Generator that yields progress steps and finally the graph data.
-        Format: JSON string
+        Format: NDJSON lines as UTF-8 bytes
         
         注意：每次调用都会重新从数据源抽取，不使用缓存
         """
@@ -802,81 +1258,59 @@ class KGService:
         print(f"[KGService] 开始为 {school}/{college}/{major} 构建图谱（禁用缓存，实时抽取）")
 
         # Step 1: Initialization
-        yield json.dumps({
-            "step_id": 1,
-            "message": f"正在初始化智能体环境... (School: {school})",
-            "status": "completed"
-        }) + "\n"
+        yield _step_event(1, f"正在初始化智能体环境... (School: {school})", "completed")
 
         # Step 2: Data Loading (School Specific)
-        yield json.dumps({
-            "step_id": 2,
-            "message": f"正在检索 {school} 的相关招聘会与宣讲会数据...",
-            "status": "running"
-        }) + "\n"
+        yield _step_event(2, f"正在检索 {school} 的相关招聘会与宣讲会数据...", "running")
+
+        # 各数据源互不依赖：先全部放到线程里并发执行，下面按原顺序逐个等待结果，
+        # 进度消息顺序不变，总耗时取决于最慢的一个来源而不是各来源之和
+        # （加载器在线程内获取，首次使用时的 CSV 加载也不会阻塞事件循环）
+        cq_task = asyncio.create_task(asyncio.to_thread(
+            lambda: get_chongqing_loader().search_jobs_by_major(major, limit=None)))
+        legacy_task = asyncio.create_task(asyncio.to_thread(
+            lambda: get_data_loader().search_jobs_by_major(major, limit=None)))
+        industry_task = asyncio.create_task(asyncio.to_thread(self._discover_reference_files, ["行业", "发展报告", "产业"]))
+        policy_task = asyncio.create_task(asyncio.to_thread(self._discover_reference_files, ["政策", "意见", "通知", "指导"]))
+        talks_task = asyncio.create_task(asyncio.to_thread(
+            lambda: get_data_loader().get_related_talks(school, college=college)))
+        fairs_task = asyncio.create_task(asyncio.to_thread(
+            lambda: get_data_loader().get_related_fairs(school)))
 
         # Agent: start coordinator
-        yield json.dumps({
-            "event_type": "agent_status",
-            "step_id": 2,
-            "agent_id": "start",
-            "agent_status": "running",
-            "status": "running",
-            "message": "调度智能体正在初始化数据采集任务..."
-        }) + "\n"
-        await asyncio.sleep(0.25)
-        yield json.dumps({
-            "event_type": "agent_status",
-            "step_id": 2,
-            "agent_id": "start",
-            "agent_status": "done",
-            "status": "completed",
-            "message": "调度智能体完成初始化，开始分派子智能体。"
-        }) + "\n"
+        yield _agent_event(2, "start", "running", "running", "调度智能体正在初始化数据采集任务...")
+        await asyncio.sleep(0)
+        yield _agent_event(2, "start", "done", "completed", "调度智能体完成初始化，开始分派子智能体。")
 
         # Agent: massive jobs (real logic + multi-source merge + dedup)
-        yield json.dumps({
-            "event_type": "agent_status",
-            "step_id": 2,
-            "agent_id": "src-1",
-            "agent_status": "running",
-            "status": "running",
-            "message": f"岗位采集智能体正在检索 {major} 相关岗位..."
-        }) + "\n"
-        cq_jobs = chongqing_loader.search_jobs_by_major(major, limit=None)
-        yield json.dumps({
-            "event_type": "agent_status",
-            "step_id": 2,
-            "agent_id": "src-1",
-            "agent_status": "running",
-            "status": "running",
-            "message": f"岗位采集智能体：重庆市招聘数据命中 {len(cq_jobs)} 条，继续补充其他来源..."
-        }) + "\n"
-        legacy_jobs = data_loader.search_jobs_by_major(major, limit=None)
+        yield _agent_event(2, "src-1", "running", "running", f"岗位采集智能体正在检索 {major} 相关岗位...")
+        cq_jobs = await cq_task
+        yield _agent_event(2, "src-1", "running", "running", f"岗位采集智能体：重庆市招聘数据命中 {len(cq_jobs)} 条，继续补充其他来源...")
+        legacy_jobs = await legacy_task
         raw_merged_jobs = cq_jobs + legacy_jobs
 
         seen_job_keys = set()
         agent_related_jobs = []
+        # 保留岗位的规范化字段（与 agent_related_jobs 按下标对齐），Step 4 直接复用，不再逐个清洗
+        job_names: List[str] = []
+        job_companies: List[str] = []
+        job_descs: List[str] = []
         dedup_interval = max(1, len(raw_merged_jobs) // 4) if raw_merged_jobs else 1
         for idx, job in enumerate(raw_merged_jobs, 1):
             job_name = self._safe_text(job.get("职位名称"))
             company = self._safe_text(job.get("单位名称"))
             desc = self._safe_text(job.get("职位描述"))
-            key = f"{job_name.lower()}|{company.lower()}|{desc[:80].lower()}"
+            key = (job_name.casefold(), company.casefold(), desc[:80].casefold())
             if job_name and key not in seen_job_keys:
                 seen_job_keys.add(key)
                 agent_related_jobs.append(job)
+                job_names.append(job_name)
+                job_companies.append(company)
+                job_descs.append(desc)
 
             if idx % dedup_interval == 0 or idx == len(raw_merged_jobs):
-                yield json.dumps({
-                    "event_type": "agent_status",
-                    "step_id": 2,
-                    "agent_id": "src-1",
-                    "agent_status": "running",
-                    "status": "running",
-                    "message": f"岗位采集智能体：已处理 {idx}/{len(raw_merged_jobs)} 条，去重后 {len(agent_related_jobs)} 条。"
-                }) + "\n"
-                await asyncio.sleep(0.12)
+                yield _agent_event(2, "src-1", "running", "running", f"岗位采集智能体：已处理 {idx}/{len(raw_merged_jobs)} 条，去重后 {len(agent_related_jobs)} 条。")
+                await asyncio.sleep(0)
 
         if cq_jobs and legacy_jobs:
             agent_job_source = "重庆市招聘数据 + 旧数据源"
@@ -887,152 +1321,52 @@ class KGService:
         else:
             agent_job_source = "无可用数据源"
 
-        yield json.dumps({
-            "event_type": "agent_status",
-            "step_id": 2,
-            "agent_id": "src-1",
-            "agent_status": "done",
-            "status": "completed",
-            "message": f"岗位采集智能体完成：来源[{agent_job_source}]，最终岗位 {len(agent_related_jobs)} 条。"
-        }) + "\n"
+        yield _agent_event(2, "src-1", "done", "completed", f"岗位采集智能体完成：来源[{agent_job_source}]，最终岗位 {len(agent_related_jobs)} 条。")
 
         # Agent: high quality jobs (real logic + scored filtering)
-        yield json.dumps({
-            "event_type": "agent_status",
-            "step_id": 2,
-            "agent_id": "src-2",
-            "agent_status": "running",
-            "status": "running",
-            "message": "质量筛选智能体正在评估高质量岗位..."
-        }) + "\n"
+        yield _agent_event(2, "src-2", "running", "running", "质量筛选智能体正在评估高质量岗位...")
         high_quality_jobs = []
         quality_interval = max(1, len(agent_related_jobs) // 4) if agent_related_jobs else 1
-        for idx, job in enumerate(agent_related_jobs, 1):
-            if self._is_high_quality_job(job):
-                high_quality_jobs.append(job)
-
-            if idx % quality_interval == 0 or idx == len(agent_related_jobs):
-                rate = (len(high_quality_jobs) / idx * 100) if idx else 0
-                yield json.dumps({
-                    "event_type": "agent_status",
-                    "step_id": 2,
-                    "agent_id": "src-2",
-                    "agent_status": "running",
-                    "status": "running",
-                    "message": f"质量筛选智能体：已评估 {idx}/{len(agent_related_jobs)} 条，高质量占比 {rate:.1f}%。"
-                }) + "\n"
-                await asyncio.sleep(0.12)
-        yield json.dumps({
-            "event_type": "agent_status",
-            "step_id": 2,
-            "agent_id": "src-2",
-            "agent_status": "done",
-            "status": "completed",
-            "message": f"质量筛选智能体完成：识别高质量岗位 {len(high_quality_jobs)} 条。"
-        }) + "\n"
+        # 按进度间隔分片筛选，每片只发一次进度
+        for start in range(0, len(agent_related_jobs), quality_interval):
+            chunk = agent_related_jobs[start:start + quality_interval]
+            high_quality_jobs.extend(filter(self._is_high_quality_job, chunk))
+            idx = start + len(chunk)
+            rate = len(high_quality_jobs) / idx * 100
+            yield _agent_event(2, "src-2", "running", "running", f"质量筛选智能体：已评估 {idx}/{len(agent_related_jobs)} 条，高质量占比 {rate:.1f}%。")
+            await asyncio.sleep(0)
+        yield _agent_event(2, "src-2", "done", "completed", f"质量筛选智能体完成：识别高质量岗位 {len(high_quality_jobs)} 条。")
 
         # Agent: industry files (file probe)
-        yield json.dumps({
-            "event_type": "agent_status",
-            "step_id": 2,
-            "agent_id": "src-3",
-            "agent_status": "running",
-            "status": "running",
-            "message": "行业分析智能体正在搜索行业发展文件..."
-        }) + "\n"
-        industry_files = self._discover_reference_files(["行业", "发展报告", "产业"])
+        yield _agent_event(2, "src-3", "running", "running", "行业分析智能体正在搜索行业发展文件...")
+        industry_files = await industry_task
         if industry_files:
-            ext_counter: Dict[str, int] = {}
-            for path in industry_files:
-                ext = os.path.splitext(path)[1].lower() or "unknown"
-                ext_counter[ext] = ext_counter.get(ext, 0) + 1
-            ext_summary = "，".join([f"{k}:{v}" for k, v in list(ext_counter.items())[:3]])
-            yield json.dumps({
-                "event_type": "agent_status",
-                "step_id": 2,
-                "agent_id": "src-3",
-                "agent_status": "done",
-                "status": "completed",
-                "message": f"行业分析智能体完成：发现 {len(industry_files)} 个文件（{ext_summary}）。"
-            }) + "\n"
+            ext_counter = Counter(os.path.splitext(path)[1].lower() or "unknown" for path in industry_files)
+            ext_summary = "，".join(f"{k}:{v}" for k, v in ext_counter.most_common(3))
+            yield _agent_event(2, "src-3", "done", "completed", f"行业分析智能体完成：发现 {len(industry_files)} 个文件（{ext_summary}）。")
         else:
-            yield json.dumps({
-                "event_type": "agent_status",
-                "step_id": 2,
-                "agent_id": "src-3",
-                "agent_status": "blocked",
-                "status": "completed",
-                "message": "行业分析智能体：未发现行业发展文件。"
-            }) + "\n"
+            yield _agent_event(2, "src-3", "blocked", "completed", "行业分析智能体：未发现行业发展文件。")
 
         # Agent: policy files (file probe)
-        yield json.dumps({
-            "event_type": "agent_status",
-            "step_id": 2,
-            "agent_id": "src-4",
-            "agent_status": "running",
-            "status": "running",
-            "message": "政策解析智能体正在搜索政策文件..."
-        }) + "\n"
-        policy_files = self._discover_reference_files(["政策", "意见", "通知", "指导"])
+        yield _agent_event(2, "src-4", "running", "running", "政策解析智能体正在搜索政策文件...")
+        policy_files = await policy_task
         if policy_files:
-            ext_counter: Dict[str, int] = {}
-            for path in policy_files:
-                ext = os.path.splitext(path)[1].lower() or "unknown"
-                ext_counter[ext] = ext_counter.get(ext, 0) + 1
-            ext_summary = "，".join([f"{k}:{v}" for k, v in list(ext_counter.items())[:3]])
-            yield json.dumps({
-                "event_type": "agent_status",
-                "step_id": 2,
-                "agent_id": "src-4",
-                "agent_status": "done",
-                "status": "completed",
-                "message": f"政策解析智能体完成：发现 {len(policy_files)} 个文件（{ext_summary}）。"
-            }) + "\n"
+            ext_counter = Counter(os.path.splitext(path)[1].lower() or "unknown" for path in policy_files)
+            ext_summary = "，".join(f"{k}:{v}" for k, v in ext_counter.most_common(3))
+            yield _agent_event(2, "src-4", "done", "completed", f"政策解析智能体完成：发现 {len(policy_files)} 个文件（{ext_summary}）。")
         else:
-            yield json.dumps({
-                "event_type": "agent_status",
-                "step_id": 2,
-                "agent_id": "src-4",
-                "agent_status": "blocked",
-                "status": "completed",
-                "message": "政策解析智能体：未发现政策文件。"
-            }) + "\n"
+            yield _agent_event(2, "src-4", "blocked", "completed", "政策解析智能体：未发现政策文件。")
 
         # Fetch Talks & Fairs
-        yield json.dumps({
-            "event_type": "agent_status",
-            "step_id": 2,
-            "agent_id": "verify",
-            "agent_status": "running",
-            "status": "running",
-            "message": "校验汇总智能体正在汇总多源数据..."
-        }) + "\n"
-        talks = data_loader.get_related_talks(school, college=college)
-        fairs = data_loader.get_related_fairs(school)
-        await asyncio.sleep(0.15)
-        yield json.dumps({
-            "event_type": "agent_status",
-            "step_id": 2,
-            "agent_id": "verify",
-            "agent_status": "done",
-            "status": "completed",
-            "message": f"校验汇总智能体完成：宣讲会 {len(talks)}，招聘会 {len(fairs)}，高质量岗位 {len(high_quality_jobs)}。"
-        }) + "\n"
-
-        yield json.dumps({
-            "step_id": 2,
-            "message": f"检索完成: 发现 {len(talks)} 场宣讲会 (相关学院: {college}), {len(fairs)} 场招聘会。",
-            "status": "completed"
-        }) + "\n"
+        yield _agent_event(2, "verify", "running", "running", "校验汇总智能体正在汇总多源数据...")
+        talks, fairs = await asyncio.gather(talks_task, fairs_task)
+        await asyncio.sleep(0)
+        yield _agent_event(2, "verify", "done", "completed", f"校验汇总智能体完成：宣讲会 {len(talks)}，招聘会 {len(fairs)}，高质量岗位 {len(high_quality_jobs)}。")
+
+        yield _step_event(2, f"检索完成: 发现 {len(talks)} 场宣讲会 (相关学院: {college}), {len(fairs)} 场招聘会。", "completed")
 
         # Step 3: Job Matching - 获取所有相关岗位
-        yield json.dumps({
-            "step_id": 3,
-            "message": f"正在匹配 {major} 专业的所有相关就业岗位数据...",
-            "status": "running",
-            "progress": {"current": 0, "total": 100, "stage": "搜索岗位"}
-        }) + "\n"
+        yield _step_event(3, f"正在匹配 {major} 专业的所有相关就业岗位数据...", "running", {"current": 0, "total": 100, "stage": "搜索岗位"})
 
         # Use agent-collected jobs for consistency with multi-agent stage.
         related_jobs = agent_related_jobs
@@ -1040,28 +1374,11 @@ class KGService:
         
         total_jobs = len(related_jobs)
         
-        yield json.dumps({
-            "step_id": 3,
-            "message": f"匹配完成: 从{data_source}找到 {total_jobs} 个相关岗位，将全部用于分析。",
-            "status": "completed",
-            "progress": {"current": total_jobs, "total": total_jobs, "stage": "岗位匹配完成"}
-        }) + "\n"
+        yield _step_event(3, f"匹配完成: 从{data_source}找到 {total_jobs} 个相关岗位，将全部用于分析。", "completed", {"current": total_jobs, "total": total_jobs, "stage": "岗位匹配完成"})
         
         # Step 4: Constructing Graph Nodes - 带进度显示
-        yield json.dumps({
-            "step_id": 4,
-            "message": f"正在构建基础图谱节点（共 {total_jobs} 个岗位）...",
-            "status": "running",
-            "progress": {"current": 0, "total": total_jobs, "stage": "构建节点"}
-        }) + "\n"
-        yield json.dumps({
-            "event_type": "agent_status",
-            "step_id": 4,
-            "agent_id": "build",
-            "agent_status": "running",
-            "status": "running",
-            "message": "图谱构建智能体正在初始化实体与关系网络..."
-        }) + "\n"
+        yield _step_event(4, f"正在构建基础图谱节点（共 {total_jobs} 个岗位）...", "running", {"current": 0, "total": total_jobs, "stage": "构建节点"})
+        yield _agent_event(4, "build", "running", "running", "图谱构建智能体正在初始化实体与关系网络...")
 
         entities = []
         relationships = []
@@ -1069,150 +1386,124 @@ class KGService:
         major_entity_id = f"major_{major}"
         entities.append({"id": major_entity_id, "name": major, "type": "Major", "category": "Core"})
 
-        # 构建 LLM 分析文本
-        combined_text_for_llm = f"专业名称：{major}\n所属学院：{college}\n所属学校：{school}\n\n"
-        combined_text_for_llm += f"基于重庆市招聘市场数据分析该专业对应的就业岗位和能力要求：\n\n"
+        # 未配置 API Key 时只用模拟数据，LLM 文本不会被使用，跳过统计与逐岗位拼接
+        use_llm = bool(settings.DEEPSEEK_API_KEY)
+
+        # 构建 LLM 分析文本：片段先收集到列表，最后一次性拼接（避免 += 反复复制整段文本）
+        llm_text_parts = [f"专业名称：{major}\n所属学院：{college}\n所属学校：{school}\n\n"]
+        llm_text_parts.append(f"基于重庆市招聘市场数据分析该专业对应的就业岗位和能力要求：\n\n")
         
         # Add Talks info to LLM context (if available)
         if talks:
-             combined_text_for_llm += f"学校近期举办了 {len(talks)} 场宣讲会，包括：{', '.join([t.get('宣讲会名称', '') for t in talks[:3]])}...\n\n"
+             llm_text_parts.append(f"学校近期举办了 {len(talks)} 场宣讲会，包括：{', '.join([t.get('宣讲会名称', '') for t in talks[:3]])}...\n\n")
 
         if not related_jobs:
-            combined_text_for_llm += "该专业培养具有扎实理论基础和实践能力的高素质应用型人才...\n"
+            llm_text_parts.append("该专业培养具有扎实理论基础和实践能力的高素质应用型人才...\n")
         else:
-            # 添加数据统计
-            salary_ranges = [j.get('薪资', '') for j in related_jobs if j.get('薪资')]
-            edu_requirements = [j.get('学历要求', '') for j in related_jobs if j.get('学历要求')]
-            job_categories = [j.get('职位类别', '') for j in related_jobs if j.get('职位类别')]
+            if use_llm:
+                # 添加数据统计：一次遍历同时收集薪资/学历（有序去重，各只取前 5 个）与职位类别计数
+                salary_ranges: Dict[str, None] = {}
+                edu_requirements: Dict[str, None] = {}
+                category_counter = Counter()
+                for j in related_jobs:
+                    salary = j.get('薪资')
+                    if salary and len(salary_ranges) < 5:
+                        salary_ranges[salary] = None
+                    edu = j.get('学历要求')
+                    if edu and len(edu_requirements) < 5:
+                        edu_requirements[edu] = None
+                    category = j.get('职位类别')
+                    if category:
+                        category_counter[category] += 1
             
-            combined_text_for_llm += f"【市场数据统计】\n"
-            combined_text_for_llm += f"分析样本：{total_jobs} 个相关职位\n"
+                llm_text_parts.append(f"【市场数据统计】\n")
+                llm_text_parts.append(f"分析样本：{total_jobs} 个相关职位\n")
             
-            # 统计职位类别分布
-            from collections import Counter
-            if job_categories:
-                category_counter = Counter(job_categories)
-                top_categories = category_counter.most_common(5)
-                combined_text_for_llm += f"热门职位类别：{', '.join([f'{cat}({cnt})' for cat, cnt in top_categories])}\n"
+                # 统计职位类别分布
+                if category_counter:
+                    top_categories = category_counter.most_common(5)
+                    llm_text_parts.append(f"热门职位类别：{', '.join([f'{cat}({cnt})' for cat, cnt in top_categories])}\n")
             
-            if salary_ranges:
-                combined_text_for_llm += f"薪资范围：{', '.join(list(set(salary_ranges))[:5])}\n"
-            if edu_requirements:
-                combined_text_for_llm += f"学历要求：{', '.join(list(set(edu_requirements))[:5])}\n"
-            combined_text_for_llm += f"\n【全部职位要求分析（共{total_jobs}个）】\n"
+                if salary_ranges:
+                    llm_text_parts.append(f"薪资范围：{', '.join(salary_ranges)}\n")
+                if edu_requirements:
+                    llm_text_parts.append(f"学历要求：{', '.join(edu_requirements)}\n")
+                llm_text_parts.append(f"\n【全部职位要求分析（共{total_jobs}个）】\n")
             
             # 处理所有岗位，每处理一定数量发送进度更新
             progress_interval = max(1, total_jobs // 10)  # 每10%发送一次进度
             
-            # 辅助函数：清理值
-            def clean_str(val):
-                if val is None or str(val).lower() == 'nan' or str(val).strip() == '':
-                    return ''
-                return str(val).strip()
+            safe_text = self._safe_text
+            
+            # 多个岗位常属同一公司（编号也可能跨数据源重复）：已添加过的节点/关系不再重复追加
+            seen_job_ids = set()
+            seen_company_ids = set()
+            seen_offers = set()
             
             for idx, job in enumerate(related_jobs):
-                job_name = clean_str(job.get('职位名称', ''))
-                company_name = clean_str(job.get('单位名称', ''))
-                job_category = clean_str(job.get('职位类别', ''))
-                job_num = clean_str(job.get('编号', str(idx)))
+                # 名称/公司/描述在岗位采集阶段已规范化
+                job_name = job_names[idx]
+                company_name = job_companies[idx]
+                job_category = safe_text(job.get('职位类别'))
+                job_num = safe_text(job.get('编号', str(idx)))
                 
                 # 跳过无效的职位
-                if not job_name or job_name.lower() == 'nan':
+                if not job_name:
                     continue
                 
                 job_id = f"job_{job_num}"
                 
-                entities.append({"id": job_id, "name": job_name, "type": "Job", "category": "Target"})
+                if job_id not in seen_job_ids:
+                    seen_job_ids.add(job_id)
+                    entities.append({"id": job_id, "name": job_name, "type": "Job", "category": "Target"})
+                    relationships.append({"head": major_entity_id, "relation": "TARGETS_JOB", "tail": job_id})
                 
                 # 只有公司名有效时才添加
-                if company_name and company_name.lower() != 'nan':
+                if company_name:
                     company_id = f"company_{company_name}"
-                    entities.append({"id": company_id, "name": company_name, "type": "Company", "category": "Target"})
-                    relationships.append({"head": job_id, "relation": "OFFERED_BY", "tail": company_id})
-                
-                relationships.append({"head": major_entity_id, "relation": "TARGETS_JOB", "tail": job_id})
+                    if company_id not in seen_company_ids:
+                        seen_company_ids.add(company_id)
+                        entities.append({"id": company_id, "name": company_name, "type": "Company", "category": "Target"})
+                    if (job_id, company_id) not in seen_offers:
+                        seen_offers.add((job_id, company_id))
+                        relationships.append({"head": job_id, "relation": "OFFERED_BY", "tail": company_id})
                 
-                desc = clean_str(job.get('职位描述', ''))
                 # 构建职位信息文本（限制每个描述长度，避免超出token限制）
+                desc = job_descs[idx]
                 max_desc_len = 500 if total_jobs < 50 else 200  # 根据总量调整描述长度
-                if desc:
-                    combined_text_for_llm += f"\n【职位{idx+1}/{total_jobs}】{job_name}"
+                if use_llm and desc:
+                    llm_text_parts.append(f"\n【职位{idx+1}/{total_jobs}】{job_name}")
                     if job_category:
-                        combined_text_for_llm += f" (类别：{job_category})"
+                        llm_text_parts.append(f" (类别：{job_category})")
                     if company_name:
-                        combined_text_for_llm += f"\n公司：{company_name}\n"
-                    combined_text_for_llm += f"描述：{desc[:max_desc_len]}{'...' if len(desc) > max_desc_len else ''}\n"
+                        llm_text_parts.append(f"\n公司：{company_name}\n")
+                    llm_text_parts.append(f"描述：{desc[:max_desc_len]}{'...' if len(desc) > max_desc_len else ''}\n")
                 
                 # 每隔一定数量发送进度更新
                 if (idx + 1) % progress_interval == 0 or idx == total_jobs - 1:
                     progress_percent = int((idx + 1) / total_jobs * 100)
-                    yield json.dumps({
-                        "step_id": 4,
-                        "message": f"正在处理岗位数据: {idx + 1}/{total_jobs} ({progress_percent}%)",
-                        "status": "running",
-                        "progress": {"current": idx + 1, "total": total_jobs, "stage": "处理岗位数据", "percent": progress_percent}
-                    }) + "\n"
+                    yield _step_event(4, f"正在处理岗位数据: {idx + 1}/{total_jobs} ({progress_percent}%)", "running", {"current": idx + 1, "total": total_jobs, "stage": "处理岗位数据", "percent": progress_percent})
                     if progress_percent in (20, 50, 80, 100):
-                        yield json.dumps({
-                            "event_type": "agent_status",
-                            "step_id": 4,
-                            "agent_id": "build",
-                            "agent_status": "running",
-                            "status": "running",
-                            "message": f"图谱构建智能体：已构建 {idx + 1}/{total_jobs} 岗位节点。"
-                        }) + "\n"
+                        yield _agent_event(4, "build", "running", "running", f"图谱构建智能体：已构建 {idx + 1}/{total_jobs} 岗位节点。")
         
-        yield json.dumps({
-            "step_id": 4,
-            "message": f"基础节点构建完成: {len(entities)} 个实体，文本长度 {len(combined_text_for_llm)} 字符。",
-            "status": "completed",
-            "progress": {"current": total_jobs, "total": total_jobs, "stage": "节点构建完成", "percent": 100}
-        }) + "\n"
-        yield json.dumps({
-            "event_type": "agent_status",
-            "step_id": 4,
-            "agent_id": "build",
-            "agent_status": "done",
-            "status": "completed",
-            "message": f"图谱构建智能体完成：基础图谱已生成 {len(entities)} 个实体。"
-        }) + "\n"
+        combined_text_for_llm = "".join(llm_text_parts)
+        yield _step_event(4, f"基础节点构建完成: {len(entities)} 个实体，文本长度 {len(combined_text_for_llm)} 字符。", "completed", {"current": total_jobs, "total": total_jobs, "stage": "节点构建完成", "percent": 100})
+        yield _agent_event(4, "build", "done", "completed", f"图谱构建智能体完成：基础图谱已生成 {len(entities)} 个实体。")
 
         # Step 5: LLM Extraction - 带详细进度
-        yield json.dumps({
-            "step_id": 5,
-            "message": f"正在准备调用 智南大模型 进行深度实体抽取...",
-            "status": "running",
-            "progress": {"current": 0, "total": 100, "stage": "准备中", "percent": 0}
-        }) + "\n"
-        yield json.dumps({
-            "event_type": "agent_status",
-            "step_id": 5,
-            "agent_id": "graph-1",
-            "agent_status": "running",
-            "status": "running",
-            "message": "知识建模智能体正在抽取专业知识结构..."
-        }) + "\n"
+        yield _step_event(5, f"正在准备调用 智南大模型 进行深度实体抽取...", "running", {"current": 0, "total": 100, "stage": "准备中", "percent": 0})
+        yield _agent_event(5, "graph-1", "running", "running", "知识建模智能体正在抽取专业知识结构...")
 
         kg_data_llm = {"entities": [], "relationships": []}
-        if settings.DEEPSEEK_API_KEY:
+        if use_llm:
             try:
                 # 发送分析开始进度
-                yield json.dumps({
-                    "step_id": 5,
-                    "message": f"正在构建 LLM 请求，准备分析 {total_jobs} 个职位描述...",
-                    "status": "running",
-                    "progress": {"current": 10, "total": 100, "stage": "构建请求", "percent": 10}
-                }) + "\n"
+                yield _step_event(5, f"正在构建 LLM 请求，准备分析 {total_jobs} 个职位描述...", "running", {"current": 10, "total": 100, "stage": "构建请求", "percent": 10})
                 
                 # 使用招聘数据专用的 prompt
                 use_job_data = len(related_jobs) > 0 and '职位描述' in str(related_jobs[0])
                 
-                yield json.dumps({
-                    "step_id": 5,
-                    "message": f"正在调用 LLM API，抽取能力、技能、素质、课程...",
-                    "status": "running",
-                    "progress": {"current": 20, "total": 100, "stage": "调用 LLM API", "percent": 20}
-                }) + "\n"
+                yield _step_event(5, f"正在调用 LLM API，抽取能力、技能、素质、课程...", "running", {"current": 20, "total": 100, "stage": "调用 LLM API", "percent": 20})
                 
                 kg_data_llm = await self.extract_knowledge(combined_text_for_llm, use_job_prompt=use_job_data, major=major)
                 
@@ -1220,10 +1511,7 @@ class KGService:
                 entity_count = len(kg_data_llm.get('entities', []))
                 rel_count = len(kg_data_llm.get('relationships', []))
                 
-                type_counts = {}
-                for e in kg_data_llm.get('entities', []):
-                    etype = e.get('type', 'Unknown')
-                    type_counts[etype] = type_counts.get(etype, 0) + 1
+                type_counts = Counter(e.get('type', 'Unknown') for e in kg_data_llm.get('entities', []))
                 
                 # 构建统计信息
                 stats_parts = []
@@ -1238,133 +1526,29 @@ class KGService:
                 
                 stats_msg = "、".join(stats_parts) if stats_parts else f"{entity_count}个实体"
                 
-                yield json.dumps({
-                    "step_id": 5,
-                    "message": f"AI 抽取完成: 从 {total_jobs} 个岗位中发现 {stats_msg}，{rel_count} 个关系",
-                    "status": "completed",
-                    "progress": {"current": 100, "total": 100, "stage": "抽取完成", "percent": 100}
-                }) + "\n"
-                yield json.dumps({
-                    "event_type": "agent_status",
-                    "step_id": 5,
-                    "agent_id": "graph-1",
-                    "agent_status": "done",
-                    "status": "completed",
-                    "message": f"知识建模智能体完成：抽取 {entity_count} 个实体。"
-                }) + "\n"
-                yield json.dumps({
-                    "event_type": "agent_status",
-                    "step_id": 5,
-                    "agent_id": "graph-2",
-                    "agent_status": "running",
-                    "status": "running",
-                    "message": "能力建模智能体正在构建能力-技能映射..."
-                }) + "\n"
-                await asyncio.sleep(0.15)
-                yield json.dumps({
-                    "event_type": "agent_status",
-                    "step_id": 5,
-                    "agent_id": "graph-2",
-                    "agent_status": "done",
-                    "status": "completed",
-                    "message": f"能力建模智能体完成：能力{type_counts.get('Capability', 0)}，技能{type_counts.get('Skill', 0)}。"
-                }) + "\n"
-                yield json.dumps({
-                    "event_type": "agent_status",
-                    "step_id": 5,
-                    "agent_id": "graph-3",
-                    "agent_status": "running",
-                    "status": "running",
-                    "message": "素质建模智能体正在构建素质关联..."
-                }) + "\n"
-                await asyncio.sleep(0.15)
-                yield json.dumps({
-                    "event_type": "agent_status",
-                    "step_id": 5,
-                    "agent_id": "graph-3",
-                    "agent_status": "done",
-                    "status": "completed",
-                    "message": f"素质建模智能体完成：素质{type_counts.get('Quality', 0)}，课程{type_counts.get('Course', 0)}。"
-                }) + "\n"
+                yield _step_event(5, f"AI 抽取完成: 从 {total_jobs} 个岗位中发现 {stats_msg}，{rel_count} 个关系", "completed", {"current": 100, "total": 100, "stage": "抽取完成", "percent": 100})
+                yield _agent_event(5, "graph-1", "done", "completed", f"知识建模智能体完成：抽取 {entity_count} 个实体。")
+                yield _agent_event(5, "graph-2", "running", "running", "能力建模智能体正在构建能力-技能映射...")
+                await asyncio.sleep(0)
+                yield _agent_event(5, "graph-2", "done", "completed", f"能力建模智能体完成：能力{type_counts.get('Capability', 0)}，技能{type_counts.get('Skill', 0)}。")
+                yield _agent_event(5, "graph-3", "running", "running", "素质建模智能体正在构建素质关联...")
+                await asyncio.sleep(0)
+                yield _agent_event(5, "graph-3", "done", "completed", f"素质建模智能体完成：素质{type_counts.get('Quality', 0)}，课程{type_counts.get('Course', 0)}。")
             except Exception as e:
-                yield json.dumps({
-                    "step_id": 5,
-                    "message": f"智南大模型 调用失败: {str(e)}",
-                    "status": "failed",
-                    "progress": {"current": 0, "total": 100, "stage": "抽取失败", "percent": 0}
-                }) + "\n"
-                yield json.dumps({
-                    "event_type": "agent_status",
-                    "step_id": 5,
-                    "agent_id": "graph-1",
-                    "agent_status": "blocked",
-                    "status": "completed",
-                    "message": f"知识建模智能体失败：{str(e)}"
-                }) + "\n"
-                yield json.dumps({
-                    "event_type": "agent_status",
-                    "step_id": 5,
-                    "agent_id": "graph-2",
-                    "agent_status": "blocked",
-                    "status": "completed",
-                    "message": "能力建模智能体受阻：等待可用抽取结果。"
-                }) + "\n"
-                yield json.dumps({
-                    "event_type": "agent_status",
-                    "step_id": 5,
-                    "agent_id": "graph-3",
-                    "agent_status": "blocked",
-                    "status": "completed",
-                    "message": "素质建模智能体受阻：等待可用抽取结果。"
-                }) + "\n"
+                yield _step_event(5, f"智南大模型 调用失败: {str(e)}", "failed", {"current": 0, "total": 100, "stage": "抽取失败", "percent": 0})
+                yield _agent_event(5, "graph-1", "blocked", "completed", f"知识建模智能体失败：{str(e)}")
+                yield _agent_event(5, "graph-2", "blocked", "completed", "能力建模智能体受阻：等待可用抽取结果。")
+                yield _agent_event(5, "graph-3", "blocked", "completed", "素质建模智能体受阻：等待可用抽取结果。")
         else:
             kg_data_llm = self._get_mock_kg_data()
-            yield json.dumps({
-                "step_id": 5,
-                "message": "使用模拟数据完成抽取。",
-                "status": "completed",
-                "progress": {"current": 100, "total": 100, "stage": "模拟完成", "percent": 100}
-            }) + "\n"
-            yield json.dumps({
-                "event_type": "agent_status",
-                "step_id": 5,
-                "agent_id": "graph-1",
-                "agent_status": "done",
-                "status": "completed",
-                "message": "知识建模智能体完成：已使用模拟抽取结果。"
-            }) + "\n"
-            yield json.dumps({
-                "event_type": "agent_status",
-                "step_id": 5,
-                "agent_id": "graph-2",
-                "agent_status": "done",
-                "status": "completed",
-                "message": "能力建模智能体完成：已建立能力映射。"
-            }) + "\n"
-            yield json.dumps({
-                "event_type": "agent_status",
-                "step_id": 5,
-                "agent_id": "graph-3",
-                "agent_status": "done",
-                "status": "completed",
-                "message": "素质建模智能体完成：已建立素质映射。"
-            }) + "\n"
+            yield _step_event(5, "使用模拟数据完成抽取。", "completed", {"current": 100, "total": 100, "stage": "模拟完成", "percent": 100})
+            yield _agent_event(5, "graph-1", "done", "completed", "知识建模智能体完成：已使用模拟抽取结果。")
+            yield _agent_event(5, "graph-2", "done", "completed", "能力建模智能体完成：已建立能力映射。")
+            yield _agent_event(5, "graph-3", "done", "completed", "素质建模智能体完成：已建立素质映射。")
 
         # Step 6: Final Merge
-        yield json.dumps({
-            "step_id": 6,
-            "message": "正在合并图谱数据并生成最终视图...",
-            "status": "running",
-            "progress": {"current": 50, "total": 100, "stage": "数据合并", "percent": 50}
-        }) + "\n"
-        yield json.dumps({
-            "event_type": "agent_status",
-            "step_id": 6,
-            "agent_id": "end",
-            "agent_status": "running",
-            "status": "running",
-            "message": "可视化智能体正在整理最终图谱展示数据..."
-        }) + "\n"
+        yield _step_event(6, "正在合并图谱数据并生成最终视图...", "running", {"current": 50, "total": 100, "stage": "数据合并", "percent": 50})
+        yield _agent_event(6, "end", "running", "running", "可视化智能体正在整理最终图谱展示数据...")
 
         merged = self._merge_and_enrich_kg_data(
             base_entities=entities,
@@ -1378,58 +1562,51 @@ class KGService:
             "relationships": merged["relationships"],
         }
 
-        # 保存结果到缓存（方便后续分析报告使用）
-        self._save_graph_to_cache(school, college, major, final_graph)
-        yield json.dumps({
-            "event_type": "agent_status",
-            "step_id": 6,
-            "agent_id": "end",
-            "agent_status": "done",
-            "status": "completed",
-            "message": f"可视化智能体完成：最终图谱 {len(final_graph['entities'])} 实体，{len(final_graph['relationships'])} 关系。"
-        }) + "\n"
+        # 保存结果到缓存（方便后续分析报告使用）：后台执行，最终结果先发给客户端
+        save_task = asyncio.create_task(self._save_graph_to_cache(school, college, major, final_graph))
+        _BACKGROUND_TASKS.add(save_task)
+        save_task.add_done_callback(_on_background_task_done)
+        yield _agent_event(6, "end", "done", "completed", f"可视化智能体完成：最终图谱 {len(final_graph['entities'])} 实体，{len(final_graph['relationships'])} 关系。")
         
         # Send final result with a specific event type or just as the last message
-        yield json.dumps({
-            "step_id": 7,
-            "message": f"知识图谱构建成功！共 {len(entities)} 个实体，{len(relationships)} 个关系。数据来源: {total_jobs} 个岗位（实时抽取）",
-            "status": "completed",
-            "progress": {"current": 100, "total": 100, "stage": "构建完成", "percent": 100},
-            "data": final_graph
-        }) + "\n"
+        yield _step_event(7, f"知识图谱构建成功！共 {len(entities)} 个实体，{len(relationships)} 个关系。数据来源: {total_jobs} 个岗位（实时抽取）", "completed", {"current": 100, "total": 100, "stage": "构建完成", "percent": 100}, data=final_graph)
+        await save_task
 
     async def analyze_graph_improvement(self, school: str, college: str, major: str, graph_data: Dict[str, Any], training_plan_text: str = None) -> str:
         """
         Analyze the graph and generate an improvement plan report.
         """
         # 1. Summarize graph data for the LLM
-        entity_counts = {}
-        for e in graph_data.get("entities", []):
-            etype = e.get("type", "Unknown")
-            entity_counts[etype] = entity_counts.get(etype, 0) + 1
+        entity_counts = Counter(e.get("type", "Unknown") for e in graph_data.get("entities", []))
             
         skills = [e["name"] for e in graph_data.get("entities", []) if e.get("type") == "Skill"]
         courses = [e["name"] for e in graph_data.get("entities", []) if e.get("type") == "Course"]
         
         # Get Job Statistics from RAW data (Total Source)
-        all_jobs = data_loader.search_jobs_by_major(major, limit=None)
-        job_count = len(all_jobs)
-        
-        # Simple stats
-        cities = {}
-        companies = {}
-        for j in all_jobs:
-            c = j.get('工作城市', 'Unknown')
-            cities[c] = cities.get(c, 0) + 1
-            
-            comp = j.get('单位名称', 'Unknown')
-            companies[comp] = companies.get(comp, 0) + 1
+        # Streamed: only counters are kept, the full job list is never materialized
+        # 加载器首次使用时会解析 CSV，统计整体放到线程中执行，不阻塞事件循环
+        def _job_stats():
+            job_count = 0
             
-        top_cities = sorted(cities.items(), key=lambda x: x[1], reverse=True)[:5]
-        top_companies = sorted(companies.items(), key=lambda x: x[1], reverse=True)[:5]
+            # Simple stats
+            cities = Counter()
+            companies = Counter()
+            # Sample some job titles for context
+            job_titles = []
+            for j in get_data_loader().iter_jobs_by_major(major):
+                job_count += 1
+                cities[j.get('工作城市', 'Unknown')] += 1
+                companies[j.get('单位名称', 'Unknown')] += 1
+                
+                if len(job_titles) < 50:
+                    job_titles.append(j.get('职位名称', ''))
+            return job_count, cities, companies, job_titles
         
-        # Sample some job titles for context
-        job_titles = [j.get('职位名称', '') for j in all_jobs[:50]]
+        job_count, cities, companies, job_titles = await asyncio.to_thread(_job_stats)
+            
+        # most_common(n) 用有界堆取前 n 个，结果与稳定排序后截断一致
+        top_cities = cities.most_common(5)
+        top_companies = companies.most_common(5)
         
         summary = f"""
         专业: {school} - {college} - {major}
@@ -1482,7 +1659,7 @@ class KGService:
         total_entities = len(graph_data.get("entities", []))
         
         # Get global dataset stats
-        dataset_stats = data_loader.get_dataset_stats()
+        dataset_stats = await asyncio.to_thread(lambda: get_data_loader().get_dataset_stats())
         total_companies = dataset_stats.get("total_companies", 0)
         total_positions = dataset_stats.get("total_positions", 0)
         
@@ -1491,16 +1668,35 @@ class KGService:
 多智能体分别从培养目标，毕业要求，主干学科，课程设置，课程体系，教学计划，质量评估等方面进行优化，优化结果如下：
 """
 
+        system_prompt = "你是资深的高校教育教学改革专家，擅长基于数据分析提出培养方案改进建议。请直接输出报告内容，不要包含任何开场白或结束语。"
+        temperature = 0.3
+        # 只缓存 LLM 生成的正文；header 中的统计数字每次重新计算
+        cache_path = self._llm_cache_path(".md", self.model, system_prompt, prompt, str(temperature))
+        try:
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                return header + "\n" + f.read()
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print(f"Error reading analysis cache {cache_path}: {e}")
+
         try:
             response = await self.client.chat.completions.create(
                 model=self.model,
                 messages=[
-                    {"role": "system", "content": "你是资深的高校教育教学改革专家，擅长基于数据分析提出培养方案改进建议。请直接输出报告内容，不要包含任何开场白或结束语。"},
+                    {"role": "system", "content": system_prompt},
                     {"role": "user", "content": prompt}
                 ],
-                temperature=0.3
+                temperature=temperature
             )
-            return header + "\n" + response.choices[0].message.content
+            content = response.choices[0].message.content
+            try:
+                os.makedirs(_EXTRACTION_CACHE_DIR, exist_ok=True)
+                with open(cache_path, 'w', encoding='utf-8') as f:
+                    f.write(content)
+            except Exception as e:
+                print(f"Error saving analysis cache {cache_path}: {e}")
+            return header + "\n" + content
         except Exception as e:
             print(f"Analysis Error: {e}")
             return f"生成分析报告失败: {str(e)}"
@@ -1509,12 +1705,9 @@ class KGService:
         """
         Parses text for **bold** and adds runs to the paragraph.
         """
-        parts = text.split('**')
-        for i, part in enumerate(parts):
-            if not part: continue
+        for part, bold in _iter_bold_runs(text):
             run = paragraph.add_run(part)
-            # If the index is odd, it was inside **, so make it bold
-            if i % 2 == 1:
+            if bold:
                 run.bold = True
 
     def generate_improvement_docx(self, school: str, major: str, report_content: str) -> str:
@@ -1525,13 +1718,19 @@ class KGService:
             document = Document()
             
             # Sanitize filename
-            safe_school = "".join([c for c in school if c.isalnum() or c in (' ', '-', '_')]).strip()
-            safe_major = "".join([c for c in major if c.isalnum() or c in (' ', '-', '_')]).strip()
+            safe_school = _UNSAFE_FILENAME_RE.sub('', school).strip()
+            safe_major = _UNSAFE_FILENAME_RE.sub('', major).strip()
             
             # Title
             title = document.add_heading(f'{school} {major}专业培养方案改进分析报告', 0)
             title.alignment = WD_ALIGN_PARAGRAPH.CENTER
             
+            # 样式对象在循环外解析一次，逐行按对象套用，不再每行按名称查找
+            styles = document.styles
+            heading_styles = {level: styles[f'Heading {level}'] for level in (1, 2, 3)}
+            bullet_style = styles['List Bullet']
+            number_style = styles['List Number']
+            
             # Parse Markdown-ish content simply
             for line in report_content.split('\n'):
                 try:
@@ -1539,27 +1738,20 @@ class KGService:
                     if not line:
                         continue
                     
-                    if line.startswith('### '):
-                        text = line.replace('### ', '').replace('**', '')
-                        document.add_heading(text, level=3)
-                    elif line.startswith('## '):
-                        text = line.replace('## ', '').replace('**', '')
-                        document.add_heading(text, level=2)
-                    elif line.startswith('# '):
-                        text = line.replace('# ', '').replace('**', '')
-                        document.add_heading(text, level=1)
-                    elif line.startswith('- ') or line.startswith('* '):
-                        p = document.add_paragraph(style='List Bullet')
-                        self._add_formatted_text(p, line[2:])
-                    elif line[0].isdigit() and line.find('. ') > 0 and line.find('. ') < 5:
-                         # Handle "1. ", "10. "
-                         dot_index = line.find('. ')
-                         text = line[dot_index+2:]
-                         p = document.add_paragraph(style='List Number')
-                         self._add_formatted_text(p, text)
-                    else:
+                    m = _MD_LINE_RE.match(line)
+                    if m is None:
                         p = document.add_paragraph()
                         self._add_formatted_text(p, line)
+                    elif m.group(1):
+                        text = line[m.end():].replace('**', '')
+                        document.add_paragraph(text, style=heading_styles[len(m.group(1))])
+                    elif m.group(2):
+                        # Handle "1. ", "10. "
+                        p = document.add_paragraph(style=number_style)
+                        self._add_formatted_text(p, line[m.end():])
+                    else:
+                        p = document.add_paragraph(style=bullet_style)
+                        self._add_formatted_text(p, line[m.end():])
                 except Exception as line_e:
                     print(f"Error parsing line '{line}': {line_e}")
                     continue
@@ -1585,7 +1777,7 @@ class KGService:
         # 1. Fetch relevant jobs from CSV Data
         print(f"DEBUG: Searching for jobs matching '{major}' in CSV data...")
         # Use ALL data (limit=None)
-        related_jobs = data_loader.search_jobs_by_major(major, limit=None) 
+        jobs_df = await asyncio.to_thread(lambda: get_data_loader().search_jobs_df(major, limit=None))
         
         entities = []
         relationships = []
@@ -1594,42 +1786,64 @@ class KGService:
         major_entity_id = f"major_{major}"
         entities.append({"id": major_entity_id, "name": major, "type": "Major"})
 
-        combined_text_for_llm = f"{school} {college} {major} 培养方案。\n"
+        use_llm = bool(settings.DEEPSEEK_API_KEY)
+        llm_text_parts = [f"{school} {college} {major} 培养方案。\n"]
 
-        if not related_jobs:
+        if jobs_df.empty:
             print(f"DEBUG: No jobs found for {major}. Using default mock text.")
-            combined_text_for_llm += "本专业旨在培养具有良好道德修养... 核心课程包括高级语言程序设计、数据结构、操作系统..."
+            llm_text_parts.append("本专业旨在培养具有良好道德修养... 核心课程包括高级语言程序设计、数据结构、操作系统...")
         else:
-            print(f"DEBUG: Found {len(related_jobs)} jobs. Constructing graph nodes...")
-            for idx, job in enumerate(related_jobs):
-                # Construct Entities from Structured Data
-                job_id = f"job_{job.get('编号', idx)}"
-                job_name = job.get('职位名称', 'Unknown Job').strip()
-                company_name = job.get('单位名称', 'Unknown Company').strip()
-                city = job.get('工作城市', 'Unknown City').strip()
-                
-                # Job Entity
+            print(f"DEBUG: Found {len(jobs_df)} jobs. Constructing graph nodes...")
+            # Construct Entities from Structured Data, column-wise instead of per job dict
+            if '编号' in jobs_df.columns:
+                job_ids = ('job_' + jobs_df['编号'].astype('string').fillna('')).tolist()
+            else:
+                job_ids = [f"job_{idx}" for idx in range(len(jobs_df))]
+            job_names = _text_column(jobs_df, '职位名称', 'Unknown Job')
+            company_names = _text_column(jobs_df, '单位名称', 'Unknown Company')
+            company_ids = ('company_' + company_names).tolist()
+
+            # 同一单位常发布多个岗位，单位实体只保留一个，关系仍指向同一 id
+            seen_companies = set()
+            for job_id, job_name, company_id, company_name in zip(
+                job_ids, job_names.tolist(), company_ids, company_names.tolist()
+            ):
+                # Job Entity / Company Entity
                 entities.append({"id": job_id, "name": job_name, "type": "Job"})
-                # Company Entity
-                company_id = f"company_{company_name}"
-                entities.append({"id": company_id, "name": company_name, "type": "Company"})
-                
-                # Relationships
-                # Major -> MATCHES_JOB -> Job
-                relationships.append({"head": major_entity_id, "relation": "MATCHES_JOB", "tail": job_id})
-                # Job -> OFFERED_BY -> Company
-                relationships.append({"head": job_id, "relation": "OFFERED_BY", "tail": company_id})
-                
-                # Accumulate text for LLM extraction (Skills, etc.)
-                desc = job.get('职位描述', '')
-                if desc and isinstance(desc, str):
-                    combined_text_for_llm += f"\n职位[{job_name}]要求：{desc[:200]}..."
+                if company_id not in seen_companies:
+                    seen_companies.add(company_id)
+                    entities.append({"id": company_id, "name": company_name, "type": "Company"})
+
+            # Relationships
+            # Major -> MATCHES_JOB -> Job
+            relationships.extend(
+                {"head": major_entity_id, "relation": "MATCHES_JOB", "tail": job_id} for job_id in job_ids
+            )
+            # Job -> OFFERED_BY -> Company
+            relationships.extend(
+                {"head": job_id, "relation": "OFFERED_BY", "tail": company_id}
+                for job_id, company_id in zip(job_ids, company_ids)
+            )
+
+            # Accumulate text for LLM extraction (Skills, etc.)
+            if use_llm and '职位描述' in jobs_df.columns:
+                desc = jobs_df['职位描述'].astype('string')
+                has_desc = (desc.str.len() > 0).fillna(False).astype(bool)
+                lines = '\n职位[' + job_names + ']要求：' + desc.str.slice(0, 200) + '...'
+                llm_text_parts.extend(lines[has_desc].tolist())
 
         # 2. Extract Knowledge from Text (LLM) - either Job Descriptions or Mock Text
         kg_data_llm = {"entities": [], "relationships": []}
-        if settings.DEEPSEEK_API_KEY:
-            print("DEBUG: DEEPSEEK_API_KEY is set, calling extract_knowledge on combined text")
-            kg_data_llm = await self.extract_knowledge(combined_text_for_llm)
+        if use_llm:
+            # 每 _LLM_JOBS_PER_CHUNK 个岗位一块（均带上专业抬头），并发抽取后再合并
+            header, job_lines = llm_text_parts[0], llm_text_parts[1:]
+            chunks = [
+                header + "".join(job_lines[start:start + _LLM_JOBS_PER_CHUNK])
+                for start in range(0, len(job_lines), _LLM_JOBS_PER_CHUNK)
+            ] or [header]
+            print(f"DEBUG: DEEPSEEK_API_KEY is set, calling extract_knowledge on {len(chunks)} text chunks")
+            results = await self.extract_knowledge_batch(chunks)
+            kg_data_llm = self._merge_extraction_chunks(results)
         else:
             print("DEBUG: DEEPSEEK_API_KEY is NOT set, using mock data")
             kg_data_llm = self._get_mock_kg_data()
@@ -1655,5 +1869,3 @@ class KGService:
         }
 
 kg_service = KGService()
-
-kg_service = KGService()
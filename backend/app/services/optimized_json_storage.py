@@ -2,32 +2,96 @@
 Optimized JSON Storage for Large Scale Data
 针对大数据量的 JSON 文件存储优化
 """
-import json
 import os
+import atexit
+import multiprocessing
 import pickle
 import gzip
+import shutil
+import tempfile
+import threading
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
 from typing import Dict, Any, Optional, List
-from functools import lru_cache
+from functools import lru_cache, partial
 import hashlib
 import time
+import orjson
+
+try:
+    # zstd 压缩：比 gzip 压缩率更高、解压速度快一个数量级
+    import zstandard
+except ImportError:
+    zstandard = None
+
+try:
+    import msgspec
+except ImportError:
+    msgspec = None
+
+# zstd 压缩文件的魔数头，加载时据此识别格式
+ZSTD_MAGIC = b"KGZ1"
+ZSTD_SUFFIX = ".msgpack.zst"
+
+if msgspec is not None:
+    _SHARED_ENCODER = msgspec.msgpack.Encoder()
+    _SHARED_DECODER = msgspec.msgpack.Decoder()
+
+# 内存缓存最多保留的图谱数（LRU 淘汰）
+MEMORY_CACHE_MAX_ITEMS = 10
+
+# 元数据落盘的最小间隔（秒），间隔内的多次保存只标记为脏
+METADATA_FLUSH_INTERVAL = 2.0
+
+# 多 worker 共享的图谱副本：未压缩的 msgpack 文件放在 tmpfs（/dev/shm）上，
+# 某个 worker 读盘解压或保存后发布，其余 worker 内存未命中时直接读取，无需各自解压
+# 文件名由源文件的绝对路径与 (mtime_ns, size) 组成：源文件被改写、替换或删除后旧副本自动失效
+SHARED_GRAPH_DIR = "/dev/shm" if os.path.isdir("/dev/shm") else tempfile.gettempdir()
+SHARED_GRAPH_PREFIX = "csh_graph_"
+SHARED_GRAPH_SUFFIX = ".msgpack"
+# tmpfs 占用内存，最多保留的共享图谱数（按修改时间淘汰最旧的）
+SHARED_GRAPH_MAX_FILES = 64
 
 
 class OptimizedJSONStorage:
     """
     优化的 JSON 存储，适用于大数据量场景
-    - 使用 pickle + gzip 压缩存储
-    - 内存缓存热点数据
+    - 使用 msgpack + zstd 压缩存储（依赖缺失时回退 pickle + gzip）
+    - 内存缓存热点数据，并通过 tmpfs 上的共享副本在多个 worker 间复用解压结果
     - 延迟加载
     """
     
     def __init__(self, cache_dir: str = "data/graphs"):
         self.cache_dir = cache_dir
-        self.memory_cache = {}  # 内存缓存
+        self.memory_cache = OrderedDict()  # LRU 内存缓存，键为 (school, college, major) 元组，最近访问的在末尾
         self.cache_metadata = {}  # 缓存元数据
+        self._meta_dirty = False
+        self._meta_last_flush = 0.0
+        # 进程退出时写出尚未落盘的元数据
+        atexit.register(self.flush_metadata)
         os.makedirs(cache_dir, exist_ok=True)
+        self._use_zstd = zstandard is not None and msgspec is not None
+        # zstd 压缩/解压器实例不能被多个线程同时使用（save_graph 经 to_thread 并发调用），按线程各建一份
+        self._codecs = threading.local()
+    
+    def _zstd_codecs(self):
+        """当前线程的 (compressor, decompressor, encoder, decoder)，首次使用时创建"""
+        codecs = getattr(self._codecs, 'value', None)
+        if codecs is None:
+            codecs = (
+                zstandard.ZstdCompressor(level=3, threads=-1),
+                zstandard.ZstdDecompressor(),
+                msgspec.msgpack.Encoder(),
+                msgspec.msgpack.Decoder(),
+            )
+            self._codecs.value = codecs
+        return codecs
     
-    def _get_cache_key(self, school: str, college: str, major: str) -> str:
-        """生成缓存键"""
+    @staticmethod
+    @lru_cache(maxsize=4096)
+    def _get_cache_key(school: str, college: str, major: str) -> str:
+        """生成缓存键（用于磁盘文件名与元数据），结果确定故直接缓存"""
+        # 保持 md5：换哈希算法会让已落盘的缓存文件名全部失效
         key = f"{school}_{college}_{major}"
         return hashlib.md5(key.encode()).hexdigest()
     
@@ -36,6 +100,30 @@ class OptimizedJSONStorage:
         ext = ".pkl.gz" if compressed else ".json"
         return os.path.join(self.cache_dir, f"{cache_key}{ext}")
     
+    def _get_zstd_path(self, cache_key: str) -> str:
+        """获取 zstd 压缩缓存文件路径"""
+        return os.path.join(self.cache_dir, f"{cache_key}{ZSTD_SUFFIX}")
+    
+    def _write_zstd(self, file_path: str, data: Dict[str, Any]):
+        """msgpack 编码后 zstd 压缩写入，带魔数头"""
+        compressor, _, encoder, _ = self._zstd_codecs()
+        blob = compressor.compress(encoder.encode(data))
+        with open(file_path, 'wb') as f:
+            f.write(ZSTD_MAGIC)
+            f.write(blob)
+    
+    def _read_zstd(self, file_path: str) -> Optional[Dict[str, Any]]:
+        """读取 zstd 压缩缓存；魔数不符时返回 None"""
+        with open(file_path, 'rb') as f:
+            raw = f.read()
+        if not raw.startswith(ZSTD_MAGIC):
+            return None
+        # memoryview 切片跳过魔数头，不复制整个压缩文件
+        _, decompressor, _, decoder = self._zstd_codecs()
+        return decoder.decode(
+            decompressor.decompress(memoryview(raw)[len(ZSTD_MAGIC):])
+        )
+    
     def save_graph(self, school: str, college: str, major: str, 
                    data: Dict[str, Any], use_compression: bool = True):
         """
@@ -47,113 +135,211 @@ class OptimizedJSONStorage:
         cache_key = self._get_cache_key(school, college, major)
         
         # 保存到内存缓存
-        self.memory_cache[cache_key] = {
-            'data': data,
-            'timestamp': time.time(),
-            'access_count': 0
-        }
+        self._remember((school, college, major), data, access_count=0)
+        
+        # 保存到磁盘，并刷新共享副本（仅当写入的文件就是加载时会读取的文件）
+        file_path = self._write_graph_file(cache_key, data, use_compression)
+        source = self._source_file(cache_key)
+        if source is not None and source[0] == file_path:
+            self._publish_shared(source, data)
+        
+        # 更新元数据
+        self.cache_metadata[cache_key] = _graph_metadata(school, college, major, data, use_compression)
         
-        # 保存到磁盘
-        if use_compression:
-            # 使用 pickle + gzip 压缩存储
+        self._meta_dirty = True
+        if time.time() - self._meta_last_flush > METADATA_FLUSH_INTERVAL:
+            self._save_metadata()
+    
+    def _write_graph_file(self, cache_key: str, data: Dict[str, Any], use_compression: bool) -> str:
+        """按存储格式把图谱写入磁盘（不涉及内存缓存与元数据），返回写入的文件路径"""
+        if use_compression and self._use_zstd:
+            # 使用 msgpack + zstd 压缩存储
+            file_path = self._get_zstd_path(cache_key)
+            self._write_zstd(file_path, data)
+        elif use_compression:
+            # 使用 pickle + gzip 压缩存储：先整体序列化、一次压缩（zlib 压缩时释放 GIL），
+            # 再一次写入，不再边 pickle 边逐块压缩写文件
             file_path = self._get_file_path(cache_key, compressed=True)
-            with gzip.open(file_path, 'wb') as f:
-                pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+            blob = gzip.compress(pickle.dumps(data, protocol=pickle.HIGHEST_PROTOCOL))
+            with open(file_path, 'wb') as f:
+                f.write(blob)
         else:
             # 普通 JSON 存储
             file_path = self._get_file_path(cache_key, compressed=False)
-            with open(file_path, 'w', encoding='utf-8') as f:
-                json.dump(data, f, ensure_ascii=False, indent=2)
-        
-        # 更新元数据
-        self.cache_metadata[cache_key] = {
-            'school': school,
-            'college': college,
-            'major': major,
-            'compressed': use_compression,
-            'entity_count': len(data.get('entities', [])),
-            'relation_count': len(data.get('relationships', [])),
-            'saved_at': time.time()
-        }
-        
-        self._save_metadata()
+            with open(file_path, 'wb') as f:
+                f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2 | orjson.OPT_NON_STR_KEYS))
+        return file_path
     
     def load_graph(self, school: str, college: str, major: str) -> Optional[Dict[str, Any]]:
         """加载图谱数据"""
+        memory_key = (school, college, major)
+        
+        # 1. 先检查内存缓存（元组键直接查字典，无需计算哈希）
+        entry = self.memory_cache.get(memory_key)
+        if entry is not None:
+            self.memory_cache.move_to_end(memory_key)
+            entry['access_count'] += 1
+            return entry['data']
+        
+        # 2. 检查其他 worker 针对当前源文件版本发布的共享副本，再检查磁盘缓存
         cache_key = self._get_cache_key(school, college, major)
+        source = self._source_file(cache_key)
+        if source is None:
+            return None
+        data = self._read_shared(source)
+        if data is None:
+            data = self._load_from_disk(cache_key)
+            if data:
+                self._publish_shared(source, data)
         
-        # 1. 先检查内存缓存
-        if cache_key in self.memory_cache:
-            self.memory_cache[cache_key]['access_count'] += 1
-            return self.memory_cache[cache_key]['data']
+        # 3. 缓存到内存
+        if data:
+            self._remember(memory_key, data, access_count=1)
         
-        # 2. 检查磁盘缓存（优先压缩格式）
+        return data
+    
+    def _load_from_disk(self, cache_key: str) -> Optional[Dict[str, Any]]:
+        """从磁盘读取图谱（优先压缩格式），不写入内存缓存"""
+        zstd_path = self._get_zstd_path(cache_key)
         compressed_path = self._get_file_path(cache_key, compressed=True)
         json_path = self._get_file_path(cache_key, compressed=False)
         
         data = None
         
-        if os.path.exists(compressed_path):
-            # 加载压缩格式
+        if self._use_zstd and os.path.exists(zstd_path):
+            # 加载 zstd 压缩格式
+            data = self._read_zstd(zstd_path)
+        
+        if data is None and os.path.exists(compressed_path):
+            # 加载 pickle.gz 压缩格式
             with gzip.open(compressed_path, 'rb') as f:
                 data = pickle.load(f)
-        elif os.path.exists(json_path):
+        elif data is None and os.path.exists(json_path):
             # 加载 JSON 格式
-            with open(json_path, 'r', encoding='utf-8') as f:
-                data = json.load(f)
-        
-        # 3. 缓存到内存
-        if data:
-            self.memory_cache[cache_key] = {
-                'data': data,
-                'timestamp': time.time(),
-                'access_count': 1
-            }
-            # 清理旧缓存
-            self._cleanup_memory_cache()
+            with open(json_path, 'rb') as f:
+                data = orjson.loads(f.read())
         
         return data
     
-    def _cleanup_memory_cache(self, max_items: int = 10):
-        """清理内存缓存，保留热点数据"""
-        if len(self.memory_cache) <= max_items:
+    def _graph_file_paths(self, cache_key: str) -> List[str]:
+        """图谱的各格式磁盘文件，按加载优先级排列"""
+        paths = [self._get_zstd_path(cache_key)] if self._use_zstd else []
+        paths.append(self._get_file_path(cache_key, compressed=True))
+        paths.append(self._get_file_path(cache_key, compressed=False))
+        return paths
+    
+    def _source_file(self, cache_key: str) -> Optional[tuple]:
+        """加载时会读取的磁盘文件及其 stat；都不存在时返回 None"""
+        for path in self._graph_file_paths(cache_key):
+            try:
+                return path, os.stat(path)
+            except FileNotFoundError:
+                continue
+        return None
+    
+    def _read_shared(self, source: tuple) -> Optional[Dict[str, Any]]:
+        """读取源文件当前版本的共享副本；未启用、不存在或损坏时返回 None"""
+        if msgspec is None:
+            return None
+        path = _shared_graph_path(*source)
+        try:
+            with open(path, 'rb') as f:
+                return _SHARED_DECODER.decode(f.read())
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            print(f"读取共享图谱失败 {path}: {e}")
+            return None
+    
+    def _publish_shared(self, source: tuple, data: Dict[str, Any]):
+        """写入源文件当前版本的共享副本（先写临时文件再原子替换，读者不会看到半截文件），并清理该源文件的旧版本"""
+        if msgspec is None:
             return
-        
-        # 按访问次数排序，保留访问最多的
-        sorted_cache = sorted(
-            self.memory_cache.items(),
-            key=lambda x: x[1]['access_count'],
-            reverse=True
-        )
-        
-        # 保留前 max_items 个
-        self.memory_cache = dict(sorted_cache[:max_items])
+        path = _shared_graph_path(*source)
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(_SHARED_ENCODER.encode(data))
+            os.replace(tmp_path, path)
+            _remove_shared_graphs(_shared_graph_prefix(source[0]), keep=path)
+            _trim_shared_graphs()
+        except Exception as e:
+            print(f"发布共享图谱失败 {path}: {e}")
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+    
+    def delete_graph(self, school: str, college: str, major: str) -> bool:
+        """删除图谱的内存缓存、各格式磁盘文件、共享副本与元数据；有文件被删除时返回 True"""
+        self.memory_cache.pop((school, college, major), None)
+        cache_key = self._get_cache_key(school, college, major)
+        deleted = False
+        for path in self._graph_file_paths(cache_key):
+            _remove_shared_graphs(_shared_graph_prefix(path))
+            try:
+                os.remove(path)
+                deleted = True
+            except FileNotFoundError:
+                pass
+        if self.cache_metadata.pop(cache_key, None) is not None:
+            self._meta_dirty = True
+            self.flush_metadata()
+        return deleted
+    
+    def has_graph(self, school: str, college: str, major: str) -> bool:
+        """检查图谱是否存在（只检查内存/文件，不反序列化）"""
+        if (school, college, major) in self.memory_cache:
+            return True
+        cache_key = self._get_cache_key(school, college, major)
+        return ((self._use_zstd and os.path.exists(self._get_zstd_path(cache_key)))
+                or os.path.exists(self._get_file_path(cache_key, compressed=True))
+                or os.path.exists(self._get_file_path(cache_key, compressed=False)))
+    
+    def _remember(self, memory_key: tuple, data: Dict[str, Any], access_count: int):
+        """写入内存缓存并标记为最近使用，超出上限时淘汰最久未访问的条目"""
+        self.memory_cache[memory_key] = {
+            'data': data,
+            'timestamp': time.time(),
+            'access_count': access_count
+        }
+        self.memory_cache.move_to_end(memory_key)
+        while len(self.memory_cache) > MEMORY_CACHE_MAX_ITEMS:
+            self.memory_cache.popitem(last=False)
     
     def _save_metadata(self):
-        """保存缓存元数据"""
+        """保存缓存元数据（先写临时文件再替换，避免写到一半的文件）"""
         meta_path = os.path.join(self.cache_dir, "cache_metadata.json")
-        with open(meta_path, 'w', encoding='utf-8') as f:
-            json.dump(self.cache_metadata, f, ensure_ascii=False, indent=2)
+        tmp_path = meta_path + ".tmp"
+        # 元数据频繁重写，不做缩进
+        with open(tmp_path, 'wb') as f:
+            f.write(orjson.dumps(self.cache_metadata))
+        os.replace(tmp_path, meta_path)
+        self._meta_dirty = False
+        self._meta_last_flush = time.time()
+    
+    def flush_metadata(self):
+        """立即写出尚未落盘的元数据"""
+        if self._meta_dirty:
+            self._save_metadata()
     
     def load_metadata(self):
         """加载缓存元数据"""
         meta_path = os.path.join(self.cache_dir, "cache_metadata.json")
         if os.path.exists(meta_path):
-            with open(meta_path, 'r', encoding='utf-8') as f:
-                self.cache_metadata = json.load(f)
+            with open(meta_path, 'rb') as f:
+                self.cache_metadata = orjson.loads(f.read())
     
     def get_stats(self) -> Dict[str, Any]:
         """获取存储统计信息"""
         total_graphs = len(self.cache_metadata)
-        total_entities = sum(m.get('entity_count', 0) for m in self.cache_metadata.values())
-        total_relations = sum(m.get('relation_count', 0) for m in self.cache_metadata.values())
+        # 一次遍历同时累加实体数与关系数
+        total_entities = total_relations = 0
+        for m in self.cache_metadata.values():
+            total_entities += m.get('entity_count', 0)
+            total_relations += m.get('relation_count', 0)
         
-        # 计算磁盘使用
-        total_size = 0
-        for filename in os.listdir(self.cache_dir):
-            filepath = os.path.join(self.cache_dir, filename)
-            if os.path.isfile(filepath):
-                total_size += os.path.getsize(filepath)
+        # 计算磁盘使用（scandir 一次读目录，DirEntry 自带类型与 stat 信息）
+        with os.scandir(self.cache_dir) as it:
+            total_size = sum(entry.stat().st_size for entry in it if entry.is_file())
         
         return {
             'total_graphs': total_graphs,
@@ -163,50 +349,148 @@ class OptimizedJSONStorage:
             'disk_usage_mb': round(total_size / 1024 / 1024, 2)
         }
     
-    def batch_load_all(self) -> Dict[str, Dict[str, Any]]:
+    def batch_load_all(self, prefetch: int = 2) -> Dict[str, Dict[str, Any]]:
         """
-        批量加载所有图谱到内存（适用于小内存机器分批处理）
-        返回生成器，避免一次性加载所有数据
+        逐个加载所有图谱（适用于小内存机器分批处理）
+        返回生成器，避免一次性加载所有数据；直接读磁盘、不写入内存缓存，
+        单个后台线程预读随后 prefetch 个文件，解压与调用方处理重叠
         """
-        for cache_key, meta in self.cache_metadata.items():
-            data = self.load_graph(
-                meta['school'], 
-                meta['college'], 
-                meta['major']
-            )
-            if data:
-                yield cache_key, data
+        cache_keys = list(self.cache_metadata)
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            pending = deque()
+            next_index = 0
+            while pending or next_index < len(cache_keys):
+                while next_index < len(cache_keys) and len(pending) <= prefetch:
+                    cache_key = cache_keys[next_index]
+                    pending.append((cache_key, executor.submit(self._load_from_disk, cache_key)))
+                    next_index += 1
+                cache_key, future = pending.popleft()
+                data = future.result()
+                if data:
+                    yield cache_key, data
     
     def compress_existing_json(self):
-        """将现有的 JSON 文件压缩为 pickle.gz 格式"""
-        import shutil
+        """将现有的 JSON 文件压缩为优化格式（zstd，或 pickle.gz），多进程并行转换"""
+        # 先列出目录再转换：转换过程会在同一目录写入新文件
+        with os.scandir(self.cache_dir) as it:
+            filenames = [entry.name for entry in it if entry.name.endswith('_graph.json')]
+        if not filenames:
+            return 0
         
+        # 各文件相互独立且以 CPU（解析 + 压缩）为主，按进程并行；元数据在父进程统一合并
         converted = 0
-        for filename in os.listdir(self.cache_dir):
-            if filename.endswith('_graph.json'):
-                json_path = os.path.join(self.cache_dir, filename)
-                # 解析文件名
-                parts = filename.replace('_graph.json', '').split('_')
-                if len(parts) >= 3:
-                    school, college = parts[0], parts[1]
-                    major = '_'.join(parts[2:])
-                    
-                    # 加载 JSON
-                    with open(json_path, 'r', encoding='utf-8') as f:
-                        data = json.load(f)
-                    
-                    # 保存为压缩格式
-                    self.save_graph(school, college, major, data, use_compression=True)
-                    
-                    # 备份原文件
-                    backup_path = json_path + '.backup'
-                    shutil.move(json_path, backup_path)
-                    
-                    converted += 1
-                    print(f"压缩完成: {filename}")
+        workers = min(len(filenames), os.cpu_count() or 1)
+        # 用 spawn 启动子进程：在多线程的服务进程（事件循环、Neo4j 驱动线程）里 fork，
+        # 子进程可能继承到被其他线程持有的锁而死锁
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as executor:
+            for filename, result in zip(filenames, executor.map(partial(_compress_json_file, self.cache_dir), filenames)):
+                if result is None:
+                    continue
+                cache_key, meta = result
+                self.cache_metadata[cache_key] = meta
+                self._meta_dirty = True
+                converted += 1
+                print(f"压缩完成: {filename}")
         
+        self.flush_metadata()
         return converted
 
 
+def _shared_graph_prefix(source_path: str) -> str:
+    """某个源文件所有共享副本的文件名前缀（按绝对路径区分不同部署 / 缓存目录）"""
+    source_id = hashlib.blake2b(os.path.abspath(source_path).encode('utf-8'), digest_size=16).hexdigest()
+    return f"{SHARED_GRAPH_PREFIX}{source_id}_"
+
+
+def _shared_graph_path(source_path: str, stat: os.stat_result) -> str:
+    """源文件当前版本对应的共享副本路径"""
+    name = f"{_shared_graph_prefix(source_path)}{stat.st_mtime_ns:x}_{stat.st_size:x}{SHARED_GRAPH_SUFFIX}"
+    return os.path.join(SHARED_GRAPH_DIR, name)
+
+
+def _remove_shared_graphs(name_prefix: str, keep: Optional[str] = None):
+    """删除文件名以 name_prefix 开头的共享副本（keep 除外）"""
+    try:
+        with os.scandir(SHARED_GRAPH_DIR) as it:
+            paths = [
+                entry.path for entry in it
+                if entry.name.startswith(name_prefix) and entry.name.endswith(SHARED_GRAPH_SUFFIX)
+            ]
+    except OSError:
+        return
+    for path in paths:
+        if path == keep:
+            continue
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def _trim_shared_graphs():
+    """共享副本超过 SHARED_GRAPH_MAX_FILES 个时删除最旧的"""
+    with os.scandir(SHARED_GRAPH_DIR) as it:
+        entries = [
+            entry for entry in it
+            if entry.name.startswith(SHARED_GRAPH_PREFIX) and entry.name.endswith(SHARED_GRAPH_SUFFIX)
+        ]
+    if len(entries) <= SHARED_GRAPH_MAX_FILES:
+        return
+    entries.sort(key=lambda entry: entry.stat().st_mtime)
+    for entry in entries[:len(entries) - SHARED_GRAPH_MAX_FILES]:
+        try:
+            os.remove(entry.path)
+        except OSError:
+            pass
+
+
+def _graph_metadata(school: str, college: str, major: str,
+                    data: Dict[str, Any], use_compression: bool) -> Dict[str, Any]:
+    """单个图谱的缓存元数据"""
+    return {
+        'school': school,
+        'college': college,
+        'major': major,
+        'compressed': use_compression,
+        'entity_count': len(data.get('entities', [])),
+        'relation_count': len(data.get('relationships', [])),
+        'saved_at': time.time()
+    }
+
+
+@lru_cache(maxsize=None)
+def _worker_storage(cache_dir: str) -> "OptimizedJSONStorage":
+    """转换子进程内复用的存储实例（只用于写文件，不写元数据）"""
+    return OptimizedJSONStorage(cache_dir)
+
+
+def _compress_json_file(cache_dir: str, filename: str):
+    """
+    在子进程中把一个 *_graph.json 转为压缩格式并备份原文件
+    返回 (cache_key, 元数据)；文件名无法解析时返回 None
+    """
+    # 解析文件名
+    parts = filename.replace('_graph.json', '').split('_')
+    if len(parts) < 3:
+        return None
+    school, college = parts[0], parts[1]
+    major = '_'.join(parts[2:])
+    
+    # 加载 JSON
+    json_path = os.path.join(cache_dir, filename)
+    with open(json_path, 'rb') as f:
+        data = orjson.loads(f.read())
+    
+    # 保存为压缩格式
+    storage = _worker_storage(cache_dir)
+    cache_key = storage._get_cache_key(school, college, major)
+    storage._write_graph_file(cache_key, data, use_compression=True)
+    
+    # 备份原文件
+    shutil.move(json_path, json_path + '.backup')
+    
+    return cache_key, _graph_metadata(school, college, major, data, True)
+
+
 # 全局实例
 optimized_storage = OptimizedJSONStorage()
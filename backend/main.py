@@ -1,8 +1,15 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
+from fastapi.responses import ORJSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import get_settings
 from app.core.database import engine, Base
 from app.api import endpoints, training_plans, data_management, cache_debug
+from app.services.hierarchy_cache_service import hierarchy_cache
+from app.core.neo4j_client import neo4j_client, init_neo4j
+from app.services.chongqing_job_loader import get_chongqing_loader
+from app.services.data_loader import get_data_loader
 
 # 导入模型以确保表被创建
 from app.models.training_plan import TrainingPlan
@@ -13,33 +20,69 @@ settings = get_settings()
 # 创建数据库表
 Base.metadata.create_all(bind=engine)
 
-# 初始化学校层级缓存
-print("[Startup] 初始化学校层级缓存...")
-from app.services.hierarchy_cache_service import hierarchy_cache
-hierarchy_cache.initialize_cache()
-print("[Startup] 学校层级缓存初始化完成")
 
-# 初始化 Neo4j（如果启用）
-if settings.NEO4J_ENABLED:
+def _init_hierarchy_cache():
+    """初始化学校层级缓存（只在启动时执行一次），并据此构建接口使用的层级数据"""
+    print("[Startup] 初始化学校层级缓存...")
+    endpoints.load_hierarchy(hierarchy_cache.initialize_cache())
+    print("[Startup] 学校层级缓存初始化完成")
+
+
+def _init_neo4j():
+    """初始化 Neo4j 连接（如果启用）"""
     print("[Startup] 初始化 Neo4j 连接...")
-    from app.core.neo4j_client import init_neo4j
     if init_neo4j():
         print("[Startup] Neo4j 连接成功")
     else:
         print("[Startup] Neo4j 连接失败，将使用 JSON 文件存储")
 
+
+def _warm_chongqing_loader():
+    """预先加载重庆市招聘数据及其检索索引，首个请求无需在事件循环上等待"""
+    print("[Startup] 加载重庆市招聘数据...")
+    get_chongqing_loader()
+    print("[Startup] 重庆市招聘数据加载完成")
+
+
+def _warm_data_loader():
+    """预先加载招聘市场 CSV 数据（职位/宣讲会/招聘会），首个请求无需在事件循环上等待"""
+    print("[Startup] 加载招聘市场数据...")
+    get_data_loader()
+    print("[Startup] 招聘市场数据加载完成")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # 启动时在线程中并发初始化层级缓存、数据加载器与 Neo4j（互不依赖），不在导入阶段阻塞
+    startup = [
+        asyncio.to_thread(_init_hierarchy_cache),
+        asyncio.to_thread(_warm_chongqing_loader),
+        asyncio.to_thread(_warm_data_loader),
+    ]
+    if settings.NEO4J_ENABLED:
+        startup.append(asyncio.to_thread(_init_neo4j))
+    await asyncio.gather(*startup)
+    yield
+    await neo4j_client.close_async()
+    neo4j_client.close()
+
+
 app = FastAPI(
     title=settings.PROJECT_NAME,
     version=settings.VERSION,
-    openapi_url=f"{settings.API_V1_STR}/openapi.json"
+    openapi_url=f"{settings.API_V1_STR}/openapi.json",
+    default_response_class=ORJSONResponse,  # orjson 序列化，比标准库 json 更快
+    lifespan=lifespan
 )
 
-# Set all CORS enabled origins
+# CORS：来源取自配置（CORS_ORIGINS）
+# 通配来源不能与凭据同时使用（浏览器会拒绝），仅在配置了明确来源列表时允许凭据
+cors_origins = list(settings.CORS_ORIGINS)
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
+    allow_origins=cors_origins,
+    allow_credentials="*" not in cors_origins,
+    allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS"],
     allow_headers=["*"],
     expose_headers=["*"]
 )